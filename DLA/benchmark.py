@@ -0,0 +1,195 @@
+import sys
+import json
+import time
+import platform
+import argparse
+import itertools
+import multiprocessing as mp
+import numpy as np
+from dla_simulation import Application
+
+try:
+    import resource
+except ImportError:     # not available on Windows, where memory is not recorded
+    resource = None
+
+
+### Grids of benchmark cases: every combination of walker count, spawn shape, seed shape and cluster radius (crystal_size_limit)
+GRIDS = {
+    'quick': {'n': [50, 200], 'spawn_shape': ['square', 'circle'], 'seed_shape': ['dot'], 'crystal_size_limit': [30]},
+    'full': {'n': [50, 200, 800], 'spawn_shape': ['square', 'circle'], 'seed_shape': ['dot', 'line'], 'crystal_size_limit': [40, 80, 160]},
+}
+
+### Fields that identify a case, used to match results against a baseline
+KEYS = ('engine', 'n', 'spawn_shape', 'seed_shape', 'crystal_size_limit')
+
+
+def peak_rss_mb():
+    '''Returns the peak resident memory of this process in MB, or None if it cannot be measured.'''
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def run_case(engine, n, spawn_shape, seed_shape, crystal_size_limit, padSize=20, max_sweeps=None, repeats=1, rng_seed=0):
+    '''
+    Grows one cluster headless (repeats times, keeping the fastest) and measures its throughput.
+
+    Parameters
+    ----------
+    engine, n, spawn_shape, seed_shape, crystal_size_limit, padSize
+        Passed to Application
+    max_sweeps : int or None
+        Passed to Application.grow, to cap the length of slow cases
+    repeats : int
+        The number of times the cluster is grown; every repeat does the same work, and the fastest is reported
+    rng_seed : int
+        Seeds the NumPy generator of each run, so every run of a case does the same work
+
+    Returns
+    -------
+    result : dict
+        The case, its walker steps, attachments and sweeps, seconds spent growing, walker steps and attachments per second, and the
+        resident memory before and at the peak of the run (MB)
+    '''
+    before = peak_rss_mb()
+    seconds = None
+
+    ### Compiling the numba kernel is excluded from the timing: a one-walker, one-sweep run compiles it without growing the measured cluster
+    if engine == 'numba':
+        Application(1, seed_shape, spawn_shape, padSize, crystal_size_limit, engine=engine, rng_seed=rng_seed, block_size=1).grow(max_sweeps=1)
+
+    for r in range(repeats):
+        app = Application(n, seed_shape, spawn_shape, padSize, crystal_size_limit, engine=engine, rng_seed=rng_seed)
+
+        start = time.perf_counter()
+        app.grow(max_sweeps)
+        elapsed = time.perf_counter() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+        steps, attachments = app.stats.counts['steps'], app.stats.counts['attachments']
+
+    return {'engine': engine, 'n': n, 'spawn_shape': spawn_shape, 'seed_shape': seed_shape, 'crystal_size_limit': crystal_size_limit,
+            'steps': steps, 'attachments': attachments, 'sweeps': app.sweeps, 'completed': not app.isRunning, 'seconds': seconds,
+            'steps_per_second': steps / seconds if seconds else None, 'attachments_per_second': attachments / seconds if seconds else None,
+            'rss_before_mb': before, 'rss_peak_mb': peak_rss_mb()}
+
+
+def _isolated(args):
+    '''Runs a case in a pool worker, so its memory high-water mark is not raised by earlier cases.'''
+    return run_case(*args)
+
+
+def run_suite(grid='quick', engines=('python',), max_sweeps=None, repeats=1, isolate=True):
+    '''
+    Runs every case of a grid for each engine.
+
+    Parameters
+    ----------
+    grid : str or dict
+        A key of GRIDS, or a dict of lists for 'n', 'spawn_shape', 'seed_shape' and 'crystal_size_limit'
+    engines : iterable
+        Engines to benchmark, 'python' and/or 'numba'
+    max_sweeps, repeats
+        Passed to run_case
+    isolate : bool
+        Whether each case runs in a fresh process (True), so memory peaks are per case, or all run in this process
+
+    Returns
+    -------
+    results : dict
+        'meta' describing the machine and versions, and 'results', a list of the run_case() output for each case
+    '''
+    grid = GRIDS[grid] if isinstance(grid, str) else grid
+    cases = [(engine, n, spawn_shape, seed_shape, limit, 20, max_sweeps, repeats)
+             for engine, n, spawn_shape, seed_shape, limit in itertools.product(engines, grid['n'], grid['spawn_shape'], grid['seed_shape'], grid['crystal_size_limit'])]
+
+    if isolate:
+        ### maxtasksperchild=1 gives every case a fresh interpreter
+        with mp.get_context('spawn').Pool(1, maxtasksperchild=1) as pool:
+            results = pool.map(_isolated, cases, chunksize=1)
+    else:
+        results = [run_case(*case) for case in cases]
+
+    meta = {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(), 'processor': platform.processor(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+    return {'meta': meta, 'results': results}
+
+
+def compare(results, baseline, tolerance=0.1):
+    '''
+    Compares the throughput of each case against a baseline run of the same case.
+
+    Parameters
+    ----------
+    results, baseline : dict
+        Output of run_suite()
+    tolerance : float
+        Fractional slowdown in walker steps per second beyond which a case is flagged as a regression
+
+    Returns
+    -------
+    rows : list
+        For each case found in both, the case fields, the ratios (current / baseline) of steps and attachments per second and peak memory,
+        and whether it is a regression
+    '''
+    base = {tuple(case[key] for key in KEYS): case for case in baseline['results']}
+    rows = []
+
+    for case in results['results']:
+        old = base.get(tuple(case[key] for key in KEYS))
+        if old is None:
+            continue
+
+        row = {key: case[key] for key in KEYS}
+        for field in ('steps_per_second', 'attachments_per_second', 'rss_peak_mb'):
+            row[field + '_ratio'] = case[field] / old[field] if case[field] and old[field] else None
+
+        row['regression'] = row['steps_per_second_ratio'] is not None and row['steps_per_second_ratio'] < 1 - tolerance
+        rows.append(row)
+
+    return rows
+
+
+def ratio(value):
+    '''Formats a ratio for the comparison printed by main(), which is None where a run lacks the measurement.'''
+    return '-' if value is None else f'x{value:.2f}'
+
+
+def main(argv=None):
+    '''Command line entry point: runs a grid, prints a table, saves the results as JSON and compares them against a baseline.'''
+    parser = argparse.ArgumentParser(description='Benchmark DLA growth throughput and memory.')
+    parser.add_argument('--grid', default='quick', choices=sorted(GRIDS))
+    parser.add_argument('--engines', nargs='+', default=['python'], choices=['python', 'numba'])
+    parser.add_argument('--max-sweeps', type=int, default=None)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', default='benchmark.json', help='file the results are saved to')
+    parser.add_argument('--baseline', default=None, help='results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.grid, args.engines, args.max_sweeps, args.repeats)
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+
+    for case in results['results']:
+        print(f"{case['engine']:>6} n={case['n']:<4} {case['spawn_shape']:>6} {case['seed_shape']:>4} r={case['crystal_size_limit']:<4} "
+              f"{case['steps_per_second'] or 0:12.0f} steps/s {case['attachments_per_second'] or 0:9.1f} attachments/s  peak {case['rss_peak_mb'] or 0:.1f} MB")
+
+    if args.baseline is None:
+        return 0
+
+    with open(args.baseline) as file:
+        rows = compare(results, json.load(file), args.tolerance)
+    for row in rows:
+        flag = 'REGRESSION' if row['regression'] else ''
+        print(f"{row['engine']:>6} n={row['n']:<4} {row['spawn_shape']:>6} {row['seed_shape']:>4} r={row['crystal_size_limit']:<4} {ratio(row['steps_per_second_ratio'])} {flag}")
+
+    return 1 if any(row['regression'] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
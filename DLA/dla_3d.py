@@ -0,0 +1,195 @@
+import math
+import numpy as np
+
+
+### Sixfold direction on a cubic lattice, with no bias (as in Constant_Step 3D walks)
+STEPS = np.array([(1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1)], dtype=np.int64)
+
+### Neighbourhoods used for contact: the 6 face neighbours, or all 26 face, edge and corner neighbours
+NEIGHBOURHOODS = {
+    6: [tuple(step) for step in STEPS],
+    26: [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1) if (dx, dy, dz) != (0, 0, 0)],
+}
+
+
+class Application_3D():
+    '''
+    Runs DLA in 3D on a sparse voxel lattice. As in Application, n particles walk at once and stick to the cluster on contact.
+    Only occupied voxels and the voxels touching them are stored (as a set and a dict), so memory scales with the cluster mass rather than the volume it spans.
+    Particles are launched from a sphere around the cluster and relaunched if they wander beyond a larger kill sphere.
+
+    Methods
+    -------
+    __init__
+        Constructor method, sets class variables, places the seed and launches the particles
+
+    launch
+        Returns random starting voxels on the launch sphere
+
+    attach
+        Adds a voxel to the cluster and updates the contact counts around it
+
+    advance
+        Moves every particle by one step and attaches those in contact with the cluster
+
+    grow
+        Grows the cluster until it exceeds crystal_size_limit
+    '''
+
+    def __init__(self, n, seed_shape, padSize, crystal_size_limit, contact=26, stick_coeff=1.0, kill_factor=3, rng_seed=None):
+        '''
+        Initialises all class attributes and launches n particles.
+
+        Parameters
+        ----------
+        n : int
+            The total number of particles in the simulation
+        seed_shape : str
+            The shape of the seed to which particle aggregate, 'dot' or 'line'
+        padSize : int
+            Distance between the cluster radius and the launch sphere
+        crystal_size_limit : int
+            The maximum size of the DLA cluster allowed before the simulation exits
+        contact : int
+            The number of neighbours of a voxel tested for contact, 6 or 26
+        stick_coeff : float
+            The probability a particle sticks to the cluster on contact
+        kill_factor : float
+            Particles further than kill_factor times the launch radius from the seed are relaunched
+        rng_seed : int or None
+            Seed for the NumPy generator used for every step
+        '''
+        if contact not in NEIGHBOURHOODS:
+            raise Exception('Parameter "contact" must be 6 or 26.')
+
+        self.n = n
+        self.seed_shape = seed_shape
+        self.padSize = padSize
+        self.crystal_size_limit = crystal_size_limit
+        self.contact = contact
+        self.stick_coeff = stick_coeff
+        self.kill_factor = kill_factor
+        self.rng = np.random.default_rng(rng_seed)
+
+        ### Seed centre, mirroring Application
+        self.start_x, self.start_y, self.start_z = 0, 0, 0
+
+        ### Sparse voxel store: the set of occupied voxels, and the number of occupied neighbours of every voxel touching the cluster
+        self.occupied = set()
+        self.contacts = {}
+        self.crystal_position = []
+        self.max_radius = 0.0
+
+        if seed_shape == 'dot':
+            seed = [(0, 0, 0)]
+        elif seed_shape == 'line':
+            seed = [(x, 0, 0) for x in range(-50, 51)]
+        else:
+            raise Exception("Invalid seed shape, please enter either 'dot' or 'line'.")
+
+        for voxel in seed:
+            self.attach(voxel)
+        self.crystal_position = []
+
+        self.positions = self.launch(n)
+        self.sweeps = 0
+        self.isRunning = True
+
+    def launch_radius(self):
+        '''Returns the radius of the launch sphere.'''
+        return self.max_radius + self.padSize
+
+    def launch(self, k):
+        '''
+        Returns k random starting voxels on the launch sphere.
+
+        Parameters
+        ----------
+        k : int
+            The number of particles to launch
+
+        Returns
+        -------
+        positions : np.ndarray
+            (k, 3) int64 array of voxel positions
+        '''
+        directions = self.rng.standard_normal((k, 3))
+        directions /= np.linalg.norm(directions, axis=1)[:, None]
+
+        return np.rint(directions * self.launch_radius()).astype(np.int64)
+
+    def attach(self, voxel):
+        '''
+        Adds a voxel to the cluster and increments the contact count of each of its neighbours.
+
+        Parameters
+        ----------
+        voxel : tuple
+            (x, y, z) position of the voxel
+        '''
+        self.occupied.add(voxel)
+        self.crystal_position.append(voxel)
+
+        x, y, z = voxel
+        for dx, dy, dz in NEIGHBOURHOODS[self.contact]:
+            neighbour = (x + dx, y + dy, z + dz)
+            self.contacts[neighbour] = self.contacts.get(neighbour, 0) + 1
+
+        self.max_radius = max(self.max_radius, math.sqrt(x*x + y*y + z*z))
+
+    def advance(self):
+        '''
+        Moves every particle by one step and attaches those in contact with the cluster. Particles far from the cluster are moved as whole arrays,
+        and only those within one voxel of the cluster radius are tested against the sparse store. Sets self.isRunning to False once the cluster exceeds crystal_size_limit.
+        '''
+        old = self.positions
+        new = old + STEPS[self.rng.integers(0, len(STEPS), self.n)]
+        r2 = (new**2).sum(axis=1)
+
+        ### Relaunch particles that have wandered beyond the kill sphere
+        killed = r2 > (self.kill_factor * self.launch_radius())**2
+        if killed.any():
+            new[killed] = self.launch(int(killed.sum()))
+
+        ### Only particles that can touch the cluster need a lookup in the sparse store
+        near = np.flatnonzero(~killed & (r2 <= (self.max_radius + 2)**2))
+        sticks = self.rng.random(len(near))
+
+        for i, stick in zip(near, sticks):
+            voxel = tuple(int(c) for c in new[i])
+
+            # Moves onto the cluster are rejected
+            if voxel in self.occupied:
+                new[i] = old[i]
+                voxel = tuple(int(c) for c in old[i])
+
+            if voxel in self.contacts and voxel not in self.occupied and stick < self.stick_coeff:
+                self.attach(voxel)
+
+                if self.max_radius > self.crystal_size_limit:
+                    self.isRunning = False
+                    break
+
+                new[i] = self.launch(1)[0]
+
+        self.positions = new
+        self.sweeps += 1
+
+    def grow(self, max_sweeps=None):
+        '''
+        Grows the cluster for as long as self.isRunning == True or until max_sweeps sweeps over all particles have been made.
+
+        Parameters
+        ----------
+        max_sweeps : int or None
+            The maximum number of sweeps before returning, or None to grow until the cluster exceeds self.crystal_size_limit
+        '''
+        while self.isRunning and (max_sweeps is None or self.sweeps < max_sweeps):
+            self.advance()
+
+
+if __name__ == '__main__':
+    ### Form: Application_3D(n, seed_shape, padSize, crystal_size_limit, contact=26, stick_coeff=1.0, kill_factor=3, rng_seed=None)
+    test = Application_3D(1000, 'dot', 5, 30)
+    test.grow()
+    print(f"{len(test.crystal_position)} voxels attached after {test.sweeps} sweeps, storing {len(test.contacts)} contact voxels.")
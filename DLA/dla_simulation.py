@@ -1,7 +1,16 @@
-import random
 import math
+import contextlib
 import numpy as np
-import pygame
+from walker_kernel import DIRECTIONS, CONTACTS, neighbour_counts, get_kernel
+from run_stats import Run_Stats
+from progress import Progress_Monitor
+
+
+def pygame_module():
+    '''Imports pygame, which only displaying a run needs. Called once by on_init(), so headless growth and analysis never load pygame.'''
+    import pygame
+
+    return pygame
 
 
 class Particle():
@@ -41,7 +50,7 @@ class Particle():
 class Application():
     '''Composite class used to run the main DLA simulation in 2D. Takes in the Particle class as a component, to generate many particles through repeated instantiation. Generates an animation of Brownian tree (DLA cluster) formation using pygame.'''
 
-    def __init__(self, n, seed_shape, spawn_shape, padSize, crystal_size_limit, view=False):
+    def __init__(self, n, seed_shape, spawn_shape, padSize, crystal_size_limit, view=False, engine='python', rng_seed=None, block_size=16, contact='target', stick_coeff=1.0, detailed_timing=False):
         '''
         Initialises all class attributes and creates n particles based on the Particle class. 
 
@@ -59,16 +68,46 @@ class Application():
             The maximum size of the DLA cluster allowed before the simulation exits
         view : bool
             Whether or not individual particle motion is viewed along with the growing DLA cluster
+        engine : str
+            Either 'python' (the reference per-particle loop) or 'numba' (JIT-compiled walker kernel, falling back to the uncompiled kernel if Numba is not installed)
+        rng_seed : int, np.random.SeedSequence or None
+            Seed for the NumPy generator drawing spawn positions, walker directions and sticking tests
+        block_size : int
+            The number of sweeps over all particles drawn (and, for the kernel engine, run) at once
+        contact : str
+            'target' to stick when the next target pixel is occupied, or 'von_neumann'/'moore' to stick when any 4/8 neighbour of the particle is occupied
+        stick_coeff : float or sequence
+            The probability a particle sticks on contact, or (for 'von_neumann'/'moore' contact only) a sequence of probabilities indexed by the number of occupied neighbours, starting from 1
+        detailed_timing : bool
+            Whether self.stats also times every contact test of the 'python' engine (slower); counters and the other phases are always recorded
         '''
-        ### Raise an exception if the input spawn_shape parameter is invalid
+        ### Raise an exception if the input spawn_shape or engine parameters are invalid
         if spawn_shape != 'square' and spawn_shape != 'circle':
             raise Exception('Parameter "spawn_shape" must be "square" or "circle".')
+
+        if engine != 'python' and engine != 'numba':
+            raise Exception('Parameter "engine" must be "python" or "numba".')
+
+        if contact not in CONTACTS:
+            raise Exception('Parameter "contact" must be "target", "von_neumann" or "moore".')
  
         ### Initialise display surface, set its size and initialise pixel array and colour
         self.size = self.width, self.height = 800, 600      # size of display screen
         self.crystalColor = 0xDCDCDC     # grey in hex
         self.n = n
         self.view = view
+        self.engine = engine
+        self.block_size = block_size
+        self.rng = np.random.default_rng(rng_seed)
+
+        ### Performance counters and per-phase timing, see run_stats.py
+        self.stats = Run_Stats(engine, detailed_timing)
+
+        ### Optional progress observer, see watch()
+        self.monitor = None
+
+        ### Optional profiler wrapping grow() and on_execute(), see profile()
+        self.profiler = None
         
         ### Set seed and spawn shapes (taken in as input parameters)
         self.seed_shape = seed_shape
@@ -94,7 +133,19 @@ class Application():
         self.crystal_size_limit = crystal_size_limit
 
         ### Set a sticking coefficient, describing the probability a particle will stick to the cluster (1 means it will always stick)
-        self.stick_coeff = 1.0
+        self.contact = contact
+        self.stick_coeff = stick_coeff
+
+        ### Tabulate the sticking probability against the number of occupied neighbours (a particle with none never sticks)
+        self.stick_table = np.zeros(len(DIRECTIONS) + 1)
+        if np.ndim(stick_coeff) == 0:
+            self.stick_table[1:] = stick_coeff
+
+        elif contact == 'target' or len(stick_coeff) != CONTACTS[contact]:
+            raise Exception('A sequence "stick_coeff" needs "von_neumann" or "moore" contact, with one probability per possible number of occupied neighbours.')
+
+        else:
+            self.stick_table[1:len(stick_coeff)+1] = stick_coeff
         
         ### Create an empty list to store all the particle objects created below
         self.all_particles = []
@@ -113,13 +164,18 @@ class Application():
         ### Create an empty list to store the positions (x and y) of the pixels forming the growing cluster
         self.crystal_position = []
 
+        ### Largest distance of a cluster pixel from the seed centre, over the first radius_measured pixels (see max_radius())
+        self.cluster_radius = 0.0
+        self.radius_measured = 0
+
         ### Initialise min and max x, y to define a rectangular cluster domain (limits of cluster)
         self.min_x, self.min_y = self.start_x, self.start_y
         self.max_x, self.max_y = self.start_x, self.start_y
         
 
     def on_init(self):
-        '''Initialises pygame attributes.'''
+        '''Initialises pygame attributes, importing pygame (kept as self.pygame) for the methods that display the simulation.'''
+        self.pygame = pygame = pygame_module()
 
         pygame.init()   # Initialise pygame
         pygame.display.set_caption("2D Diffusion Limited Aggregation")      # Window title
@@ -129,10 +185,26 @@ class Application():
         self.start_time = pygame.time.get_ticks()                     # Set a timer
 
         ### Generate a seed based on self.seed_shape and set the self.isRunning flag to True
+        self.init_lattice()
         self.gen_seed()
-        self.isRunning = True
     
 
+    def init_lattice(self):
+        '''Creates the occupancy lattice holding the seed, which is the record of the cluster used for all contact tests. Sets the self.isRunning flag to True.'''
+
+        ### Lattice is indexed [x, y], like the pygame pixel array
+        self.lattice = np.zeros(self.size, dtype=np.uint8)
+        seed = self.seed_pixels()
+        self.lattice[seed[:, 0], seed[:, 1]] = 1
+
+        ### Count of occupied neighbours of each pixel, updated on every attachment so contact is a single lookup
+        self.neighbours = neighbour_counts(self.lattice, CONTACTS[self.contact])
+
+        self.sweeps = 0
+        self.rendered = 0
+        self.isRunning = True
+
+
     def on_event(self, event):
         '''
         Called during main on_execute() loop which loops over all events continuously during the simulation.
@@ -142,6 +214,8 @@ class Application():
         event : object
             A pygame event
         '''
+        pygame = self.pygame
+
         ### In the event we want to quit the game, print the total time elapsed and quit
         if event.type == pygame.QUIT:
             time = pygame.time.get_ticks() - self.start_time
@@ -149,38 +223,75 @@ class Application():
             self.isRunning = False
 
 
-    def gen_seed(self):
-        '''Creates a seed of a specified seed shape. Raises an exception for invalid seed inputs.'''
+    def seed_pixels(self):
+        '''
+        Rasterises the seed of shape self.seed_shape onto the pixel lattice. Raises an exception for invalid seed inputs.
+
+        Returns
+        -------
+        pixels : np.ndarray
+            (number of pixels, 2) array of the x-y pixel positions forming the seed
+        '''
+        x0, y0 = self.start_x, self.start_y
 
         if self.seed_shape == 'dot':
-            self.pixelArray[self.start_x, self.start_y] = self.crystalColor
+            return np.array([[x0, y0]])
 
         elif self.seed_shape == 'line':
-            pygame.draw.line(self.displaySurface, self.crystalColor, (self.start_x-50, self.start_y), (self.start_x+50, self.start_y))
+            xs = np.arange(x0-50, x0+51)
+            return np.column_stack((xs, np.full_like(xs, y0)))
+
+        ### The remaining shapes are found by testing every pixel of a bounding box
+        dx, dy = np.meshgrid(np.arange(-80, 81), np.arange(-80, 81), indexing='ij')
 
-        elif self.seed_shape == 'circle':
-            pygame.draw.circle(self.displaySurface, self.crystalColor, (self.start_x, self.start_y), 30, width=1)
+        if self.seed_shape == 'circle':
+            mask = np.abs(np.sqrt(dx**2 + dy**2) - 30) < 0.5
 
         elif self.seed_shape == 'ellipse':
-            pygame.draw.ellipse(self.displaySurface, self.crystalColor, ((self.start_x, self.start_y), (45, 32)), width = 1)
+            # Outline of the ellipse inscribed in the 45 x 32 rectangle with top-left corner at the centre
+            a, b = 45/2, 32/2
+            mask = np.abs(np.sqrt(((dx + 0.5 - a)/a)**2 + ((dy + 0.5 - b)/b)**2) - 1) * b < 0.5
 
         elif self.seed_shape == 'square':
-            pygame.draw.rect(self.displaySurface, self.crystalColor, ((self.start_x, self.start_y), (30, 30)), width = 1)
+            # Outline of the 30 x 30 square with top-left corner at the centre
+            inside = (dx >= 0) & (dx < 30) & (dy >= 0) & (dy < 30)
+            mask = inside & ((dx == 0) | (dx == 29) | (dy == 0) | (dy == 29))
 
         elif self.seed_shape == 'star':   # because my dad asked me to!
-            x = self.start_x
-            y = self.start_y
-            star_points  = [(x, y-76), (x+20, y-25), (x+73, y-28), (x+28, y+5), (x+42, y+55), (x, y+23), (x-42, y+55), (x-28, y+5), (x-73, y-28), (x-20, y-25)]
-            pygame.draw.polygon(self.displaySurface, self.crystalColor, star_points)
-        
+            star_points = np.array([(0, -76), (20, -25), (73, -28), (28, 5), (42, 55), (0, 23), (-42, 55), (-28, 5), (-73, -28), (-20, -25)])
+            # Even-odd rule: count crossings of a ray in the +x direction with each edge of the polygon
+            mask = np.zeros(dx.shape, dtype=bool)
+            for (xa, ya), (xb, yb) in zip(star_points, np.roll(star_points, -1, axis=0)):
+                if ya == yb:
+                    continue
+                crosses = (ya > dy) != (yb > dy)
+                x_cross = xa + (dy - ya) * (xb - xa) / (yb - ya)
+                mask ^= crosses & (dx < x_cross)
+
         else:
             raise Exception("Invalid seed shape, please enter either 'dot', 'line', 'circle', 'ellipse', 'square' or 'star'.")
 
+        return np.column_stack((dx[mask] + x0, dy[mask] + y0))
+
 
-    def square_spawn(self):
+    def gen_seed(self):
+        '''Draws the seed of a specified seed shape. Raises an exception for invalid seed inputs.'''
+
+        for x, y in self.seed_pixels():
+            self.pixelArray[x, y] = self.crystalColor
+
+
+    def square_spawn(self, u=None, v=None):
         '''
         Randomly choose a position on a side of a square for a particle to spawn along.
 
+        Parameters
+        ----------
+        u : float or None
+            Uniform random number in [0, 1) choosing the side of the square, drawn from self.rng if None
+        v : float or None
+            Uniform random number in [0, 1) choosing the position along the side, drawn from self.rng if None
+
         Returns
         -------
         x : int
@@ -188,32 +299,40 @@ class Application():
         y : int
             The vertical pixel position along the square from which the particle will spawn 
         '''
+        if u is None:
+            u, v = self.rng.random(2)
+
         ### Denote each side of a square as sides 1, 2, 3 or 4. 
-        newSide = random.choice([1, 2, 3, 4])
+        newSide = int(u * 4) + 1
 
         ### Generates particles uniformly along any one edge.
         if newSide == 1:
             x = self.sqdomainMin_x
-            y = int(random.uniform(self.sqdomainMin_y, self.sqdomainMax_y))
+            y = int(self.sqdomainMin_y + v * (self.sqdomainMax_y - self.sqdomainMin_y))
 
         elif newSide == 2:
-            x = int(random.uniform(self.sqdomainMin_x, self.sqdomainMax_x))
+            x = int(self.sqdomainMin_x + v * (self.sqdomainMax_x - self.sqdomainMin_x))
             y = self.sqdomainMin_y
 
         elif newSide == 3:
             x = self.sqdomainMax_x
-            y = int(random.uniform(self.sqdomainMin_y, self.sqdomainMax_y))
+            y = int(self.sqdomainMin_y + v * (self.sqdomainMax_y - self.sqdomainMin_y))
 
         else:   # newSide == 4
-            x = int(random.uniform(self.sqdomainMin_x, self.sqdomainMax_x))
+            x = int(self.sqdomainMin_x + v * (self.sqdomainMax_x - self.sqdomainMin_x))
             y = self.sqdomainMax_y
         
         return x, y
 
 
-    def circle_spawn(self):
+    def circle_spawn(self, u=None):
         '''
         Randomly choose a position on a circle of radius self.radius for the particle to spawn on.
+
+        Parameters
+        ----------
+        u : float or None
+            Uniform random number in [0, 1) choosing the angle, drawn from self.rng if None
         
         Returns
         -------
@@ -222,8 +341,11 @@ class Application():
         y : int
             The vertical pixel position along the circle from which the particle will spawn 
         '''
+        if u is None:
+            u = self.rng.random()
+
         ### Choose a random angle theta
-        theta = random.random() * 2 * math.pi
+        theta = u * 2 * math.pi
 
         ### Generate x and y co-ordinates based on this theta and the specified radius
         x = int(self.start_x + math.cos(theta)*self.radius)
@@ -232,50 +354,101 @@ class Application():
         return x, y
 
 
-    def on_loop(self):
+    def draw_block(self):
         '''
-        Loops around each of the n particles and updates positions by one step.
+        Draws the random numbers for the next self.block_size sweeps over all particles. Both engines consume the same draws, so a fixed rng_seed grows the same cluster with either.
+
+        Returns
+        -------
+        dirs : np.ndarray
+            (block_size, n) array of direction indices into DIRECTIONS
+        sticks : np.ndarray
+            (block_size, n) array of uniform numbers tested against the sticking probability
+        spawns : np.ndarray
+            (block_size, n, 2) array of uniform numbers used to respawn particles
         '''
-        ss = 1    # Set step size of paricles
-        self.gen_seed()
+        dirs = self.rng.integers(0, len(DIRECTIONS), (self.block_size, self.n))
+        sticks = self.rng.random((self.block_size, self.n))
+        spawns = self.rng.random((self.block_size, self.n, 2))
 
-        ### Recolour existing (and growing) crystal each loop iteration, only if self.view == True
-        if self.view:
-            for coordinate in self.crystal_position:
-                self.pixelArray[coordinate[0], coordinate[1]] = self.crystalColor
+        return dirs, sticks, spawns
 
-        ### Loop over all particles 
-        for particle in self.all_particles:
-            # Eightfold direction on a square pixel lattice, with no bias
-            (dx, dy) = random.choice([(0, ss), (0, -ss), (ss, 0), (-ss, 0), (ss, -ss), (-ss, ss), (ss, ss), (-ss, -ss)])
 
-            # Assign increments to new x and y variables to keep a record of current and future position
-            new_x = particle.x + dx
-            new_y = particle.y + dy
+    def advance(self):
+        '''Advances the simulation by one block of sweeps over all particles, using the selected engine. Sets self.isRunning to False once the cluster exceeds self.crystal_size_limit.'''
 
-            # Call wrap_around method to wrap around movement around based on a chosen domain shape
-            new_x, new_y = self.wrap_around(particle, new_x, new_y)
-            
-            # Check if pixel has already been covered by walker 
-            if self.pixelArray[new_x, new_y] == self.crystalColor and random.random() <= self.stick_coeff:
-                # Set pixel to same colour as growing crystal and append to crystal_position list
-                self.pixelArray[particle.x, particle.y] = self.crystalColor
-                self.crystal_position.append((particle.x, particle.y))
-
-                # Calculate the distance between the particle (newest addition to the DLA crystal) and the seed centre
-                x = particle.x - self.start_x
-                y = particle.y - self.start_y
-                distance = math.sqrt(x**2 + y**2)
-
-                # Quit the simulation if the crystal size exceeds the specified limit, and print the total time elapsed
-                if distance > self.crystal_size_limit:
-                    time = pygame.time.get_ticks() - self.start_time
-                    print("A total of", time/1000, "seconds has elapsed.")
-                    pygame.time.wait(10000)
-                    self.isRunning = False
-                    return
-
-                # Modify simulation domain as crystal grows
+        with self.stats.timer('stepping'):
+            dirs, sticks, spawns = self.draw_block()
+
+            if self.engine == 'python':
+                for s in range(self.block_size):
+                    for i, particle in enumerate(self.all_particles):
+                        self.step_particle(particle, dirs[s, i], sticks[s, i], spawns[s, i])
+                        if not self.isRunning:
+                            return
+
+                    self.sweeps += 1
+
+            else:
+                self.advance_kernel(dirs, sticks, spawns)
+
+
+    def step_particle(self, particle, direction, stick, spawn):
+        '''
+        Moves one particle by one step, attaching it to the cluster (and respawning it) if it touches the cluster. This is the reference implementation of the walker kernel.
+
+        Parameters
+        ----------
+        particle : object
+            An object of the Particle class representing an individual particle
+        direction : int
+            Index into DIRECTIONS of the step taken
+        stick : float
+            Uniform random number tested against the sticking probability
+        spawn : np.ndarray
+            Pair of uniform random numbers used to respawn the particle
+        '''
+        (dx, dy) = DIRECTIONS[direction]
+
+        # Assign increments to new x and y variables to keep a record of current and future position
+        new_x = particle.x + int(dx)
+        new_y = particle.y + int(dy)
+
+        # Call wrap_around method to wrap around movement around based on a chosen domain shape
+        new_x, new_y = self.wrap_around(particle, new_x, new_y)
+        self.stats.counts['steps'] += 1
+        
+        # Check if pixel has already been covered by walker 
+        if self.stats.detailed:
+            with self.stats.timer('contact'):
+                touching, attach, new_x, new_y = self.contact_test(particle, new_x, new_y, stick)
+        else:
+            touching, attach, new_x, new_y = self.contact_test(particle, new_x, new_y, stick)
+
+        if touching and not attach:
+            self.stats.counts['rejected_sticks'] += 1
+
+        if attach:
+            # Add pixel to the lattice and append to crystal_position list
+            self.lattice[particle.x, particle.y] = 1
+            self.crystal_position.append((particle.x, particle.y))
+            self.stats.counts['attachments'] += 1
+
+            for dx, dy in DIRECTIONS[:CONTACTS[self.contact]]:
+                self.neighbours[(particle.x + dx) % self.width, (particle.y + dy) % self.height] += 1
+
+            # Calculate the distance between the particle (newest addition to the DLA crystal) and the seed centre
+            x = particle.x - self.start_x
+            y = particle.y - self.start_y
+            distance = math.sqrt(x**2 + y**2)
+
+            # Quit the simulation if the crystal size exceeds the specified limit
+            if distance > self.crystal_size_limit:
+                self.isRunning = False
+                return
+
+            # Modify simulation domain as crystal grows
+            with self.stats.timer('domain'):
                 if particle.x < self.min_x:
                     self.min_x = particle.x
 
@@ -290,27 +463,155 @@ class Application():
                     
                 self.restrict_domain()
 
-                # Respawn the particle once it has adhered to the crystal
-                if self.spawn_shape == 'square':
-                    particle.update(*self.square_spawn())
-                
-                elif self.spawn_shape == 'circle':
-                    particle.update(*self.circle_spawn())
+            # Respawn the particle once it has adhered to the crystal
+            self.stats.counts['respawns'] += 1
+            if self.spawn_shape == 'square':
+                particle.update(*self.square_spawn(spawn[0], spawn[1]))
+            
+            elif self.spawn_shape == 'circle':
+                particle.update(*self.circle_spawn(spawn[0]))
+
+        else:
+            ### Otherwise move the particle to the new position
+            particle.x, particle.y = new_x, new_y
 
-            else:
-                ### Otherwise move the particle to the new position
-                particle.x, particle.y = new_x, new_y
 
-                ### Show individual particles moving in green, only if self.view == True
-                if self.view:
+    def contact_test(self, particle, new_x, new_y, stick):
+        '''
+        Tests a particle's move for contact with the cluster, and whether it sticks. With neighbour contact, moves onto the cluster are rejected and the particle is moved.
+
+        Parameters
+        ----------
+        particle : object
+            An object of the Particle class representing an individual particle
+        new_x, new_y : int
+            The position the particle is moving to
+        stick : float
+            Uniform random number tested against the sticking probability
+
+        Returns
+        -------
+        touching : bool
+            Whether the particle is in contact with the cluster
+        attach : bool
+            Whether the particle sticks
+        new_x, new_y : int
+            The position the particle moves to
+        '''
+        if self.contact == 'target':
+            touching = self.lattice[new_x, new_y] == 1
+            attach = touching and stick <= self.stick_coeff
+
+        else:
+            # Moves onto the cluster are rejected, then check the occupied neighbours of the particle's position
+            if self.lattice[new_x, new_y] == 1:
+                new_x, new_y = particle.x, particle.y
+
+            touching = self.neighbours[new_x, new_y] > 0
+            attach = stick < self.stick_table[self.neighbours[new_x, new_y]]
+            particle.x, particle.y = new_x, new_y
+
+        return touching, attach, new_x, new_y
+
+
+    def advance_kernel(self, dirs, sticks, spawns):
+        '''
+        Runs one block of sweeps through the walker kernel and copies the results back onto the Application and Particle objects.
+
+        Parameters
+        ----------
+        dirs, sticks, spawns : np.ndarray
+            Random numbers for the block, as returned by draw_block()
+        '''
+        kernel = get_kernel(self.engine)
+
+        px = np.array([particle.x for particle in self.all_particles], dtype=np.int64)
+        py = np.array([particle.y for particle in self.all_particles], dtype=np.int64)
+        box = np.array([self.min_x, self.max_x, self.min_y, self.max_y, self.sqdomainMin_x, self.sqdomainMax_x, self.sqdomainMin_y, self.sqdomainMax_y], dtype=np.int64)
+        domain = np.array([self.radius, self.max_radius()], dtype=np.float64)
+        crystal = np.empty((dirs.size, 2), dtype=np.int64)
+        counters = np.zeros(2, dtype=np.int64)
+
+        count, sweeps_done, stopped = kernel(self.lattice, self.neighbours, px, py, dirs, sticks, spawns, box, domain, crystal, self.spawn_shape == 'square', CONTACTS[self.contact],
+                                             self.start_x, self.start_y, self.padSize, self.width, self.crystal_size_limit, float(self.stick_coeff) if self.contact == 'target' else 1.0, self.stick_table, counters)
+
+        self.crystal_position.extend((int(x), int(y)) for x, y in crystal[:count])
+        self.min_x, self.max_x, self.min_y, self.max_y, self.sqdomainMin_x, self.sqdomainMax_x, self.sqdomainMin_y, self.sqdomainMax_y = (int(value) for value in box)
+        if self.spawn_shape == 'circle' and count:
+            self.radius = float(domain[0])
+
+        for particle, x, y in zip(self.all_particles, px, py):
+            particle.update(int(x), int(y))
+
+        self.sweeps += int(sweeps_done)
+        self.stats.counts['steps'] += int(counters[0])
+        self.stats.counts['rejected_sticks'] += int(counters[1])
+        self.stats.counts['attachments'] += int(count)
+        self.stats.counts['respawns'] += int(count) - bool(stopped)
+
+        if stopped:
+            self.isRunning = False
+
+
+    def max_radius(self):
+        '''
+        Returns the largest distance of any cluster pixel from the seed centre (0 for an empty cluster). Each pixel is measured once, on the
+        first call after it attaches, so a call costs only the pixels attached since the last one.
+        '''
+        if len(self.crystal_position) > self.radius_measured:
+            pixels = np.array(self.crystal_position[self.radius_measured:])
+            radius = float(np.max(np.sqrt((pixels[:, 0] - self.start_x)**2 + (pixels[:, 1] - self.start_y)**2)))
+            self.cluster_radius = max(self.cluster_radius, radius)
+            self.radius_measured = len(self.crystal_position)
+
+        return self.cluster_radius
+
+
+    def on_loop(self):
+        '''
+        Advances all n particles by one block of steps and draws the cluster (and particles, if self.view == True).
+        '''
+        pygame = self.pygame
+
+        ### Nothing to do if the window has just been closed
+        if not self.isRunning:
+            return
+
+        ### Redraw the seed, only if self.view == True as the display is cleared each frame
+        if self.view:
+            with self.stats.timer('rendering'):
+                self.gen_seed()
+
+        self.advance()
+        if self.monitor is not None:
+            self.monitor.update(self)
+
+        with self.stats.timer('rendering'):
+            ### Colour the pixels that joined the cluster since the last frame, or the whole (growing) crystal if self.view == True as the display is cleared each frame
+            start = 0 if self.view else self.rendered
+            for coordinate in self.crystal_position[start:]:
+                self.pixelArray[coordinate[0], coordinate[1]] = self.crystalColor
+            self.rendered = len(self.crystal_position)
+
+            ### Show individual particles in green, only if self.view == True
+            if self.view:
+                for particle in self.all_particles:
                     self.pixelArray[particle.x, particle.y] = 0x00FF00   # green in hex
-                
-        # Update the display window
-        pygame.display.update()
+                    
+            # Update the display window
+            pygame.display.update()
+
+        # Quit the simulation if the crystal size exceeded the specified limit, and print the total time elapsed
+        if not self.isRunning:
+            time = pygame.time.get_ticks() - self.start_time
+            print("A total of", time/1000, "seconds has elapsed.")
+            pygame.time.wait(10000)
+            return
 
         # Remove previous particle paths, only for viewing purposes of individual particles
         if self.all_particles and self.view:
-            self.displaySurface.fill((0,0,0,))      # Removes previous path of particles
+            with self.stats.timer('rendering'):
+                self.displaySurface.fill((0,0,0,))      # Removes previous path of particles
 
 
     def wrap_around(self, particle, new_x, new_y):
@@ -371,35 +672,107 @@ class Application():
 
         ### Domain restrictions for a circular spawn
         elif self.spawn_shape == 'circle':
-            max_radius = 0
-
-            for pixel in self.crystal_position:
-                x = pixel[0] - self.start_x
-                y = pixel[1] - self.start_y
-                radius = np.sqrt(x**2 + y**2)
-
-                if radius > max_radius:
-                    max_radius = radius
-
-            self.radius = max_radius + self.padSize
+            self.radius = self.max_radius() + self.padSize
 
 
     def on_execute(self):
         '''Method called when application is first run. Executes the simulation for as long as self.isRunning == True.'''
         ### Call the pygame constructor method (initialises pygame)
         self.on_init()
+        pygame = self.pygame
       
-        while self.isRunning:
-            for event in pygame.event.get():
-                self.on_event(event)
+        with self.profiler or contextlib.nullcontext():
+            while self.isRunning:
+                for event in pygame.event.get():
+                    self.on_event(event)
 
-            self.on_loop()
+                self.on_loop()
 
         pygame.quit()
 
+        ### The displayed run ends the simulation, so its profile is written now
+        if self.profiler is not None:
+            self.profiler.dump()
+
+
+    def watch(self, callback=None, every=100, port=None):
+        '''
+        Reports the progress of the run every `every` attachments, while it is displayed (on_execute) or grown headless (grow).
+
+        Parameters
+        ----------
+        callback : function or None
+            Called with a dict of the current mass, radius, throughput and ETA to crystal_size_limit (see Progress_Monitor.snapshot)
+        every : int
+            The number of attachments between reports
+        port : int or None
+            Port of a local HTTP endpoint serving the latest report as JSON, and at /metrics for Prometheus (0 for any free port), or None for no endpoint
+
+        Returns
+        -------
+        monitor : Progress_Monitor
+            The observer, whose close() method stops the endpoint
+        '''
+        self.monitor = Progress_Monitor([] if callback is None else [callback], every, port)
+
+        return self.monitor
+
+
+    def profile(self, output, mode='cprofile', interval=0.005):
+        '''
+        Profiles every later run of grow() or on_execute() into one cumulative profile, until profile() is called again. The ranked hot-function
+        report (output + '.profile.txt') and flame graph folded stacks (output + '.folded') are written once, when profiling stops or on_execute()
+        returns, so runs grown in many short blocks (e.g. by grow_until_converged) do not rewrite them; profiler.dump() writes them between runs.
+        See profiling.py, which is only imported here and also profiles runs from the command line.
+
+        Parameters
+        ----------
+        output : str or None
+            Path prefix of the files written, e.g. next to the run's results, or None to stop profiling
+        mode : str
+            'cprofile' (deterministic, every call timed, also writes output + '.prof') or 'sampling' (low overhead, exact stacks)
+        interval : float
+            Seconds between samples, for mode='sampling'
+
+        Returns
+        -------
+        profiler : Profiler or None
+            The profiler wrapping each run
+        '''
+        ### Stopping (or replacing) a profile writes its files
+        if self.profiler is not None:
+            self.profiler.dump()
+            self.profiler = None
+
+        if output is not None:
+            from profiling import Profiler
+            self.profiler = Profiler(output, mode, interval)
+
+        return self.profiler
+
+
+    def grow(self, max_sweeps=None):
+        '''
+        Grows the cluster without a display, for as long as self.isRunning == True or until max_sweeps sweeps over all particles have been made.
+
+        Parameters
+        ----------
+        max_sweeps : int or None
+            The maximum number of sweeps before returning, or None to grow until the cluster exceeds self.crystal_size_limit
+        '''
+        ### Keep growing an existing lattice if grow() has already been called
+        if not hasattr(self, 'lattice'):
+            self.init_lattice()
+
+        with self.profiler or contextlib.nullcontext():
+            while self.isRunning and (max_sweeps is None or self.sweeps < max_sweeps):
+                self.advance()
+                if self.monitor is not None:
+                    self.monitor.update(self)
+
 
 # Prevents this test object instantiating when running the file externally (i.e. from frac_dim.py)
 if __name__ == '__main__':
-    ### Form: Application(n, seed_shape, spawn_shape, padSize, crystal_size_limit, view=False)
+    ### Form: Application(n, seed_shape, spawn_shape, padSize, crystal_size_limit, view=False, engine='python', rng_seed=None, block_size=16)
     test = Application(100, 'dot', 'circle', 50, 100)
     test.on_execute()
@@ -1,20 +1,253 @@
 import math
 import numpy as np
-import pandas as pd
 from dla_simulation import Application
-import matplotlib.pyplot as plt
-plt.style.use('seaborn-whitegrid')
+
+
+class Online_Fit():
+    '''
+    Straight-line least squares fit of y against x, updated one point at a time in O(1) memory with Welford-style running means and
+    co-moments, so the fit and its confidence interval can be read after every point (e.g. ln(mass) against ln(radius) during growth).
+
+    Methods
+    -------
+    __init__
+        Constructor method, creates an empty fit
+
+    add
+        Adds a point
+
+    slope, intercept, std_error, half_width
+        The fitted line, the standard error of its slope and the half-width of the slope's confidence interval
+    '''
+
+    def __init__(self):
+        self.count = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.Sxx = 0.0      # sum of squared deviations of x from its mean
+        self.Syy = 0.0
+        self.Sxy = 0.0
+
+    def add(self, x, y):
+        '''Adds the point (x, y).'''
+        self.count += 1
+        dx = x - self.mean_x
+        dy = y - self.mean_y
+        self.mean_x += dx / self.count
+        self.mean_y += dy / self.count
+        self.Sxx += dx * (x - self.mean_x)
+        self.Syy += dy * (y - self.mean_y)
+        self.Sxy += dx * (y - self.mean_y)
+
+    def slope(self):
+        '''Returns the slope of the fit (nan with fewer than 2 distinct x).'''
+        return self.Sxy / self.Sxx if self.Sxx > 0 else math.nan
+
+    def intercept(self):
+        '''Returns the intercept of the fit.'''
+        return self.mean_y - self.slope() * self.mean_x
+
+    def std_error(self):
+        '''Returns the standard error of the slope (nan with fewer than 3 points).'''
+        if self.count < 3 or self.Sxx <= 0:
+            return math.nan
+
+        residual = max(self.Syy - self.Sxy**2 / self.Sxx, 0.0)
+        return math.sqrt(residual / (self.count - 2) / self.Sxx)
+
+    def half_width(self, z=1.96):
+        '''Returns the half-width of the slope's confidence interval, z standard errors (1.96 for 95%).'''
+        return z * self.std_error()
+
+
+def grow_until_converged(cluster, target, z=1.96, min_points=10, min_radius=5):
+    '''
+    Grows a cluster a block of sweeps at a time, refitting ln(mass) against ln(radius) each time its radius (tracked incrementally by
+    Application.max_radius) reaches a new whole pixel, until the half-width of the confidence interval of the dimension falls below target or
+    the cluster reaches its crystal_size_limit. Successive points of one cluster are correlated, so the interval measures how settled the fit
+    is rather than a strict confidence level.
+
+    Parameters
+    ----------
+    cluster : Application
+        The cluster to grow, headless
+    target : float
+        Half-width of the confidence interval of the dimension at which growth stops
+    z : float
+        Standard errors in the half-width (1.96 for 95%)
+    min_points : int
+        The fewest radii fitted before stopping
+    min_radius : float
+        Radius below which points are not fitted, as the smallest clusters are dominated by the lattice
+
+    Returns
+    -------
+    fit : Online_Fit
+        The fit of ln(mass) against ln(radius) over the cluster's growth
+    '''
+    fit = Online_Fit()
+    last = math.floor(min_radius) - 1
+
+    if not hasattr(cluster, 'lattice'):
+        cluster.init_lattice()
+
+    while cluster.isRunning:
+        cluster.grow(max_sweeps=cluster.sweeps + 1)
+        radius = cluster.max_radius()
+
+        if math.floor(radius) > last:
+            last = math.floor(radius)
+            fit.add(math.log(radius), math.log(len(cluster.crystal_position)))
+            if fit.count >= min_points and fit.half_width(z) < target:
+                break
+
+    return fit
+
+
+class Lazy_Clusters():
+    '''
+    List of Application objects described by their parameters, each constructed on first access and then kept.
+
+    Methods
+    -------
+    __init__
+        Constructor method, stores the parameters of each cluster
+
+    __len__, __getitem__, __iter__
+        List access, constructing clusters as they are reached
+
+    built
+        The number of clusters constructed so far
+    '''
+
+    def __init__(self, n, seed_shape, spawn_shape, padSize, radii, options):
+        '''
+        Parameters
+        ----------
+        n, seed_shape, spawn_shape, padSize, options
+            Passed to each Application, except that each cluster gets its own seed spawned from options['rng_seed']
+        radii : iterable
+            The crystal_size_limit of each cluster
+        '''
+        self.arguments = (n, seed_shape, spawn_shape, padSize)
+        self.options = dict(options)
+        self.radii = list(radii)
+        self.clusters = [None] * len(self.radii)
+
+        ### Independent seeds, so clusters sharing an rng_seed do not share a random stream
+        rng_seed = self.options.pop('rng_seed', None)
+        self.seeds = np.random.SeedSequence(rng_seed).spawn(len(self.radii)) if rng_seed is not None else [None] * len(self.radii)
+
+    def __len__(self):
+        return len(self.radii)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if self.clusters[index] is None:
+            self.clusters[index] = Application(*self.arguments, self.radii[index], rng_seed=self.seeds[index], **self.options)
+
+        return self.clusters[index]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def built(self):
+        '''Returns the number of clusters constructed so far.'''
+        return sum(cluster is not None for cluster in self.clusters)
+
 
 class Fractal_Dimension():
     '''
     Calculates the Hausdorff dimension H_d of a 2D DLA cluster and plots a log-log mass vs. radius graph 
     '''
 
-    def __init__(self, n, seed_shape, spawn_shape, padSize):
+    def __init__(self, n, seed_shape, spawn_shape, padSize=50, radii=range(2, 180, 2), lazy=False, **options):
+        '''
+        Creates one cluster for each radius in the schedule.
+
+        Parameters
+        ----------
+        n, seed_shape, spawn_shape, padSize
+            Passed to each Application
+        radii : iterable
+            The crystal_size_limit of each cluster, i.e. the radius schedule of the ensemble
+        lazy : bool
+            Whether clusters are only described (see Lazy_Clusters) and constructed when first analysed, rather than all constructed now
+        options
+            Keyword arguments passed to each Application, e.g. engine, or rng_seed, from which a separate seed is spawned for each cluster
         '''
-        Adjust parameters accordingly and set range of for loop to determine number of iterations
+        self.radii = list(radii)
+        self.clusters = Lazy_Clusters(n, seed_shape, spawn_shape, padSize, self.radii, options)
+        if not lazy:
+            self.clusters = list(self.clusters)
+
+        ### Fit of ln(mass) against ln(radius) across the grown clusters, see grow()
+        self.fit = Online_Fit()
+
+    def grow(self, target=None, run_target=None, z=1.96, min_clusters=5, max_sweeps=None):
         '''
-        self.clusters = [Application(n, seed_shape, spawn_shape, 50, run) for run in range(2, 180, 2)]
+        Grows the clusters headless in order, refitting ln(mass) against ln(radius) across the ensemble after each one. Once the half-width of
+        the dimension's confidence interval falls below target, the remaining clusters are dropped (and, if lazy, never constructed).
+
+        Parameters
+        ----------
+        target : float or None
+            Half-width of the ensemble's confidence interval at which to stop, or None to grow every cluster
+        run_target : float or None
+            If given, each cluster also stops growing once its own dimension estimate has converged this far (see grow_until_converged)
+        z : float
+            Standard errors in each half-width (1.96 for 95%)
+        min_clusters : int
+            The fewest clusters grown before stopping
+        max_sweeps : int or None
+            Passed to Application.grow when run_target is None
+
+        Returns
+        -------
+        fit : Online_Fit
+            The ensemble fit, whose slope is the Hausdorff dimension
+        '''
+        ### The fit is rebuilt from every cluster, so calling grow() again (e.g. with a tighter target) does not count clusters twice
+        self.fit = Online_Fit()
+
+        for index, cluster in enumerate(self.clusters):
+            if run_target is None:
+                cluster.grow(max_sweeps)
+            else:
+                grow_until_converged(cluster, run_target, z)
+
+            radius = cluster.max_radius()
+            if radius > 0:
+                self.fit.add(math.log(radius), math.log(len(cluster.crystal_position)))
+
+            if target is not None and index + 1 >= min_clusters and self.fit.half_width(z) < target:
+                self.clusters = self.clusters[:index + 1]
+                self.radii = self.radii[:index + 1]
+                break
+
+        return self.fit
+
+    def dimension(self, weights='mass', window=None, resamples=2000, level=0.95, rng_seed=None):
+        '''
+        Fits the Hausdorff dimension across the clusters with a bootstrap confidence interval, see bootstrap_dimension.
+
+        Parameters
+        ----------
+        weights, window, resamples, level, rng_seed
+            Passed to bootstrap_dimension
+
+        Returns
+        -------
+        result : dict
+            The output of bootstrap_dimension
+        '''
+        mass = [len(cluster.crystal_position) for cluster in self.clusters]
+        radius = [cluster.max_radius() for cluster in self.clusters]
+
+        return bootstrap_dimension(radius, mass, weights, window, resamples, level, rng_seed)
         
     def cluster_mass(self):
         '''
@@ -82,6 +315,115 @@ class Fractal_Dimension():
         return max_radius_list, logRadius_list
 
 
+def fit_sums(radius, mass, weights=None, window=None):
+    '''
+    Weighted sums from which least squares fits of ln(mass) against ln(radius) are solved, for each point (1D input) or each ensemble member
+    (2D input, one row of points per member, with nan for missing points).
+
+    Parameters
+    ----------
+    radius, mass : array_like
+        Radii and masses, (points,) or (members, points)
+    weights : array_like, str or None
+        Weight of each point, 'mass' for inverse-variance weights under Poisson counting errors (the variance of ln(mass) is ~1/mass),
+        or None for an unweighted fit
+    window : tuple or None
+        (smallest, largest) radius of the scaling window fitted, either end None for no limit
+
+    Returns
+    -------
+    sums : np.ndarray
+        (units, 5) array of the sums of w, w*x, w*y, w*x*x and w*x*y for each point or member, with x = ln(radius) and y = ln(mass)
+    '''
+    radius = np.asarray(radius, dtype=np.float64)
+    mass = np.asarray(mass, dtype=np.float64)
+    if weights is None:
+        weights = np.ones_like(radius)
+    elif isinstance(weights, str) and weights == 'mass':
+        weights = mass.copy()
+    else:
+        weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), radius.shape).copy()
+
+    ### Points outside the window (or missing, or of zero radius or mass) get no weight
+    smallest, largest = (None, None) if window is None else window
+    keep = np.isfinite(radius) & np.isfinite(mass) & (radius > 0) & (mass > 0)
+    if smallest is not None:
+        keep &= radius >= smallest
+    if largest is not None:
+        keep &= radius <= largest
+
+    weights = np.where(keep, weights, 0.0)
+    x = np.log(np.where(keep, radius, 1.0))
+    y = np.log(np.where(keep, mass, 1.0))
+
+    sums = np.stack([weights, weights*x, weights*y, weights*x*x, weights*x*y], axis=-1)
+    return sums.reshape(-1, 5) if sums.ndim == 2 else sums.sum(axis=1)
+
+
+def solve_fits(sums):
+    '''
+    Solves the weighted least squares fits of any number of sets of sums at once.
+
+    Parameters
+    ----------
+    sums : np.ndarray
+        (..., 5) array of summed w, w*x, w*y, w*x*x and w*x*y
+
+    Returns
+    -------
+    slope, intercept : np.ndarray
+        The fitted lines, nan where the x values do not vary
+    '''
+    w, wx, wy, wxx, wxy = np.moveaxis(sums, -1, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        determinant = w*wxx - wx**2
+        slope = np.where(determinant > 1e-12 * w**2, (w*wxy - wx*wy) / determinant, np.nan)
+        intercept = (wy - slope*wx) / w
+
+    return slope, intercept
+
+
+def bootstrap_dimension(radius, mass, weights=None, window=None, resamples=2000, level=0.95, rng_seed=None):
+    '''
+    Fits the Hausdorff dimension (the slope of ln(mass) against ln(radius)) over a scaling window by weighted least squares, with a percentile
+    bootstrap confidence interval. Points (1D input) or ensemble members (2D input) are resampled with replacement as one (resamples, units)
+    index array, and every refit is solved at once from per-unit sums, so thousands of refits take milliseconds.
+
+    Parameters
+    ----------
+    radius, mass, weights, window
+        See fit_sums
+    resamples : int
+        The number of bootstrap refits
+    level : float
+        Confidence level of the interval
+    rng_seed : int or None
+        Seed for the resampling
+
+    Returns
+    -------
+    result : dict
+        'dimension' and 'intercept' of the fit to all the data, the bootstrap 'std_error', the (low, high) 'interval', 'units' resampled and
+        the 'resamples' slopes
+    '''
+    sums = fit_sums(radius, mass, weights, window)
+    slope, intercept = solve_fits(sums.sum(axis=0))
+
+    rng = np.random.default_rng(rng_seed)
+    indices = rng.integers(0, len(sums), (resamples, len(sums)))
+
+    ### Each resample's sums are its count of each unit times that unit's sums, so all refits are one matrix product
+    offsets = len(sums) * np.arange(resamples)[:, None]
+    counts = np.bincount((indices + offsets).ravel(), minlength=resamples * len(sums)).reshape(resamples, len(sums))
+    slopes, _ = solve_fits(counts @ sums)
+
+    tail = 100 * (1 - level) / 2
+    low, high = np.nanpercentile(slopes, [tail, 100 - tail]) if np.isfinite(slopes).any() else (np.nan, np.nan)
+
+    return {'dimension': float(slope), 'intercept': float(intercept), 'std_error': float(np.nanstd(slopes, ddof=1)) if np.isfinite(slopes).sum() > 1 else np.nan,
+            'interval': (float(low), float(high)), 'units': len(sums), 'resamples': slopes}
+
+
 def print_save_results(test):
     '''
     Prints the lists of interests (optional) and creates a pandas DataFrame to store and save lists.
@@ -93,6 +435,7 @@ def print_save_results(test):
     # print("List of crystal radii: ", max_radius_list)
     # print("List of ln(radius): ", logRadius_list)
 
+    import pandas as pd
     df = pd.DataFrame({'mass': mass_list, 'radius': max_radius_list, 'ln(mass)': logMass_list, 'ln(radius)': logRadius_list})
     # df.to_pickle("Fractal Dimension Circle")
 
@@ -112,6 +455,7 @@ def plot_frac_dim():
     slope : float
         The slope of the log-log plot, representing the value of the Hausdorff dimension H_d
     '''
+    import pandas as pd
     df = pd.read_pickle("Fractal Dimension Square")
     logRadius_list = np.log(df['radius'])
     df['ln(radius)2'] = logRadius_list
@@ -121,6 +465,8 @@ def plot_frac_dim():
     slope_func = np.poly1d(slope)
 
     ### Plot ln(mass) against ln(radius)
+    import matplotlib.pyplot as plt
+    plt.style.use('seaborn-v0_8-whitegrid')
     fig = plt.figure()
     ax = fig.add_subplot(111)
 
@@ -0,0 +1,249 @@
+import math
+import numpy as np
+
+
+class Spatial_Hash():
+    '''Uniform grid of square cells used to find the attached particles near a point without checking every particle in the cluster.'''
+
+    def __init__(self, cell_size):
+        '''
+        Creates an empty hash grid.
+
+        Parameters
+        ----------
+        cell_size : float
+            The side length of each grid cell
+        '''
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def cell(self, x, y):
+        '''Returns the (i, j) index of the cell containing the point (x, y).'''
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def insert(self, x, y):
+        '''
+        Adds a particle to the cell containing its centre.
+
+        Parameters
+        ----------
+        x, y : float
+            Co-ordinates of the particle centre
+        '''
+        self.cells.setdefault(self.cell(x, y), []).append((x, y))
+
+    def near(self, x, y):
+        '''
+        Returns the (x, y) centres of all particles in the 3 x 3 block of cells around the point (x, y). Every particle within cell_size of the point is included.
+
+        Parameters
+        ----------
+        x, y : float
+            Co-ordinates of the query point
+        '''
+        i, j = self.cell(x, y)
+        found = []
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                found.extend(self.cells.get((i + di, j + dj), ()))
+
+        return found
+
+
+class Off_Lattice():
+    '''
+    Off-lattice (continuous space) DLA in 2D. Particles of finite diameter are launched one at a time from a circle around the cluster and take Gaussian steps, as in Variable_Step,
+    until they touch an attached particle. The first point of contact along each step is found exactly, using a Spatial_Hash of the attached particles.
+    Walkers with no particle nearby jump straight onto the largest circle around them that cannot touch the cluster, so only steps close to the cluster are Gaussian.
+
+    Methods
+    -------
+    __init__
+        Constructor method, sets class variables and places the seed particle at the origin
+
+    launch
+        Returns a random starting position on the launch circle
+
+    contact
+        Finds the first attached particle hit along a step
+
+    add_particle
+        Walks one particle from the launch circle until it sticks to the cluster
+
+    grow
+        Adds particles until the cluster reaches the requested mass or size
+    '''
+
+    def __init__(self, n, diameter=1.0, step_size=None, crystal_size_limit=None, launch_pad=5, kill_factor=3, rng_seed=None):
+        '''
+        Initialise the parameters every time an instance of the class is called.
+
+        Parameters
+        ----------
+        n : int
+            The number of particles in the finished cluster (including the seed)
+        diameter : float
+            The diameter of every particle
+        step_size : float or None
+            Standard deviation of each Cartesian component of a Gaussian step, taken near the cluster. Defaults to diameter/4
+        crystal_size_limit : float or None
+            The maximum radius of the DLA cluster allowed before growth stops, or None for no limit
+        launch_pad : float
+            Distance (in diameters) between the cluster radius and the launch circle
+        kill_factor : float
+            Walkers further than kill_factor times the launch radius from the seed are relaunched
+        rng_seed : int or None
+            Seed for the NumPy generator used for every step
+        '''
+        self.n = n
+        self.diameter = diameter
+        self.step_size = diameter/4 if step_size is None else step_size
+        self.crystal_size_limit = crystal_size_limit
+        self.launch_pad = launch_pad
+        self.kill_factor = kill_factor
+        self.rng = np.random.default_rng(rng_seed)
+
+        ### Seed particle at the origin. start_x and start_y mirror Application, so Fractal_Dimension can analyse either engine
+        self.start_x, self.start_y = 0.0, 0.0
+        self.positions = np.zeros((n, 2))
+        self.mass = 1
+        self.max_radius = 0.0
+
+        ### Cells are two diameters wide: a step is never longer than one diameter, so every particle it could touch is in the 3 x 3 block around its start
+        self.grid = Spatial_Hash(2 * diameter)
+        self.grid.insert(0.0, 0.0)
+
+        ### Number of walker steps taken, across all particles
+        self.steps = 0
+
+    @property
+    def crystal_position(self):
+        '''List of (x, y) centres of the attached particles, in order of attachment.'''
+        return [tuple(position) for position in self.positions[:self.mass]]
+
+    def launch(self):
+        '''
+        Returns a random starting position on the launch circle.
+
+        Returns
+        -------
+        x, y : float
+            Co-ordinates of the launched walker
+        '''
+        radius = self.max_radius + self.launch_pad * self.diameter
+        theta = self.rng.random() * 2 * math.pi
+
+        return radius * math.cos(theta), radius * math.sin(theta)
+
+    def contact(self, x, y, dx, dy, near):
+        '''
+        Finds the first attached particle hit by a walker moving from (x, y) to (x + dx, y + dy).
+
+        Parameters
+        ----------
+        x, y : float
+            Starting position of the walker
+        dx, dy : float
+            The step, no longer than one diameter
+        near : list
+            Centres of the attached particles near (x, y), from Spatial_Hash.near
+
+        Returns
+        -------
+        t : float or None
+            Fraction of the step taken before contact, or None if the step touches nothing
+        '''
+        d2 = self.diameter**2
+        a = dx*dx + dy*dy
+        t_min = None
+
+        for px, py in near:
+            ### Solve |(x, y) + t (dx, dy) - c| = diameter for the smaller root t
+            cx = x - px
+            cy = y - py
+            b = dx*cx + dy*cy
+            c = cx*cx + cy*cy - d2
+            disc = b*b - a*c
+
+            if b < 0 and disc >= 0:
+                t = (-b - math.sqrt(disc)) / a
+                if t <= 1 and (t_min is None or t < t_min):
+                    t_min = max(t, 0.0)
+
+        return t_min
+
+    def add_particle(self):
+        '''Walks one particle from the launch circle until it sticks to the cluster, then records it.'''
+
+        x, y = self.launch()
+        sigma = self.step_size
+
+        while True:
+            r = math.sqrt(x*x + y*y)
+            launch_radius = self.max_radius + self.launch_pad * self.diameter
+
+            if r > self.kill_factor * launch_radius:
+                x, y = self.launch()
+                continue
+
+            ### Largest circle around the walker that cannot touch the cluster: from the cluster radius when far away, otherwise from the
+            ### nearest particle in the hash grid (anything outside the 3 x 3 block of cells is at least one cell away)
+            gap = r - self.max_radius - self.diameter
+            near = None
+            if gap <= self.grid.cell_size:
+                near = self.grid.near(x, y)
+                nearest = self.grid.cell_size
+                for px, py in near:
+                    nearest = min(nearest, math.sqrt((x - px)**2 + (y - py)**2))
+                gap = nearest - self.diameter
+
+            ### The first exit point of a Brownian path from a circle is uniform, so jump straight onto that circle
+            if gap > sigma:
+                phi = self.rng.random() * 2 * math.pi
+                x += gap * math.cos(phi)
+                y += gap * math.sin(phi)
+                self.steps += 1
+                continue
+
+            ### Close to the cluster, take a Gaussian step (truncated to one diameter) and test it for contact
+            dx, dy = sigma * self.rng.standard_normal(2)
+            length = math.sqrt(dx*dx + dy*dy)
+            if length > self.diameter:
+                dx, dy = dx * self.diameter/length, dy * self.diameter/length
+
+            ### Particles near the walker's current position, found afresh for every step (sigma may exceed a cell)
+            if near is None:
+                near = self.grid.near(x, y)
+
+            self.steps += 1
+            t = self.contact(x, y, dx, dy, near)
+
+            if t is None:
+                x += dx
+                y += dy
+                continue
+
+            x += t * dx
+            y += t * dy
+            break
+
+        self.positions[self.mass] = x, y
+        self.grid.insert(x, y)
+        self.mass += 1
+        self.max_radius = max(self.max_radius, math.sqrt(x*x + y*y))
+
+    def grow(self):
+        '''Adds particles until the cluster has n particles, or its radius exceeds crystal_size_limit.'''
+
+        while self.mass < self.n:
+            if self.crystal_size_limit is not None and self.max_radius > self.crystal_size_limit:
+                break
+
+            self.add_particle()
+
+
+if __name__ == '__main__':
+    ### Form: Off_Lattice(n, diameter=1.0, step_size=None, crystal_size_limit=None, launch_pad=5, kill_factor=3, rng_seed=None)
+    test = Off_Lattice(5000)
+    test.grow()
+    print(f"{test.mass} particles attached after {test.steps} steps, with a maximum radius of {test.max_radius}.")
@@ -0,0 +1,384 @@
+import math
+import time
+import queue
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from walker_kernel import DIRECTIONS
+
+
+class Shared_Lattice():
+    '''Square uint8 occupancy lattice held in multiprocessing.shared_memory, so several processes can read the same cluster without copying it.'''
+
+    def __init__(self, size, name=None):
+        '''
+        Creates a new zeroed lattice, or attaches to an existing one by name.
+
+        Parameters
+        ----------
+        size : int
+            The side length of the lattice in pixels
+        name : str or None
+            Name of an existing shared memory block to attach to, or None to create one
+        '''
+        self.size = size
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size*size)
+        self.name = self.shm.name
+        self.array = np.ndarray((size, size), dtype=np.uint8, buffer=self.shm.buf)
+
+        if self.owner:
+            self.array[:] = 0
+
+    def close(self):
+        '''Detaches from the shared memory block, and frees it if this process created it.'''
+        del self.array
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class Walker_Group():
+    '''
+    A group of walkers driven by one worker process. Walkers move on the shared lattice (read only) and freeze when they touch the cluster,
+    proposing the site they are on; the coordinator decides which proposals are committed.
+    '''
+
+    def __init__(self, lattice, n, centre, rng_seed):
+        '''
+        Parameters
+        ----------
+        lattice : np.ndarray
+            The shared occupancy lattice
+        n : int
+            The number of walkers in the group
+        centre : int
+            Lattice index of the seed centre, in both directions
+        rng_seed : int or np.random.SeedSequence
+            Seed for this group's NumPy generator
+        '''
+        self.lattice = lattice
+        self.n = n
+        self.centre = centre
+        self.rng = np.random.default_rng(rng_seed)
+        self.positions = np.zeros((n, 2), dtype=np.int64)
+        self.frozen = np.zeros(n, dtype=bool)
+        self.steps = 0
+
+    def launch(self, index, radius):
+        '''
+        Places the walkers in index at random points on the launch circle.
+
+        Parameters
+        ----------
+        index : np.ndarray
+            Indices of the walkers to launch
+        radius : float
+            The radius of the launch circle
+        '''
+        theta = self.rng.random(len(index)) * 2 * math.pi
+        self.positions[index, 0] = self.centre + (radius * np.cos(theta)).astype(np.int64)
+        self.positions[index, 1] = self.centre + (radius * np.sin(theta)).astype(np.int64)
+
+    def commit(self, relaunched, radius):
+        '''
+        Relaunches the walkers whose proposals have been resolved, so every walker is free to walk again.
+
+        Parameters
+        ----------
+        relaunched : np.ndarray
+            Indices of the walkers to relaunch
+        radius : float
+            The radius of the launch circle
+        '''
+        self.launch(relaunched, radius)
+        self.frozen[:] = False
+
+    def run(self, sweeps, radius):
+        '''
+        Moves all unfrozen walkers for a number of sweeps, freezing each one as it touches the cluster.
+
+        Parameters
+        ----------
+        sweeps : int
+            The number of sweeps over the group
+        radius : float
+            The radius of the launch circle; walkers beyond twice this are relaunched
+
+        Returns
+        -------
+        proposals : np.ndarray
+            (k, 3) int64 array of (walker index, x, y) for each walker touching the cluster, in the order they froze
+        '''
+        proposals = []
+        kill2 = (2 * radius)**2
+
+        for s in range(sweeps):
+            active = np.flatnonzero(~self.frozen)
+            if len(active) == 0:
+                break
+
+            old = self.positions[active]
+            new = old + DIRECTIONS[self.rng.integers(0, len(DIRECTIONS), len(active))]
+            self.steps += len(active)
+
+            ### Relaunch walkers that have wandered beyond the kill circle
+            killed = ((new - self.centre)**2).sum(axis=1) > kill2
+            self.positions[active] = new
+            self.launch(active[killed], radius)
+            new = self.positions[active]
+
+            ### Moves onto the cluster are rejected
+            blocked = self.lattice[new[:, 0], new[:, 1]] == 1
+            new[blocked] = old[blocked]
+            self.positions[active] = new
+
+            ### Contact with any of the 8 neighbours freezes the walker on its (free) site
+            touching = np.zeros(len(active), dtype=bool)
+            for dx, dy in DIRECTIONS:
+                touching |= self.lattice[new[:, 0] + dx, new[:, 1] + dy] == 1
+            touching &= self.lattice[new[:, 0], new[:, 1]] == 0
+
+            if touching.any():
+                self.frozen[active[touching]] = True
+                proposals.append(np.column_stack((active[touching], new[touching])))
+
+        if not proposals:
+            return np.empty((0, 3), dtype=np.int64)
+
+        return np.concatenate(proposals)
+
+
+def _worker(name, size, n, centre, rng_seed, commands, results):
+    '''
+    Worker process loop: attaches to the shared lattice and runs its Walker_Group for each command received.
+
+    Parameters
+    ----------
+    name : str
+        Name of the shared memory block holding the lattice
+    size : int
+        The side length of the lattice
+    n, centre, rng_seed
+        Passed to Walker_Group
+    commands : multiprocessing.Queue
+        Receives (relaunched, sweeps, radius) tuples, or None to exit
+    results : multiprocessing.Queue
+        Receives the proposals of each run
+    '''
+    lattice = Shared_Lattice(size, name=name)
+    group = Walker_Group(lattice.array, n, centre, rng_seed)
+
+    try:
+        while True:
+            command = commands.get()
+            if command is None:
+                break
+
+            relaunched, sweeps, radius = command
+            group.commit(relaunched, radius)
+            results.put((group.run(sweeps, radius), group.steps))
+    finally:
+        del group
+        lattice.close()
+
+
+class Parallel_Growth():
+    '''
+    Grows one 2D DLA cluster with several worker processes sharing a single occupancy lattice in shared memory.
+    Growth proceeds in rounds: every worker walks its own walkers for a number of sweeps against the current cluster, freezing those that touch it,
+    then the coordinator commits the proposed sites in a fixed order, rejecting any site already taken earlier in the round.
+    As the rounds are synchronous, a fixed rng_seed grows the same cluster whatever the number of processes.
+
+    Methods
+    -------
+    __init__
+        Constructor method, sets class variables
+
+    collect
+        Waits for the workers' replies to a round, raising if a worker has died
+
+    grow
+        Runs rounds until the cluster exceeds crystal_size_limit
+    '''
+
+    def __init__(self, n, padSize, crystal_size_limit, workers=4, processes=True, sweeps_per_round=20, rng_seed=None, round_timeout=None):
+        '''
+        Parameters
+        ----------
+        n : int
+            The number of walkers per worker
+        padSize : int
+            Distance between the cluster radius and the launch circle
+        crystal_size_limit : int
+            The maximum size of the DLA cluster allowed before the simulation exits
+        workers : int
+            The number of walker groups
+        processes : bool
+            Whether each walker group runs in its own process (True), or all run in this process (False, useful for debugging)
+        sweeps_per_round : int
+            The number of sweeps each worker makes between commits
+        rng_seed : int or None
+            Seed from which each worker's generator is spawned
+        round_timeout : float or None
+            The most seconds to wait for a worker's proposals in one round, or None to wait as long as the worker is alive
+        '''
+        self.n = n
+        self.padSize = padSize
+        self.crystal_size_limit = crystal_size_limit
+        self.workers = workers
+        self.processes = processes
+        self.sweeps_per_round = sweeps_per_round
+        self.round_timeout = round_timeout
+        self.seeds = np.random.SeedSequence(rng_seed).spawn(workers)
+
+        ### The lattice holds the kill circle (twice the launch radius) of the largest cluster, plus a border for the neighbour lookups
+        self.centre = 2 * (crystal_size_limit + padSize) + 2
+        self.size = 2 * self.centre + 1
+        self.start_x = self.start_y = self.centre
+
+        self.crystal_position = []
+        self.max_radius = 0.0
+        self.rounds = 0
+        self.steps = 0
+        self.conflicts = 0
+        self.isRunning = True
+
+    def launch_radius(self):
+        '''Returns the radius of the launch circle.'''
+        return self.max_radius + self.padSize
+
+    def resolve(self, proposals):
+        '''
+        Commits proposed sites to the lattice in worker then freezing order. A site already taken earlier in the round is a conflict: it is rejected and its walker relaunched.
+
+        Parameters
+        ----------
+        proposals : list
+            (k, 3) arrays of (walker index, x, y) from each worker
+
+        Returns
+        -------
+        relaunched : list
+            Arrays of the walker indices to relaunch (committed or in conflict) for each worker
+        '''
+        relaunched = []
+
+        for worker_proposals in proposals:
+            for walker, x, y in worker_proposals:
+                if self.lattice.array[x, y] == 1:
+                    self.conflicts += 1
+                    continue
+
+                self.lattice.array[x, y] = 1
+                self.crystal_position.append((int(x), int(y)))
+
+                distance = math.sqrt((x - self.centre)**2 + (y - self.centre)**2)
+                self.max_radius = max(self.max_radius, distance)
+
+            relaunched.append(worker_proposals[:, 0])
+
+        if self.max_radius > self.crystal_size_limit:
+            self.isRunning = False
+
+        return relaunched
+
+    def collect(self, results, pool, poll=0.1):
+        '''
+        Waits for the reply of every worker process to the current round, checking while waiting that each is still alive.
+
+        Parameters
+        ----------
+        results : list
+            The result queue of each worker
+        pool : list
+            The worker processes
+        poll : float
+            Seconds between liveness checks
+
+        Returns
+        -------
+        replies : list
+            (proposals, steps) from each worker
+        '''
+        replies = []
+        started = time.perf_counter()
+
+        for index, (result, process) in enumerate(zip(results, pool)):
+            while True:
+                try:
+                    replies.append(result.get(timeout=poll))
+                    break
+                except queue.Empty:
+                    ### A worker that has died (e.g. killed when out of memory, or an exception) will never reply
+                    if not process.is_alive():
+                        raise Exception(f'Worker {index} exited with code {process.exitcode} before replying.')
+                    if self.round_timeout is not None and time.perf_counter() - started > self.round_timeout:
+                        raise Exception(f'Worker {index} did not reply within {self.round_timeout} seconds.')
+
+        return replies
+
+    def grow(self, max_rounds=None):
+        '''
+        Runs rounds of walking and committing until the cluster exceeds crystal_size_limit.
+
+        Parameters
+        ----------
+        max_rounds : int or None
+            The maximum number of rounds, or None for no limit
+        '''
+        self.lattice = Shared_Lattice(self.size)
+        self.lattice.array[self.centre, self.centre] = 1
+
+        ### Every walker is launched before the first round
+        relaunched = [np.arange(self.n) for i in range(self.workers)]
+
+        if self.processes:
+            context = mp.get_context()
+            commands = [context.Queue() for i in range(self.workers)]
+            results = [context.Queue() for i in range(self.workers)]
+            pool = [context.Process(target=_worker, args=(self.lattice.name, self.size, self.n, self.centre, seed, command, result), daemon=True)
+                    for seed, command, result in zip(self.seeds, commands, results)]
+            for process in pool:
+                process.start()
+        else:
+            groups = [Walker_Group(self.lattice.array, self.n, self.centre, seed) for seed in self.seeds]
+
+        try:
+            while self.isRunning and (max_rounds is None or self.rounds < max_rounds):
+                radius = self.launch_radius()
+
+                if self.processes:
+                    for command, worker_relaunched in zip(commands, relaunched):
+                        command.put((worker_relaunched, self.sweeps_per_round, radius))
+                    replies = self.collect(results, pool)
+                    proposals = [reply[0] for reply in replies]
+                    self.steps = sum(reply[1] for reply in replies)
+                else:
+                    for group, worker_relaunched in zip(groups, relaunched):
+                        group.commit(worker_relaunched, radius)
+                    proposals = [group.run(self.sweeps_per_round, radius) for group in groups]
+                    self.steps = sum(group.steps for group in groups)
+
+                relaunched = self.resolve(proposals)
+                self.rounds += 1
+
+        finally:
+            if self.processes:
+                for command in commands:
+                    command.put(None)
+                ### Workers still busy (after a timeout or another worker's failure) are stopped rather than waited for
+                for process in pool:
+                    process.join(timeout=1)
+                    if process.is_alive():
+                        process.terminate()
+                        process.join()
+
+            self.lattice.close()
+
+
+if __name__ == '__main__':
+    ### Form: Parallel_Growth(n, padSize, crystal_size_limit, workers=4, processes=True, sweeps_per_round=20, rng_seed=None)
+    test = Parallel_Growth(200, 10, 100)
+    test.grow()
+    print(f"{len(test.crystal_position)} pixels attached in {test.rounds} rounds ({test.conflicts} conflicts).")
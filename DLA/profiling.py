@@ -0,0 +1,258 @@
+import os
+import sys
+import time
+import argparse
+import importlib
+import threading
+from collections import Counter
+
+
+class Sampler():
+    '''
+    Sampling profiler: a background thread records the Python stack of the profiled thread every interval seconds. Overhead does not depend on
+    the number of function calls, and NumPy calls that release the GIL are still sampled, so the stacks show where wall time goes.
+
+    Methods
+    -------
+    __init__
+        Constructor method, sets the sampling interval
+
+    start, stop
+        Start and stop sampling the calling thread
+
+    report, folded
+        The samples as a ranked report and as folded stacks
+    '''
+
+    def __init__(self, interval=0.005):
+        '''
+        Parameters
+        ----------
+        interval : float
+            Seconds between samples
+        '''
+        self.interval = interval
+        self.stacks = Counter()
+        self.running = False
+
+    def start(self):
+        '''Starts sampling the calling thread.'''
+        self.target = threading.get_ident()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        '''Stops sampling.'''
+        self.running = False
+        self.thread.join()
+
+    def run(self):
+        '''Sampling loop, run on the background thread.'''
+        while self.running:
+            frame = sys._current_frames().get(self.target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+
+            ### Frames of this module are not part of the profiled run
+            stack = [name for name in reversed(stack) if not name.startswith('profiling.py:')]
+            if stack:
+                self.stacks[';'.join(stack)] += 1
+            time.sleep(self.interval)
+
+    def report(self, limit=30):
+        '''
+        Returns
+        -------
+        report : str
+            Functions ranked by the samples in which they were running (self) and on the stack (total)
+        '''
+        total = sum(self.stacks.values())
+        own, inclusive = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for name in set(frames):
+                inclusive[name] += count
+
+        lines = [f'{total} samples every {self.interval} s', '', f'{"self %":>8} {"total %":>8}  function']
+        for name, count in own.most_common(limit):
+            lines.append(f'{100*count/total:8.1f} {100*inclusive[name]/total:8.1f}  {name}')
+
+        return '\n'.join(lines) + '\n'
+
+    def folded(self):
+        '''Returns the samples as folded stacks ("outer;inner count" per line), the input format of flame graph tools such as flamegraph.pl and speedscope.'''
+        return ''.join(f'{stack} {count}\n' for stack, count in sorted(self.stacks.items()))
+
+
+def folded_from_stats(stats):
+    '''
+    Approximates folded stacks from cProfile statistics, which record callers but not whole stacks. Each function's own time is placed under
+    the chain of its most expensive callers, so a flame graph can be drawn from a deterministic profile. Stacks start at the first function
+    entered after profiling began.
+
+    Parameters
+    ----------
+    stats : pstats.Stats
+        The profile
+
+    Returns
+    -------
+    folded : str
+        "outer;inner microseconds" per line
+    '''
+    def name(function):
+        filename, line, function_name = function
+        return f'{os.path.basename(filename)}:{function_name}'
+
+    lines = Counter()
+    for function, (calls, primitive, own, cumulative, callers) in stats.stats.items():
+        if own <= 0:
+            continue
+
+        chain = [function]
+        while callers:
+            caller = max(callers, key=lambda c: callers[c][3] if isinstance(callers[c], tuple) else 0)
+            if caller in chain:
+                break
+            chain.append(caller)
+            callers = stats.stats[caller][4] if caller in stats.stats else {}
+
+        stack = ';'.join(name(f) for f in reversed(chain) if os.path.basename(f[0]) != 'profiling.py')
+        if stack:
+            lines[stack] += int(own * 1e6)
+
+    return ''.join(f'{stack} {count}\n' for stack, count in sorted(lines.items()) if count > 0)
+
+
+class Profiler():
+    '''
+    Context manager profiling the code inside it with cProfile (mode='cprofile') or the Sampler (mode='sampling'). The profile is cumulative:
+    each run inside the context manager adds to the same profile, and dump() writes it next to the results as a ranked hot-function report
+    (output + '.profile.txt') and flame graph folded stacks (output + '.folded'), plus the raw cProfile data (output + '.prof').
+    cProfile and pstats are only imported once profiling starts.
+
+    Methods
+    -------
+    __init__
+        Constructor method, sets the output prefix and mode
+
+    __enter__, __exit__
+        Start and stop profiling one run
+
+    dump
+        Write the files, covering every run so far
+    '''
+
+    def __init__(self, output, mode='cprofile', interval=0.005, limit=30):
+        '''
+        Parameters
+        ----------
+        output : str
+            Path prefix of the files written
+        mode : str
+            'cprofile' (deterministic, every call timed) or 'sampling' (low overhead, exact stacks)
+        interval : float
+            Seconds between samples, for mode='sampling'
+        limit : int
+            The number of functions in the report
+        '''
+        if mode != 'cprofile' and mode != 'sampling':
+            raise Exception('Parameter "mode" must be "cprofile" or "sampling".')
+
+        self.output = output
+        self.mode = mode
+        self.interval = interval
+        self.limit = limit
+        self.runs = 0
+        self.running = False
+        self.profile = None
+        self.sampler = Sampler(interval)
+
+    def __enter__(self):
+        if self.mode == 'cprofile':
+            import cProfile
+            ### One Profile for every run, which accumulates each time it is enabled
+            if self.profile is None:
+                self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            self.sampler.start()
+
+        self.running = True
+        return self
+
+    def __exit__(self, *args):
+        if self.mode == 'cprofile':
+            self.profile.disable()
+        else:
+            self.sampler.stop()
+
+        self.running = False
+        self.runs += 1
+
+    def dump(self):
+        '''Writes the report and folded stacks of every run so far. Writes nothing before the first run, and must be called between runs.'''
+        if self.running:
+            raise Exception('The profile can only be written between runs.')
+        if self.runs == 0:
+            return
+
+        directory = os.path.dirname(self.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        heading = f'Cumulative profile of {self.runs} run{"s" if self.runs > 1 else ""}\n'
+
+        if self.mode == 'cprofile':
+            import pstats
+            self.profile.dump_stats(self.output + '.prof')
+
+            with open(self.output + '.profile.txt', 'w') as file:
+                file.write(heading)
+                stats = pstats.Stats(self.profile, stream=file)
+                stats.sort_stats('tottime').print_stats(self.limit)
+                stats.sort_stats('cumulative').print_stats(self.limit)
+            folded = folded_from_stats(pstats.Stats(self.profile))
+
+        else:
+            with open(self.output + '.profile.txt', 'w') as file:
+                file.write(heading + self.sampler.report(self.limit))
+            folded = self.sampler.folded()
+
+        with open(self.output + '.folded', 'w') as file:
+            file.write(folded)
+
+
+def main(argv=None):
+    '''
+    Command line entry point, profiling any expression without editing code, e.g.
+    python profiling.py --output results/dla "dla_simulation:Application(200, 'dot', 'circle', 20, 100).grow()"
+    python profiling.py --path ../random-processes/random-walks --mode sampling "variablestep:Variable_Step(1.0, 10000, 100, 1).brownian_2D_vec(plot=False)"
+    From code, use Application.profile(), the profile() context manager of the random-walk classes, or Profiler and its dump() method directly.
+    '''
+    parser = argparse.ArgumentParser(description='Profile a simulation run.')
+    parser.add_argument('target', help='module:expression, evaluated with the module\'s names in scope')
+    parser.add_argument('--output', default='profile', help='path prefix of the report and stack files')
+    parser.add_argument('--mode', default='cprofile', choices=['cprofile', 'sampling'])
+    parser.add_argument('--interval', type=float, default=0.005)
+    parser.add_argument('--path', action='append', default=[], help='directory added to the import path (repeatable)')
+    args = parser.parse_args(argv)
+
+    sys.path[:0] = args.path
+    module_name, expression = args.target.split(':', 1)
+    namespace = vars(importlib.import_module(module_name))
+
+    with Profiler(args.output, args.mode, args.interval) as profiler:
+        eval(expression, dict(namespace))
+    profiler.dump()
+
+    print(f'Wrote {args.output}.profile.txt and {args.output}.folded')
+
+
+if __name__ == '__main__':
+    main()
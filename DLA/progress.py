@@ -0,0 +1,173 @@
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+### Mass-radius scaling exponent of 2D DLA clusters, used to estimate the mass (and so time) remaining until crystal_size_limit
+DLA_DIMENSION = 1.71
+
+
+class Progress_Monitor():
+    '''
+    Observes a growing Application, calling back with a snapshot of its progress each time another `every` pixels have attached, and
+    optionally publishing the latest snapshot on a local Metrics_Server. Application.grow() and Application.on_loop() call update() after each
+    block of sweeps, so callbacks come at the end of the block in which each multiple of `every` is passed. The radius in each snapshot comes
+    from Application.max_radius(), which only measures the pixels attached since it was last called.
+
+    Methods
+    -------
+    __init__
+        Constructor method, sets the callbacks and starts the metrics server
+
+    snapshot
+        Returns the current mass, radius, throughput and ETA of a run
+
+    update
+        Calls back if another `every` pixels have attached since the last call back
+
+    close
+        Stops the metrics server
+    '''
+
+    def __init__(self, callbacks=(), every=100, port=None, host='127.0.0.1'):
+        '''
+        Parameters
+        ----------
+        callbacks : iterable
+            Functions called with each snapshot dict
+        every : int
+            The number of attachments between call backs
+        port : int or None
+            Port of the local HTTP metrics endpoint (0 for any free port), or None for no endpoint
+        host : str
+            Address the metrics endpoint listens on
+        '''
+        self.callbacks = list(callbacks)
+        self.every = every
+        self.next = every
+        self.started = time.perf_counter()
+        self.server = None if port is None else Metrics_Server(port, host)
+
+    def snapshot(self, app):
+        '''
+        Parameters
+        ----------
+        app : Application
+            The run being observed
+
+        Returns
+        -------
+        snapshot : dict
+            Mass, radius, crystal_size_limit, sweeps, walker steps, elapsed seconds, attachment and step throughput, estimated seconds until
+            crystal_size_limit (None until it can be estimated) and whether the run is still going
+        '''
+        elapsed = time.perf_counter() - self.started
+        mass = len(app.crystal_position)
+        radius = app.max_radius()
+        steps = app.stats.counts['steps']
+        rate = mass / elapsed if elapsed else 0.0
+
+        ### The mass of a DLA cluster grows as radius**DLA_DIMENSION, which gives the mass still to attach
+        eta = None
+        if radius > 0 and rate > 0:
+            remaining = mass * ((app.crystal_size_limit / radius)**DLA_DIMENSION - 1)
+            eta = max(remaining, 0.0) / rate
+
+        return {'mass': mass, 'radius': radius, 'crystal_size_limit': app.crystal_size_limit, 'sweeps': app.sweeps, 'steps': steps,
+                'elapsed_seconds': elapsed, 'attachments_per_second': rate, 'steps_per_second': steps / elapsed if elapsed else 0.0,
+                'eta_seconds': eta, 'running': bool(app.isRunning)}
+
+    def update(self, app):
+        '''
+        Calls back (and publishes) a snapshot if at least `every` more pixels have attached since the last one, or the run has stopped.
+
+        Parameters
+        ----------
+        app : Application
+            The run being observed
+        '''
+        mass = len(app.crystal_position)
+        if mass < self.next and app.isRunning:
+            return
+
+        self.next = (mass // self.every + 1) * self.every
+        snapshot = self.snapshot(app)
+
+        if self.server is not None:
+            self.server.publish(snapshot)
+        for callback in self.callbacks:
+            callback(snapshot)
+
+    def close(self):
+        '''Stops the metrics server, if there is one.'''
+        if self.server is not None:
+            self.server.close()
+
+
+class Metrics_Server():
+    '''
+    Local HTTP endpoint, served from a background thread, exposing the latest progress snapshot for scraping:
+    GET /metrics returns the Prometheus text format, and any other path returns JSON.
+    '''
+
+    def __init__(self, port=0, host='127.0.0.1'):
+        '''
+        Starts serving.
+
+        Parameters
+        ----------
+        port : int
+            Port to listen on, or 0 for any free port (see self.port)
+        host : str
+            Address to listen on
+        '''
+        self.latest = {}
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, content_type = server.prometheus().encode(), 'text/plain; version=0.0.4'
+                else:
+                    body, content_type = json.dumps(server.current()).encode(), 'application/json'
+
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def publish(self, snapshot):
+        '''Replaces the snapshot being served.'''
+        with self.lock:
+            self.latest = dict(snapshot)
+
+    def current(self):
+        '''Returns a copy of the snapshot being served.'''
+        with self.lock:
+            return dict(self.latest)
+
+    def prometheus(self):
+        '''Returns the numeric fields of the snapshot in the Prometheus text format, each prefixed with dla_.'''
+        lines = []
+        for key, value in self.current().items():
+            if isinstance(value, (bool, int, float)) and not (isinstance(value, float) and math.isnan(value)):
+                lines.append(f'dla_{key} {float(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+    def close(self):
+        '''Stops serving and closes the socket.'''
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,103 @@
+import json
+import time
+from contextlib import contextmanager
+
+
+### Phases of a run that are timed, and the events that are counted
+PHASES = ('stepping', 'contact', 'domain', 'rendering')
+COUNTERS = ('steps', 'attachments', 'respawns', 'rejected_sticks')
+
+
+class Run_Stats():
+    '''
+    Performance counters and per-phase timing of a DLA run, readable at any time and dumpable as JSON.
+    Phase timers nest, and each phase is charged only its own (exclusive) time: domain updates made while stepping count as 'domain', not 'stepping'.
+
+    Methods
+    -------
+    __init__
+        Constructor method, zeroes the counters and timers
+
+    timer
+        Context manager charging the time spent inside it to a phase
+
+    as_dict, to_json
+        Snapshot of the counters, derived rates and phase times
+    '''
+
+    def __init__(self, engine=None, detailed=False):
+        '''
+        Parameters
+        ----------
+        engine : str or None
+            Name of the engine being measured, recorded in the output
+        detailed : bool
+            Whether per-step phases (contact testing) are timed, which slows down the 'python' engine. The kernel engines always count contact time as stepping
+        '''
+        self.engine = engine
+        self.detailed = detailed
+        self.counts = {counter: 0 for counter in COUNTERS}
+        self.seconds = {phase: 0.0 for phase in PHASES}
+        self.started = time.perf_counter()
+        self.stack = []
+
+    @contextmanager
+    def timer(self, phase):
+        '''
+        Charges the time spent inside the with block to phase, pausing any enclosing phase.
+
+        Parameters
+        ----------
+        phase : str
+            One of PHASES
+        '''
+        now = time.perf_counter()
+        if self.stack:
+            outer, start = self.stack[-1]
+            self.seconds[outer] += now - start
+        self.stack.append((phase, now))
+
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            phase, start = self.stack.pop()
+            self.seconds[phase] += now - start
+            if self.stack:
+                self.stack[-1] = (self.stack[-1][0], now)
+
+    def as_dict(self):
+        '''
+        Returns
+        -------
+        stats : dict
+            Counters, steps per attachment, step and attachment rates over the time spent stepping, seconds spent in each phase and wall time since creation
+        '''
+        working = self.seconds['stepping'] + self.seconds['contact'] + self.seconds['domain']
+        attachments = self.counts['attachments']
+
+        return {
+            'engine': self.engine,
+            **self.counts,
+            'steps_per_attachment': self.counts['steps'] / attachments if attachments else None,
+            'steps_per_second': self.counts['steps'] / working if working else None,
+            'attachments_per_second': attachments / working if working else None,
+            'seconds': dict(self.seconds),
+            'wall_seconds': time.perf_counter() - self.started,
+        }
+
+    def to_json(self, path=None):
+        '''
+        Returns the output of as_dict() as a JSON string, also writing it to path if one is given.
+
+        Parameters
+        ----------
+        path : str or None
+            File to write the JSON to
+        '''
+        text = json.dumps(self.as_dict(), indent=2)
+        if path is not None:
+            with open(path, 'w') as file:
+                file.write(text)
+
+        return text
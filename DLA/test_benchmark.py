@@ -0,0 +1,39 @@
+from benchmark import run_case, run_suite, compare, main
+import json
+import pytest
+
+def test_run_case():
+    result = run_case('python', 20, 'circle', 'dot', 15, repeats=2)
+    assert result['completed']
+    assert result['attachments'] > 0
+    assert result['steps'] >= 20 * (result['sweeps'] - 1)
+    assert result['steps_per_second'] > 0
+    json.dumps(result)
+
+def test_run_suite_and_compare():
+    grid = {'n': [10, 20], 'spawn_shape': ['square'], 'seed_shape': ['dot'], 'crystal_size_limit': [10]}
+    results = run_suite(grid, max_sweeps=200, isolate=False)
+    assert [case['n'] for case in results['results']] == [10, 20]
+
+    baseline = json.loads(json.dumps(results))
+    baseline['results'][0]['steps_per_second'] *= 2
+    baseline['results'][1]['steps_per_second'] /= 2
+    rows = compare(results, baseline)
+    assert [row['regression'] for row in rows] == [True, False]
+    assert rows[1]['steps_per_second_ratio'] == pytest.approx(2)
+
+def test_main_with_unmeasured_baseline(tmp_path, capsys):
+    ### Cases the baseline lacks, or has no throughput for, are reported without a ratio rather than failing to format
+    baseline = tmp_path / 'baseline.json'
+    arguments = ['--max-sweeps', '20', '--repeats', '1', '--tolerance', '1']
+    assert main(arguments + ['--output', str(baseline)]) == 0
+    data = json.loads(baseline.read_text())
+    data['results'] = data['results'][:2]
+    data['results'][0]['steps_per_second'] = None
+    baseline.write_text(json.dumps(data))
+
+    capsys.readouterr()
+    assert main(arguments + ['--output', str(tmp_path / 'new.json'), '--baseline', str(baseline)]) == 0
+    comparison = capsys.readouterr().out.splitlines()[-2:]
+    assert comparison[0].split()[-1] == '-'
+    assert comparison[1].split()[-1].startswith('x')
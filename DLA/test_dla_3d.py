@@ -0,0 +1,41 @@
+from dla_3d import Application_3D, NEIGHBOURHOODS
+import pytest
+
+@pytest.fixture
+def application():
+    return Application_3D(200, 'dot', 5, 12, rng_seed=5)
+
+def test_application_3d_init(application):
+    assert application.occupied == {(0, 0, 0)}
+    assert len(application.contacts) == 26
+    assert application.crystal_position == []
+    assert application.positions.shape == (200, 3)
+
+def test_invalid_parameters():
+    with pytest.raises(Exception):
+        Application_3D(10, 'star', 5, 12)
+    with pytest.raises(Exception):
+        Application_3D(10, 'dot', 5, 12, contact=8)
+
+@pytest.mark.parametrize('contact', [6, 26])
+def test_grow(contact):
+    application = Application_3D(200, 'dot', 5, 12, contact=contact, rng_seed=5)
+    application.grow()
+    assert not application.isRunning
+    assert application.max_radius > 12
+    assert len(application.occupied) == len(application.crystal_position) + 1
+
+    # Every voxel was attached next to one already in the cluster
+    cluster = {(0, 0, 0)}
+    for x, y, z in application.crystal_position:
+        assert any((x + dx, y + dy, z + dz) in cluster for dx, dy, dz in NEIGHBOURHOODS[contact])
+        cluster.add((x, y, z))
+
+def test_contacts_scale_with_mass(application):
+    application.grow(max_sweeps=200)
+    counts = {}
+    for x, y, z in application.occupied:
+        for dx, dy, dz in NEIGHBOURHOODS[26]:
+            counts[(x + dx, y + dy, z + dz)] = counts.get((x + dx, y + dy, z + dz), 0) + 1
+    assert application.contacts == counts
+    assert len(application.contacts) <= 26 * len(application.occupied)
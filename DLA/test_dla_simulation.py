@@ -1,4 +1,5 @@
 from dla_simulation import Particle, Application
+import walker_kernel
 import pytest
 
 @pytest.fixture
@@ -73,3 +74,74 @@ def test_wrap_around_square(application, particle, new_x, new_y, expected_x, exp
 def test_wrap_around_circle(application, particle):
     application.spawn_shape = 'circle'
     assert application.wrap_around(particle, 100, 150) == (-5, -10)
+
+def test_invalid_engine():
+    with pytest.raises(Exception):
+        Application(10, 'dot', 'square', 30, 50, engine='test')
+
+def test_seed_pixels(application):
+    assert len(application.seed_pixels()) == 101
+    application.seed_shape = 'test'
+    with pytest.raises(Exception):
+        application.seed_pixels()
+
+@pytest.mark.parametrize('spawn_shape', ['square', 'circle'])
+def test_engines_grow_same_cluster(spawn_shape):
+    clusters = []
+    for engine in ['python', 'numba']:
+        app = Application(30, 'line', spawn_shape, 20, 60, engine=engine, rng_seed=5)
+        app.grow(max_sweeps=2000)
+        clusters.append((app.crystal_position, app.sweeps, app.isRunning, app.radius, app.sqdomainMin_x, app.sqdomainMax_y))
+
+    assert len(clusters[0][0]) > 0
+    assert clusters[0] == clusters[1]
+
+def test_uncompiled_kernel_matches_reference(monkeypatch):
+    # Force the NumPy fallback used when Numba is not installed
+    monkeypatch.setitem(walker_kernel._compiled, 'numba', walker_kernel.walk_kernel)
+    clusters = []
+    for engine in ['python', 'numba']:
+        app = Application(30, 'dot', 'square', 20, 60, engine=engine, rng_seed=7)
+        app.grow(max_sweeps=1000)
+        clusters.append(app.crystal_position)
+
+    assert clusters[0] == clusters[1]
+
+def test_stick_table():
+    app = Application(10, 'dot', 'square', 30, 50, contact='von_neumann', stick_coeff=[0.1, 0.2, 0.3, 0.4])
+    assert list(app.stick_table) == [0, 0.1, 0.2, 0.3, 0.4, 0, 0, 0, 0]
+    with pytest.raises(Exception):
+        Application(10, 'dot', 'square', 30, 50, stick_coeff=[0.1, 0.2])
+    with pytest.raises(Exception):
+        Application(10, 'dot', 'square', 30, 50, contact='moore', stick_coeff=[0.1, 0.2])
+
+def test_neighbour_counts_incremental():
+    app = Application(30, 'dot', 'circle', 20, 60, contact='moore', stick_coeff=0.5, rng_seed=3)
+    app.grow(max_sweeps=500)
+    assert len(app.crystal_position) > 1
+    assert (app.neighbours == walker_kernel.neighbour_counts(app.lattice, 8)).all()
+
+@pytest.mark.parametrize('contact, stick_coeff', [
+    ('von_neumann', 0.3),
+    ('moore', [0.05, 0.1, 0.2, 0.4, 0.6, 0.8, 1.0, 1.0])
+])
+def test_engines_grow_same_cluster_with_neighbours(contact, stick_coeff):
+    clusters = []
+    for engine in ['python', 'numba']:
+        app = Application(30, 'dot', 'square', 20, 60, engine=engine, rng_seed=11, contact=contact, stick_coeff=stick_coeff)
+        app.grow(max_sweeps=1000)
+        clusters.append(app.crystal_position)
+
+    assert len(clusters[0]) > 1
+    assert clusters[0] == clusters[1]
+
+def test_rng_seed_reproduces_cluster():
+    ### The seed alone fixes the spawn positions as well as the walk
+    clusters = []
+    for spawn_shape in ['square', 'square', 'circle', 'circle']:
+        app = Application(30, 'dot', spawn_shape, 20, 60, rng_seed=13)
+        app.grow(max_sweeps=500)
+        clusters.append(app.crystal_position)
+
+    assert len(clusters[0]) > 1 and len(clusters[2]) > 1
+    assert clusters[0] == clusters[1] and clusters[2] == clusters[3]
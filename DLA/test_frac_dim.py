@@ -1,21 +1,141 @@
 import pytest
-from frac_dim import Fractal_Dimension
+import numpy as np
+from frac_dim import Fractal_Dimension, Online_Fit, grow_until_converged, fit_sums, solve_fits, bootstrap_dimension
+from dla_simulation import Application
 
 @pytest.fixture
 def fractal():
-    n = 100
+    n = 30
     seed_shape = 'dot'
     spawn_shape = 'square'
-    padSize = 50
-    return Fractal_Dimension(n, seed_shape, spawn_shape, padSize)
+    padSize = 10
+    fractal = Fractal_Dimension(n, seed_shape, spawn_shape, padSize, radii=(3, 5, 7), lazy=True, rng_seed=2)
+    fractal.grow()
+    return fractal
 
 def test_fractal_dimension_init(fractal):
-    assert len(fractal.clusters) == 89
+    assert len(fractal.clusters) == 3
 
 def test_cluster_mass(fractal):
-    assert len(fractal.cluster_mass()[0]) == 89
-    assert len(fractal.cluster_mass()[1]) == 89
+    assert len(fractal.cluster_mass()[0]) == 3
+    assert len(fractal.cluster_mass()[1]) == 3
 
 def test_cluster_radius(fractal):
-    assert len(fractal.cluster_radius()[0]) == 89
-    assert len(fractal.cluster_radius()[1]) == 89
\ No newline at end of file
+    assert len(fractal.cluster_radius()[0]) == 3
+    assert len(fractal.cluster_radius()[1]) == 3
+
+def test_import_is_lazy():
+    ### Headless growth and analysis never load pygame, matplotlib or pandas
+    import os, sys, subprocess
+    code = "import sys, frac_dim; print([m for m in ('pygame', 'matplotlib', 'pandas') if m in sys.modules])"
+    output = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == '[]'
+
+@pytest.fixture
+def miniature():
+    return Fractal_Dimension(20, 'dot', 'square', 10, radii=(3, 6, 9), lazy=True, rng_seed=1)
+
+def test_radius_schedule(miniature):
+    assert len(miniature.clusters) == 3
+    assert [cluster.crystal_size_limit for cluster in miniature.clusters] == [3, 6, 9]
+    assert miniature.clusters[0].n == 20
+
+def test_lazy_construction(miniature):
+    assert miniature.clusters.built() == 0
+    miniature.clusters[1]
+    assert miniature.clusters.built() == 1
+    assert miniature.clusters[1] is miniature.clusters[1]
+
+    miniature.grow()
+    assert miniature.clusters.built() == 3
+    assert len(miniature.cluster_mass()[0]) == 3
+
+def test_eager_construction():
+    fractal = Fractal_Dimension(20, 'dot', 'square', 10, radii=(3, 6))
+    assert isinstance(fractal.clusters, list)
+    assert [cluster.crystal_size_limit for cluster in fractal.clusters] == [3, 6]
+
+def test_online_fit_matches_polyfit():
+    rng = np.random.default_rng(0)
+    x = rng.uniform(1, 5, 50)
+    y = 1.7*x + 0.3 + rng.normal(0, 0.1, 50)
+    fit = Online_Fit()
+    for point in zip(x, y):
+        fit.add(*point)
+
+    (slope, intercept), covariance = np.polyfit(x, y, 1, cov='unscaled')
+    residual = np.sum((y - slope*x - intercept)**2) / (len(x) - 2)
+    assert fit.slope() == pytest.approx(slope)
+    assert fit.intercept() == pytest.approx(intercept)
+    assert fit.std_error() == pytest.approx(np.sqrt(covariance[0, 0] * residual))
+    assert fit.half_width(2) == pytest.approx(2 * fit.std_error())
+
+def test_run_stops_when_converged():
+    cluster = Application(50, 'dot', 'circle', 15, 60, rng_seed=1)
+    fit = grow_until_converged(cluster, target=10, min_points=4, min_radius=2)
+    assert fit.count == 4
+    assert cluster.isRunning
+    assert cluster.max_radius() < 60
+
+def test_ensemble_stops_when_converged():
+    fractal = Fractal_Dimension(30, 'dot', 'circle', 10, radii=(4, 5, 6, 7, 8, 9), lazy=True, rng_seed=1)
+    fit = fractal.grow(target=10, min_clusters=3)
+    assert fit.count == 3
+    assert len(fractal.clusters) == 3 and fractal.radii == [4, 5, 6]
+    assert not any(cluster.isRunning for cluster in fractal.clusters)
+
+@pytest.fixture
+def scaling():
+    rng = np.random.default_rng(0)
+    radius = rng.uniform(2, 150, 200)
+    mass = 3 * radius**1.71 * np.exp(rng.normal(0, 0.05, 200))
+    return radius, mass
+
+def test_weighted_fit_in_window(scaling):
+    radius, mass = scaling
+    keep = (radius >= 10) & (radius <= 100)
+    slope, intercept = solve_fits(fit_sums(radius, mass, 'mass', (10, 100)).sum(axis=0))
+    ### np.polyfit weights multiply the residuals, so they are the square roots of least squares weights
+    expected = np.polyfit(np.log(radius[keep]), np.log(mass[keep]), 1, w=np.sqrt(mass[keep]))
+    assert (slope, intercept) == pytest.approx(tuple(expected))
+
+def test_bootstrap_interval(scaling):
+    result = bootstrap_dimension(*scaling, weights='mass', window=(10, None), resamples=4000, rng_seed=1)
+    assert result['interval'][0] < 1.71 < result['interval'][1]
+    assert result['interval'][1] - result['interval'][0] < 0.1
+    assert len(result['resamples']) == 4000
+    assert bootstrap_dimension(*scaling, rng_seed=1)['interval'] == bootstrap_dimension(*scaling, rng_seed=1)['interval']
+
+def test_bootstrap_over_ensemble_members():
+    rng = np.random.default_rng(2)
+    radius = np.tile(np.arange(5.0, 100.0, 5.0), (30, 1))
+    mass = 3 * radius**1.7 * np.exp(rng.normal(0, 0.05, radius.shape))
+    radius[0, -3:] = np.nan
+    result = bootstrap_dimension(radius, mass, resamples=500, rng_seed=3)
+
+    keep = np.isfinite(radius)
+    assert result['units'] == 30
+    assert result['dimension'] == pytest.approx(np.polyfit(np.log(radius[keep]), np.log(mass[keep]), 1)[0])
+    assert result['interval'][0] < result['dimension'] < result['interval'][1]
+
+def test_ensemble_dimension(miniature):
+    miniature.grow()
+    result = miniature.dimension(resamples=200, rng_seed=0)
+    assert result['units'] == 3
+    assert np.isfinite(result['dimension'])
+
+def test_ensemble_fit_not_double_counted():
+    fractal = Fractal_Dimension(30, 'dot', 'circle', 10, radii=(4, 5, 6), lazy=True, rng_seed=1)
+    first = fractal.grow().slope()
+    fit = fractal.grow()
+    assert fit.count == 3
+    assert fit.slope() == pytest.approx(first)
+
+def test_ensemble_members_seeded_independently():
+    fractal = Fractal_Dimension(30, 'dot', 'circle', 10, radii=(8, 8), lazy=True, rng_seed=1)
+    fractal.grow()
+    assert fractal.clusters[0].crystal_position != fractal.clusters[1].crystal_position
+
+    again = Fractal_Dimension(30, 'dot', 'circle', 10, radii=(8, 8), lazy=True, rng_seed=1)
+    again.grow()
+    assert [cluster.crystal_position for cluster in again.clusters] == [cluster.crystal_position for cluster in fractal.clusters]
@@ -0,0 +1,53 @@
+from offlattice import Spatial_Hash, Off_Lattice
+import numpy as np
+import pytest
+
+@pytest.fixture
+def cluster():
+    cluster = Off_Lattice(150, diameter=1.0, rng_seed=5)
+    cluster.grow()
+    return cluster
+
+def test_spatial_hash():
+    grid = Spatial_Hash(2.0)
+    grid.insert(0.5, 0.5)
+    grid.insert(3.9, -1.5)
+    grid.insert(10.0, 10.0)
+    assert grid.cell(3.9, -1.5) == (1, -1)
+    assert sorted(grid.near(2.1, 0.0)) == [(0.5, 0.5), (3.9, -1.5)]
+    assert grid.near(-5.0, -5.0) == []
+
+def test_contact():
+    cluster = Off_Lattice(10)
+    near = cluster.grid.near(-2.0, 0.0)
+    assert cluster.contact(-2.0, 0.0, 0.5, 0.0, near) is None
+    assert cluster.contact(-2.0, 0.0, 1.0, 0.0, near) == pytest.approx(1.0)
+    assert cluster.contact(-1.5, 0.0, 1.0, 0.0, near) == pytest.approx(0.5)
+    assert cluster.contact(-1.5, 0.0, -1.0, 0.0, near) is None
+
+def test_grow(cluster):
+    assert cluster.mass == 150
+    assert len(cluster.crystal_position) == 150
+    assert sum(len(cell) for cell in cluster.grid.cells.values()) == 150
+
+def test_particles_touch_without_overlap(cluster):
+    distances = np.sqrt(((cluster.positions[:, None, :] - cluster.positions[None, :, :])**2).sum(axis=2))
+    np.fill_diagonal(distances, np.inf)
+    assert distances.min() == pytest.approx(1.0)
+    # Each particle touches at least one particle attached before it
+    for i in range(1, cluster.mass):
+        assert distances[i, :i].min() == pytest.approx(1.0)
+
+def test_crystal_size_limit():
+    cluster = Off_Lattice(10000, crystal_size_limit=5, rng_seed=5)
+    cluster.grow()
+    assert cluster.mass < 10000
+    assert cluster.max_radius > 5
+
+def test_large_step_size():
+    cluster = Off_Lattice(50, step_size=5.0, rng_seed=1)
+    cluster.grow()
+    assert cluster.mass == 50
+    distances = np.sqrt(((cluster.positions[:, None, :] - cluster.positions[None, :, :])**2).sum(axis=2))
+    np.fill_diagonal(distances, np.inf)
+    assert distances.min() == pytest.approx(1.0)
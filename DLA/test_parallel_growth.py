@@ -0,0 +1,66 @@
+from parallel_growth import Shared_Lattice, Walker_Group, Parallel_Growth
+from walker_kernel import DIRECTIONS
+import os
+import time
+import multiprocessing as mp
+import numpy as np
+import pytest
+
+def test_shared_lattice():
+    lattice = Shared_Lattice(11)
+    view = Shared_Lattice(11, name=lattice.name)
+    lattice.array[5, 5] = 1
+    assert view.array[5, 5] == 1
+    assert view.array.sum() == 1
+    view.close()
+    lattice.close()
+
+def test_walker_group_proposals_touch_cluster():
+    lattice = np.zeros((41, 41), dtype=np.uint8)
+    lattice[20, 20] = 1
+    group = Walker_Group(lattice, 50, 20, 5)
+    group.commit(np.arange(50), 5)
+    proposals = group.run(200, 5)
+    assert len(proposals) > 0
+    assert group.frozen[proposals[:, 0]].all()
+    for walker, x, y in proposals:
+        assert lattice[x, y] == 0
+        assert any(lattice[x + dx, y + dy] for dx, dy in DIRECTIONS)
+
+def test_processes_grow_same_cluster():
+    clusters = []
+    for processes in [False, True]:
+        growth = Parallel_Growth(100, 5, 20, workers=2, processes=processes, rng_seed=5)
+        growth.grow()
+        clusters.append((growth.crystal_position, growth.rounds, growth.conflicts))
+
+    assert clusters[0] == clusters[1]
+    assert len(set(clusters[0][0])) == len(clusters[0][0])
+
+def test_cluster_is_connected():
+    growth = Parallel_Growth(100, 5, 20, workers=3, processes=False, rng_seed=5)
+    growth.grow()
+    assert growth.max_radius > 20
+    cluster = {(growth.centre, growth.centre)}
+    for x, y in growth.crystal_position:
+        assert any((x + dx, y + dy) in cluster for dx, dy in DIRECTIONS)
+        cluster.add((x, y))
+
+def test_dead_worker_raises(monkeypatch):
+    if mp.get_start_method() != 'fork':
+        pytest.skip('workers only inherit the patched method when forked')
+
+    ### A worker that exits without replying stops the run instead of leaving the coordinator waiting forever
+    monkeypatch.setattr('parallel_growth.Walker_Group.run', lambda self, sweeps, radius: os._exit(3))
+    growth = Parallel_Growth(10, 5, 20, workers=2, rng_seed=5)
+    with pytest.raises(Exception, match='exited with code 3'):
+        growth.grow()
+
+def test_slow_worker_times_out(monkeypatch):
+    if mp.get_start_method() != 'fork':
+        pytest.skip('workers only inherit the patched method when forked')
+
+    monkeypatch.setattr('parallel_growth.Walker_Group.run', lambda self, sweeps, radius: time.sleep(60))
+    growth = Parallel_Growth(10, 5, 20, workers=2, rng_seed=5, round_timeout=0.5)
+    with pytest.raises(Exception, match='did not reply'):
+        growth.grow()
@@ -0,0 +1,70 @@
+from profiling import Profiler, main
+from dla_simulation import Application
+import os
+import pytest
+
+def grow(tmp_path, mode):
+    app = Application(30, 'line', 'square', 20, 60, rng_seed=11)
+    app.profile(str(tmp_path / 'results' / 'run'), mode, interval=0.001)
+    app.grow(max_sweeps=100)
+    app.profile(None)
+    return tmp_path / 'results'
+
+def test_cprofile_report_and_stacks(tmp_path):
+    results = grow(tmp_path, 'cprofile')
+    assert sorted(os.listdir(results)) == ['run.folded', 'run.prof', 'run.profile.txt']
+    assert 'advance' in (results / 'run.profile.txt').read_text()
+
+    lines = (results / 'run.folded').read_text().splitlines()
+    assert any(line.startswith('dla_simulation.py:advance;dla_simulation.py:step_particle') for line in lines)
+    assert all(int(line.rsplit(' ', 1)[1]) > 0 for line in lines)
+
+def test_sampling_report_and_stacks(tmp_path):
+    results = grow(tmp_path, 'sampling')
+    assert sorted(os.listdir(results)) == ['run.folded', 'run.profile.txt']
+    assert 'samples every 0.001 s' in (results / 'run.profile.txt').read_text()
+
+    lines = (results / 'run.folded').read_text().splitlines()
+    assert lines and all(';dla_simulation.py:grow' in line for line in lines)
+    assert not any(';profiling.py:' in line for line in lines)
+
+def test_command_line(tmp_path):
+    output = str(tmp_path / 'walk')
+    main(['--output', output, '--path', os.path.join(os.path.dirname(__file__), '..', 'random-processes', 'random-walks'),
+          'variablestep:Variable_Step(1.0, 1000, 10, 1).brownian_2D_vec(plot=False)'])
+    assert 'brownian_2D_vec' in open(output + '.profile.txt').read()
+    assert os.path.getsize(output + '.folded') > 0
+
+def test_invalid_mode():
+    with pytest.raises(Exception):
+        Profiler('run', mode='perf')
+
+def test_runs_are_cumulative(tmp_path):
+    app = Application(30, 'line', 'square', 20, 60, rng_seed=11)
+    profiler = app.profile(str(tmp_path / 'run'))
+    app.grow(max_sweeps=50)
+    app.grow(max_sweeps=100)
+    ### Nothing is written until profiling stops
+    assert not os.listdir(tmp_path)
+
+    app.profile(None)
+    assert app.profiler is None and profiler.runs == 2
+    report = (tmp_path / 'run.profile.txt').read_text()
+    assert report.startswith('Cumulative profile of 2 runs')
+
+def test_dump_between_runs_only(tmp_path):
+    profiler = Profiler(str(tmp_path / 'run'))
+    profiler.dump()
+    assert not os.listdir(tmp_path)
+    with profiler:
+        with pytest.raises(Exception):
+            profiler.dump()
+    profiler.dump()
+    assert os.path.exists(tmp_path / 'run.profile.txt')
+
+def test_import_is_lazy():
+    ### Profiling modules are only loaded when a profile is requested
+    import subprocess, sys
+    code = "import sys, dla_simulation; print([m for m in ('profiling', 'cProfile', 'pstats') if m in sys.modules])"
+    output = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == '[]'
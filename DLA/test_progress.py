@@ -0,0 +1,55 @@
+from progress import Progress_Monitor, Metrics_Server
+from dla_simulation import Application
+import json
+import numpy as np
+import urllib.request
+import pytest
+
+def test_watch_reports_every_k():
+    app = Application(30, 'line', 'square', 20, 60, rng_seed=11, block_size=1)
+    reports = []
+    app.watch(reports.append, every=5)
+    app.grow(max_sweeps=300)
+
+    assert len(reports) >= 2
+    assert [report['mass'] // 5 for report in reports] == list(range(1, len(reports) + 1))
+    assert reports[-1]['radius'] == app.max_radius()
+    assert reports[-1]['attachments_per_second'] > 0
+    assert reports[-1]['eta_seconds'] > 0
+
+def test_final_report_when_stopped():
+    app = Application(30, 'dot', 'circle', 10, 5, rng_seed=3)
+    reports = []
+    app.watch(reports.append, every=1000)
+    app.grow()
+    assert len(reports) == 1
+    assert not reports[0]['running']
+    assert reports[0]['eta_seconds'] == 0
+
+def test_metrics_server():
+    server = Metrics_Server()
+    try:
+        server.publish({'mass': 12, 'radius': 3.5, 'eta_seconds': None, 'running': True})
+        with urllib.request.urlopen(f'http://127.0.0.1:{server.port}/') as response:
+            assert json.loads(response.read())['mass'] == 12
+        with urllib.request.urlopen(f'http://127.0.0.1:{server.port}/metrics') as response:
+            assert response.read().decode().split('\n') == ['dla_mass 12.0', 'dla_radius 3.5', 'dla_running 1.0', '']
+    finally:
+        server.close()
+
+def test_monitor_publishes():
+    app = Application(30, 'line', 'square', 20, 60, rng_seed=11)
+    monitor = app.watch(every=1, port=0)
+    try:
+        app.grow(max_sweeps=100)
+        assert monitor.server.current()['mass'] == len(app.crystal_position)
+    finally:
+        monitor.close()
+
+def test_radius_measured_incrementally():
+    app = Application(30, 'line', 'square', 20, 60, rng_seed=11)
+    for sweeps in (20, 40, 60):
+        app.grow(max_sweeps=sweeps)
+        pixels = np.array(app.crystal_position)
+        assert app.max_radius() == pytest.approx(np.sqrt((pixels[:, 0] - app.start_x)**2 + (pixels[:, 1] - app.start_y)**2).max())
+        assert app.radius_measured == len(app.crystal_position)
@@ -0,0 +1,40 @@
+from run_stats import Run_Stats
+from dla_simulation import Application
+import json
+import time
+import pytest
+
+def test_nested_timers_are_exclusive():
+    stats = Run_Stats('python')
+    with stats.timer('stepping'):
+        time.sleep(0.02)
+        with stats.timer('domain'):
+            time.sleep(0.05)
+    assert 0.02 <= stats.seconds['stepping'] < 0.05
+    assert stats.seconds['domain'] >= 0.05
+    assert stats.stack == []
+
+def test_to_json(tmp_path):
+    stats = Run_Stats('numba')
+    assert stats.as_dict()['steps_per_attachment'] is None
+    stats.counts['steps'], stats.counts['attachments'] = 100, 4
+    text = stats.to_json(tmp_path / 'stats.json')
+    assert json.loads(text) == json.loads((tmp_path / 'stats.json').read_text())
+    assert json.loads(text)['steps_per_attachment'] == 25
+
+@pytest.mark.parametrize('contact', ['target', 'moore'])
+def test_engines_count_the_same(contact):
+    counts = []
+    for engine in ['python', 'numba']:
+        app = Application(30, 'line', 'square', 20, 60, engine=engine, rng_seed=11, contact=contact, stick_coeff=0.5, detailed_timing=True)
+        app.grow(max_sweeps=500)
+        counts.append(app.stats.counts)
+
+        assert app.stats.counts['steps'] == 30 * app.sweeps
+        assert app.stats.counts['attachments'] == len(app.crystal_position)
+        assert app.stats.seconds['stepping'] > 0
+
+    assert counts[0]['attachments'] > 0
+    assert counts[0]['rejected_sticks'] > 0
+    assert counts[0]['respawns'] == counts[0]['attachments']
+    assert counts[0] == counts[1]
@@ -0,0 +1,232 @@
+import math
+import warnings
+import numpy as np
+
+
+### Eightfold direction on a square pixel lattice, with no bias (same order as the reference Application.step_particle)
+DIRECTIONS = np.array([(0, 1), (0, -1), (1, 0), (-1, 0), (1, -1), (-1, 1), (1, 1), (-1, -1)], dtype=np.int64)
+
+### Contact modes: the walker's next target pixel, or any of the first 4 (von Neumann) or all 8 (Moore) entries of DIRECTIONS
+CONTACTS = {'target': 0, 'von_neumann': 4, 'moore': 8}
+
+
+def neighbour_counts(lattice, contact):
+    '''
+    Counts the occupied neighbours of every site of an occupancy lattice, with periodic edges.
+
+    Parameters
+    ----------
+    lattice : np.ndarray
+        (width, height) uint8 occupancy lattice
+    contact : int
+        The number of neighbours considered, 4 or 8 (see CONTACTS)
+
+    Returns
+    -------
+    neighbours : np.ndarray
+        (width, height) uint8 array of occupied neighbour counts
+    '''
+    neighbours = np.zeros(lattice.shape, dtype=np.uint8)
+    for dx, dy in DIRECTIONS[:contact]:
+        neighbours += np.roll(lattice, (int(dx), int(dy)), axis=(0, 1))
+
+    return neighbours
+
+
+def walk_kernel(lattice, neighbours, px, py, dirs, sticks, spawns, box, domain, crystal, square, contact, start_x, start_y, padSize, width, crystal_size_limit, stick_coeff, stick_table, counters):
+    '''
+    Runs the walk-test-stick loop for every walker over a block of sweeps, directly on the occupancy lattice.
+    Written in a restricted subset of Python so it can be compiled by Numba, but runs unchanged (and identically) as plain Python/NumPy.
+
+    Parameters
+    ----------
+    lattice : np.ndarray
+        (width, height) uint8 occupancy lattice, 1 where the pixel belongs to the cluster
+    neighbours : np.ndarray
+        (width, height) uint8 count of occupied neighbours of each pixel, updated in place (unused if contact == 0)
+    px, py : np.ndarray
+        int64 arrays holding the current walker positions, updated in place
+    dirs : np.ndarray
+        (sweeps, n) int64 array of direction indices into DIRECTIONS
+    sticks : np.ndarray
+        (sweeps, n) float64 array of uniform numbers tested against stick_coeff
+    spawns : np.ndarray
+        (sweeps, n, 2) float64 array of uniform numbers used to respawn walkers that attach
+    box : np.ndarray
+        int64 array [min_x, max_x, min_y, max_y, sqdomainMin_x, sqdomainMax_x, sqdomainMin_y, sqdomainMax_y], updated in place
+    domain : np.ndarray
+        float64 array [radius, max_radius] of the circular domain, updated in place
+    crystal : np.ndarray
+        (capacity, 2) int64 buffer receiving the positions of newly attached pixels
+    square : bool
+        True for a square spawn/domain, False for a circular one
+    contact : int
+        0 to stick when the next target pixel is occupied, or 4/8 to stick when any 4/8 neighbour of the walker is occupied
+    start_x, start_y : int
+        Seed centre co-ordinates
+    padSize : int
+        Padding between the cluster and the spawn domain
+    width : int
+        Width of the display surface (used to clip the square domain)
+    crystal_size_limit : int
+        The maximum size of the DLA cluster allowed before the simulation exits
+    stick_coeff : float
+        Probability that a walker sticks on contact, when contact == 0
+    stick_table : np.ndarray
+        Probability that a walker sticks given its number of occupied neighbours, when contact is 4 or 8
+    counters : np.ndarray
+        int64 array [steps, rejected sticks] incremented in place: walker steps taken, and contacts that failed the sticking test
+
+    Returns
+    -------
+    count : int
+        The number of pixels written into crystal
+    sweeps_done : int
+        The number of sweeps completed (less than dirs.shape[0] if the simulation stopped)
+    stopped : bool
+        Whether the cluster exceeded crystal_size_limit
+    '''
+    count = 0
+    n_sweeps = dirs.shape[0]
+    n = px.shape[0]
+    size_x = lattice.shape[0]
+    size_y = lattice.shape[1]
+
+    for s in range(n_sweeps):
+        for i in range(n):
+            x = px[i]
+            y = py[i]
+            d = dirs[s, i]
+            counters[0] += 1
+            new_x = x + DIRECTIONS[d, 0]
+            new_y = y + DIRECTIONS[d, 1]
+
+            ### Wrap-around, mirroring Application.wrap_around
+            if square:
+                if new_x < box[4]:
+                    new_x = box[5]
+                if new_x > box[5]:
+                    new_x = box[4]
+                if new_y < box[6]:
+                    new_y = box[7]
+                if new_y > box[7]:
+                    new_y = box[6]
+            else:
+                r = math.sqrt((new_x - start_x)**2 + (new_y - start_y)**2)
+                if r > domain[0]:
+                    new_x = -x
+                    new_y = -y
+
+            if contact == 0:
+                touching = lattice[new_x, new_y] == 1
+                attach = touching and sticks[s, i] <= stick_coeff
+            else:
+                ### Moves onto the cluster are rejected, then contact is a single lookup of the neighbour count
+                if lattice[new_x, new_y] == 1:
+                    new_x = x
+                    new_y = y
+                touching = neighbours[new_x, new_y] > 0
+                attach = sticks[s, i] < stick_table[neighbours[new_x, new_y]]
+                x = new_x
+                y = new_y
+
+            if touching and not attach:
+                counters[1] += 1
+
+            if attach:
+                lattice[x, y] = 1
+                crystal[count, 0] = x
+                crystal[count, 1] = y
+                count += 1
+
+                for j in range(contact):
+                    neighbours[(x + DIRECTIONS[j, 0]) % size_x, (y + DIRECTIONS[j, 1]) % size_y] += 1
+
+                distance = math.sqrt((x - start_x)**2 + (y - start_y)**2)
+                if distance > crystal_size_limit:
+                    return count, s, True
+
+                ### Modify simulation domain as crystal grows, mirroring Application.restrict_domain
+                if x < box[0]:
+                    box[0] = x
+                elif x > box[1]:
+                    box[1] = x
+                if y < box[2]:
+                    box[2] = y
+                elif y > box[3]:
+                    box[3] = y
+
+                if square:
+                    box[4] = max(box[0] - padSize, 1)
+                    box[5] = min(box[1] + padSize, width - 1)
+                    box[6] = max(box[2] - padSize, 1)
+                    box[7] = min(box[3] + padSize, width - 1)
+                else:
+                    if distance > domain[1]:
+                        domain[1] = distance
+                    domain[0] = domain[1] + padSize
+
+                ### Respawn the walker, mirroring Application.square_spawn and Application.circle_spawn
+                u = spawns[s, i, 0]
+                v = spawns[s, i, 1]
+                if square:
+                    side = int(u * 4) + 1
+                    if side == 1:
+                        px[i] = box[4]
+                        py[i] = int(box[6] + v * (box[7] - box[6]))
+                    elif side == 2:
+                        px[i] = int(box[4] + v * (box[5] - box[4]))
+                        py[i] = box[6]
+                    elif side == 3:
+                        px[i] = box[5]
+                        py[i] = int(box[6] + v * (box[7] - box[6]))
+                    else:
+                        px[i] = int(box[4] + v * (box[5] - box[4]))
+                        py[i] = box[7]
+                else:
+                    theta = u * 2 * math.pi
+                    px[i] = int(start_x + math.cos(theta) * domain[0])
+                    py[i] = int(start_y + math.sin(theta) * domain[0])
+
+            else:
+                px[i] = new_x
+                py[i] = new_y
+
+    return count, n_sweeps, False
+
+
+_compiled = {}
+
+
+def get_kernel(engine):
+    '''
+    Returns the walker kernel for a given engine. Numba is only imported the first time the 'numba' engine is requested;
+    if it is not installed, the uncompiled kernel is returned instead (with a warning).
+
+    Parameters
+    ----------
+    engine : str
+        Either 'python' (uncompiled kernel) or 'numba' (JIT-compiled kernel)
+
+    Returns
+    -------
+    kernel : callable
+        A function with the signature of walk_kernel
+    '''
+    if engine == 'python':
+        return walk_kernel
+
+    elif engine == 'numba':
+        if 'numba' not in _compiled:
+            try:
+                import numba
+            except ImportError:
+                warnings.warn('Numba is not installed, falling back to the uncompiled walker kernel.')
+                _compiled['numba'] = walk_kernel
+            else:
+                _compiled['numba'] = numba.njit(cache=False, nogil=True)(walk_kernel)
+
+        return _compiled['numba']
+
+    else:
+        raise Exception('Parameter "engine" must be "python" or "numba".')
@@ -1,16 +1,20 @@
-import math
 import numpy as np
-from numpy import random
-import pandas as pd
-import matplotlib.pyplot as plt
-from cycler import cycler
-from scipy.integrate import odeint, solve_ivp
-plt.style.use('seaborn-whitegrid')
+from sde import euler_maruyama, ou_exact, integrate
 
 
-def OU_process():
+def OU_process(ntrials=10000, exact=False):
     '''
     Solve the Langevin equation (describes time evolution of Brownian motion) using the Ornstein-Uhlenbeck process and the Euler-Maruyama method.
+    All trials are integrated together by sde.integrate, and with exact=True the exact OU update is used instead of Euler-Maruyama.
+
+    Returns
+    -------
+    t, x : np.ndarray
+        Times and positions of a single path
+    histograms : dict
+        Histogram of all trials after 6, 51 and 501 steps
+    dt : float
+        The time step
     '''
 
     mu = 10.0    # mean
@@ -20,68 +24,74 @@ def OU_process():
     T = 1.0    # total time
     dt = 0.001   # time step
     n = int(T/dt)    # number of time steps
-    t = np.linspace(0.0, T, n)    # create time list (from 0 to T with step size T/N)
-
-    x = np.zeros(n)     # create array to hold x values
 
     ### Define renormalised variables
     sigma_bis = sigma * np.sqrt(2.0/tau)
-    sqrtdt = np.sqrt(dt)
-
-    ### Implement the Euler-Maruyama method
-    for i in range(n - 1):
-        x[i+1] = x[i] + dt*(-(x[i] - mu) / tau) + (sigma_bis * sqrtdt * np.random.randn())
-
-    fig, ax = plt.subplots(1, 1, figsize=(8, 4))
-    ax.plot(t, x, lw=2)
-    plt.show()
 
+    if exact:
+        step = ou_exact(mu, sigma, tau)
+    else:
+        step = euler_maruyama(lambda X, t: -(X - mu) / tau, lambda X, t: sigma_bis)
 
-    ### Calculate estimated distribution 
-    ntrials = 10000
-    X = np.zeros(ntrials)
+    ### Single path, recorded at every step
+    t, x, _ = integrate(step, 0.0, dt, n - 1, record_every=1)
 
-    ### Create bins for the histograms.
+    ### Calculate estimated distribution, from histograms of every trial at various points in time (after 6, 51 and 501 steps, as the loop
+    ### updating all trials histogrammed them at its iterations 5, 50 and 500). Only the moments of the final states are kept.
     bins = np.linspace(-2., 14., 100)
-    fig, ax = plt.subplots(1, 1, figsize=(8, 4))
+    _, _, histograms = integrate(step, 0.0, dt, n, trials=ntrials, histogram_steps=(6, 51, 501), bins=bins, paths=False)
+
+    return t, x[:, 0], histograms, dt
 
-    for i in range(n):
-        # Update the process independently for all trials
-        X += dt * (-(X - mu) / tau) + \
-            sigma_bis * sqrtdt * np.random.randn(ntrials)
 
-        # Display the histogram for various points in time
-        if i in (5, 50, 500):
-            hist, _ = np.histogram(X, bins=bins)
-            ax.plot((bins[1:] + bins[:-1]) / 2, hist,
-                    {5: '-', 50: '.', 500: '-.', }[i],
-                    label=f"t={i * dt:.2f}")
+def plot_OU_process(t, x, histograms, dt):
+    '''Plots a single OU path, then the histograms of all trials at various points in time, from the output of OU_process().'''
+    import matplotlib.pyplot as plt
+    plt.style.use('seaborn-v0_8-whitegrid')
 
-        ax.legend()
+    fig, ax = plt.subplots(1, 1, figsize=(8, 4))
+    ax.plot(t, x, lw=2)
     plt.show()
 
+    fig, ax = plt.subplots(1, 1, figsize=(8, 4))
+    for i, style in zip(sorted(histograms), ('-', '.', '-.')):
+        ax.plot(histograms[i].centres(), histograms[i].counts, style, label=f"t={i * dt:.2f}")
+
+    ax.legend()
+    plt.show()
 
-def langevin(t, inicon):
 
-  m = 1.5 
-  k = 0.000001
-  R = np.random.normal(0,1) 
+def langevin(m=1.5, k=0.000001, T=1000, dt=0.01):
+    '''
+    Integrates the Langevin equation dx = v dt, dv = -m v dt + k dW for a single particle starting at x = 0, v = 1, by Euler-Maruyama.
+    This replaces the previous solve_ivp approach, which drew a new random force at every evaluation of the right hand side and so did not integrate the noise correctly.
+
+    Returns
+    -------
+    t : np.ndarray
+        The times
+    x, v : np.ndarray
+        Position and velocity at each time
+    '''
+    step = euler_maruyama(lambda X, t: np.stack((X[:, 1], -m * X[:, 1]), axis=1), lambda X, t: np.array([0.0, k]))
+    t, states, _ = integrate(step, [0.0, 1.0], dt, int(T/dt), record_every=1)
 
-  x0 = inicon[0]
-  v0 = inicon[1]
+    return t, states[:, 0, 0], states[:, 0, 1]
 
-  dvdt = -m*v0 + k*R
 
-  return [v0, dvdt]   # returns v0 as x_n+1 
+def plot_langevin(t, x, v):
+    '''Plots position and velocity against time, from the output of langevin().'''
+    import matplotlib.pyplot as plt
+    plt.style.use('seaborn-v0_8-whitegrid')
 
-t = np.linspace(0, 1000, 1000000)
+    fig, ax = plt.figure(), plt.axes()
+    ax.plot(t, x)
+    ax.plot(t, v)
+    plt.show()
 
-output = solve_ivp(langevin, [0, 1000], [0, 1], t_eval=t, method='RK45')
 
-fig, ax = plt.figure(), plt.axes()
-ax.plot(t, output.y[0])
-ax.plot(t, output.y[1])
-plt.show()
+if __name__ == '__main__':
+    plot_langevin(*langevin())
 
-### Call function
-# OU_process()
+    ### Call function
+    # plot_OU_process(*OU_process())
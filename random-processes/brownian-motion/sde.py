@@ -0,0 +1,212 @@
+import math
+import numpy as np
+
+
+class Histogram():
+    '''
+    Histogram with fixed bins whose counts are accumulated batch by batch, so the distribution of many trials can be built without holding them all in memory.
+
+    Methods
+    -------
+    __init__
+        Constructor method, creates empty counts
+
+    update
+        Adds a batch of values
+
+    centres, density
+        Bin centres, and the counts normalised to a probability density
+    '''
+
+    def __init__(self, bins):
+        '''
+        Parameters
+        ----------
+        bins : np.ndarray
+            Edges of the bins (as for np.histogram)
+        '''
+        self.bins = np.asarray(bins, dtype=np.float64)
+        self.counts = np.zeros(len(self.bins) - 1, dtype=np.int64)
+        self.total = 0
+
+    def update(self, values):
+        '''Adds a batch of values, counting those outside the bins in the total only.'''
+        values = np.ravel(values)
+        self.counts += np.histogram(values, bins=self.bins)[0]
+        self.total += len(values)
+
+    def centres(self):
+        '''Returns the centre of each bin.'''
+        return (self.bins[1:] + self.bins[:-1]) / 2
+
+    def density(self):
+        '''Returns the counts normalised so they integrate to the fraction of values inside the bins.'''
+        return self.counts / (max(self.total, 1) * np.diff(self.bins))
+
+
+class Moments():
+    '''
+    Mean and variance over trials of states with a fixed shape, combined batch by batch (Chan et al.'s pairwise update), so the moments of
+    many trials can be built without holding them all in memory.
+
+    Methods
+    -------
+    __init__
+        Constructor method, creates empty moments
+
+    update
+        Adds a batch of trials
+
+    var, std
+        Sample variance and standard deviation over the trials
+    '''
+
+    def __init__(self, shape):
+        '''
+        Parameters
+        ----------
+        shape : tuple
+            Shape of the states of one trial
+        '''
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+
+    def update(self, values):
+        '''Adds a (trials, *shape) batch of states.'''
+        count = len(values)
+        mean = values.mean(axis=0)
+        m2 = ((values - mean)**2).sum(axis=0)
+
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * count / total
+        self.m2 = self.m2 + m2 + delta**2 * self.count * count / total
+        self.count = total
+
+    def var(self):
+        '''Returns the sample variance over the trials.'''
+        return self.m2 / max(self.count - 1, 1)
+
+    def std(self):
+        '''Returns the sample standard deviation over the trials.'''
+        return np.sqrt(self.var())
+
+
+def euler_maruyama(drift, diffusion):
+    '''
+    Returns an Euler-Maruyama step for the SDE dX = drift(X, t) dt + diffusion(X, t) dW, with independent noise in each component (diagonal noise).
+
+    Parameters
+    ----------
+    drift : function
+        drift(X, t), vectorised over an array X of trials
+    diffusion : function
+        diffusion(X, t), returning an array broadcastable to X (or a scalar)
+
+    Returns
+    -------
+    step : function
+        step(X, t, dt, rng), returning X at time t + dt
+    '''
+    def step(X, t, dt, rng):
+        dW = rng.standard_normal(X.shape) * math.sqrt(dt)
+        return X + drift(X, t) * dt + diffusion(X, t) * dW
+
+    return step
+
+
+def ou_exact(mu, sigma, tau):
+    '''
+    Returns the exact update of the Ornstein-Uhlenbeck process dX = -(X - mu)/tau dt + sigma sqrt(2/tau) dW, as in OU_process in langevin.py.
+    The transition density is Gaussian, so any dt can be taken without discretisation error.
+
+    Parameters
+    ----------
+    mu : float
+        The mean
+    sigma : float
+        The stationary standard deviation
+    tau : float
+        The time constant (mean free time)
+
+    Returns
+    -------
+    step : function
+        step(X, t, dt, rng), returning X at time t + dt
+    '''
+    def step(X, t, dt, rng):
+        decay = math.exp(-dt/tau)
+        return mu + (X - mu) * decay + sigma * math.sqrt(1 - decay**2) * rng.standard_normal(X.shape)
+
+    return step
+
+
+def integrate(step, x0, dt, n_steps, trials=1, batch=None, record_every=None, histogram_steps=(), bins=None, rng_seed=None, paths=True):
+    '''
+    Integrates many independent trials of an SDE at once, one vectorised step over all trials at a time.
+    Trials are run in batches of at most batch, and histograms at the chosen steps are accumulated across batches. With paths=False the recorded
+    states are also reduced batch by batch, to their mean and variance over the trials, so memory grows with batch rather than trials.
+
+    Parameters
+    ----------
+    step : function
+        A step from euler_maruyama() or ou_exact()
+    x0 : float or np.ndarray
+        Initial state of every trial; an array gives the shape of each trial's state (e.g. [x, v])
+    dt : float
+        The time step
+    n_steps : int
+        The number of steps
+    trials : int
+        The number of independent trials
+    batch : int or None
+        The maximum number of trials integrated together, or None for all at once
+    record_every : int or None
+        Record the states every record_every steps, or None to record only the final state
+    histogram_steps : iterable
+        Steps at which the distribution of the first state component is histogrammed, i.e. after that many steps (0 for x0)
+    bins : np.ndarray or None
+        Edges of the histogram bins, required if histogram_steps is given
+    rng_seed : int or None
+        Seed for the NumPy generator used for every step
+    paths : bool
+        Whether the recorded states of every trial are returned, or only their moments
+
+    Returns
+    -------
+    times : np.ndarray
+        The recorded times
+    states : np.ndarray or Moments
+        (len(times), trials, *state shape) array of the recorded states, or with paths=False their Moments over the trials, of shape (len(times), *state shape)
+    histograms : dict
+        Histogram for each of histogram_steps
+    '''
+    rng = np.random.default_rng(rng_seed)
+    x0 = np.asarray(x0, dtype=np.float64)
+    batch = trials if batch is None else batch
+
+    recorded = np.arange(0, n_steps + 1, record_every) if record_every else np.array([n_steps])
+    states = np.empty((len(recorded), trials) + x0.shape) if paths else Moments((len(recorded),) + x0.shape)
+    histograms = {s: Histogram(bins) for s in histogram_steps}
+
+    for start in range(0, trials, batch):
+        stop = min(start + batch, trials)
+        X = np.broadcast_to(x0, (stop - start,) + x0.shape).copy()
+        batch_states = states[:, start:stop] if paths else np.empty((len(recorded), stop - start) + x0.shape)
+        r = 0
+
+        for i in range(n_steps + 1):
+            if i > 0:
+                X = step(X, (i - 1) * dt, dt, rng)
+
+            if r < len(recorded) and recorded[r] == i:
+                batch_states[r] = X
+                r += 1
+            if i in histograms:
+                histograms[i].update(X[:, 0] if X.ndim > 1 else X)
+
+        if not paths:
+            states.update(np.swapaxes(batch_states, 0, 1))
+
+    return recorded * dt, states, histograms
@@ -0,0 +1,22 @@
+import os
+import sys
+import subprocess
+import langevin
+import pytest
+
+def test_import_is_lazy():
+    ### Importing runs no integration and loads no plotting library
+    code = "import sys, langevin; print('matplotlib' in sys.modules)"
+    output = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(langevin.__file__), capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == 'False'
+
+def test_OU_process():
+    t, x, histograms, dt = langevin.OU_process(ntrials=500, exact=True)
+    assert len(t) == len(x) == 1000
+    assert sorted(histograms) == [6, 51, 501]
+    assert histograms[501].total == 500
+
+def test_langevin():
+    t, x, v = langevin.langevin(T=10, dt=0.01)
+    assert len(t) == len(x) == len(v) == 1001
+    assert x[-1] == pytest.approx((1 - 2.718281828**-15) / 1.5, rel=1e-2)
@@ -0,0 +1,49 @@
+from sde import Histogram, Moments, euler_maruyama, ou_exact, integrate
+import numpy as np
+import pytest
+
+def test_histogram():
+    values = np.random.default_rng(5).normal(size=1000)
+    hist = Histogram(np.linspace(-5, 5, 21))
+    for chunk in np.array_split(values, 4):
+        hist.update(chunk)
+    assert (hist.counts == np.histogram(values, bins=np.linspace(-5, 5, 21))[0]).all()
+    assert hist.total == 1000
+    assert len(hist.centres()) == 20
+    assert np.sum(hist.density() * 0.5) == pytest.approx(hist.counts.sum() / 1000)
+
+def test_ou_stationary():
+    ### Both schemes relax to the stationary distribution N(mu, sigma^2)
+    em = euler_maruyama(lambda X, t: -(X - 10) / 0.05, lambda X, t: np.sqrt(2/0.05))
+    for step, dt, n_steps in [(em, 0.001, 500), (ou_exact(10, 1, 0.05), 0.1, 5)]:
+        times, states, _ = integrate(step, 0.0, dt, n_steps, trials=20000, rng_seed=5)
+        assert times[-1] == pytest.approx(dt * n_steps)
+        assert states[-1].mean() == pytest.approx(10, abs=0.05)
+        assert states[-1].std() == pytest.approx(1, abs=0.05)
+
+def test_batches():
+    step = ou_exact(0, 1, 1)
+    times, states, histograms = integrate(step, 0.0, 0.1, 20, trials=1000, batch=300, record_every=5, histogram_steps=(0, 20), bins=np.linspace(-4, 4, 9), rng_seed=5)
+    assert list(times) == pytest.approx([0, 0.5, 1, 1.5, 2])
+    assert states.shape == (5, 1000)
+    assert (states[0] == 0).all()
+    assert histograms[0].counts[4] == 1000
+    assert (histograms[20].counts == np.histogram(states[-1], bins=np.linspace(-4, 4, 9))[0]).all()
+
+def test_vector_state():
+    ### Deterministic damped velocity: v = exp(-m t), x = (1 - exp(-m t)) / m
+    step = euler_maruyama(lambda X, t: np.stack((X[:, 1], -1.5 * X[:, 1]), axis=1), lambda X, t: np.array([0.0, 0.0]))
+    times, states, _ = integrate(step, [0.0, 1.0], 0.001, 2000, trials=3)
+    assert states.shape == (1, 3, 2)
+    assert states[-1, :, 1] == pytest.approx(np.exp(-3), rel=1e-2)
+    assert states[-1, :, 0] == pytest.approx((1 - np.exp(-3)) / 1.5, rel=1e-2)
+
+def test_moments_without_paths():
+    ### The same draws reduced batch by batch give the moments of the recorded paths
+    step = euler_maruyama(lambda X, t: np.stack((X[:, 1], -X[:, 1]), axis=1), lambda X, t: np.array([0.0, 0.5]))
+    arguments = (step, [0.0, 1.0], 0.01, 40)
+    times, states, _ = integrate(*arguments, trials=1000, batch=300, record_every=10, rng_seed=5)
+    _, moments, _ = integrate(*arguments, trials=1000, batch=300, record_every=10, rng_seed=5, paths=False)
+    assert isinstance(moments, Moments) and moments.count == 1000
+    assert moments.mean == pytest.approx(states.mean(axis=1))
+    assert moments.std() == pytest.approx(states.std(axis=1, ddof=1))
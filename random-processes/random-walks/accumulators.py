@@ -0,0 +1,106 @@
+import numpy as np
+
+
+class Running_Statistics():
+    '''
+    Streaming mean and variance of a quantity recorded at each of N steps (e.g. displacement against time), over any number of walkers.
+    Uses Welford's algorithm in the batched form of Chan et al., so batches of walkers can be added one at a time and accumulators built in
+    separate chunks or processes can be merged exactly. Memory is O(N), however many walkers are added.
+
+    Methods
+    -------
+    __init__
+        Constructor method, creates an empty accumulator
+
+    update
+        Adds a batch of walkers
+
+    merge
+        Combines another accumulator into this one
+
+    variance, std_error
+        Sample variance and standard error of the mean at each step
+    '''
+
+    def __init__(self, N):
+        '''
+        Parameters
+        ----------
+        N : int
+            The number of steps recorded for each walker
+        '''
+        self.N = N
+        self.count = 0
+        self.mean = np.zeros(N)
+        self.M2 = np.zeros(N)     # sum of squared deviations from the mean
+
+    def combine(self, count, mean, M2):
+        '''Adds the count, mean and summed squared deviations of another set of walkers.'''
+        if count == 0:
+            return
+
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * (count/total)
+        self.M2 += M2 + delta**2 * (self.count*count/total)
+        self.count = total
+
+    def update(self, values):
+        '''
+        Adds a batch of walkers.
+
+        Parameters
+        ----------
+        values : np.ndarray
+            (walkers, N) array of the quantity for each walker at each step
+        '''
+        values = np.asarray(values, dtype=np.float64)
+        mean = values.mean(axis=0)
+        self.combine(len(values), mean, ((values - mean)**2).sum(axis=0))
+
+    def merge(self, other):
+        '''
+        Combines another accumulator (e.g. from another chunk or process) into this one.
+
+        Parameters
+        ----------
+        other : Running_Statistics
+            Accumulator over the same N steps
+        '''
+        self.combine(other.count, other.mean, other.M2)
+
+    def variance(self):
+        '''Returns the sample variance at each step.'''
+        return self.M2 / max(self.count - 1, 1)
+
+    def std_error(self):
+        '''Returns the standard error of the mean at each step.'''
+        return np.sqrt(self.variance() / max(self.count, 1))
+
+
+def displacement_statistics(chunks, N):
+    '''
+    Streams chunks of walker paths into accumulators of the displacement (the sum of co-ordinates) and the squared distance from the origin at each step.
+
+    Parameters
+    ----------
+    chunks : iterable
+        (walkers, N, number of dimensions) arrays of positions
+    N : int
+        The number of steps in each path
+
+    Returns
+    -------
+    displacement : Running_Statistics
+        Displacement at each step
+    squared : Running_Statistics
+        Squared distance at each step; its mean is the mean-squared displacement MSD(t)
+    '''
+    displacement = Running_Statistics(N)
+    squared = Running_Statistics(N)
+
+    for paths in chunks:
+        displacement.update(paths.sum(axis=2))
+        squared.update((paths**2).sum(axis=2))
+
+    return displacement, squared
@@ -1,9 +1,9 @@
 import math
+import contextlib
 import numpy as np
-import matplotlib
-import matplotlib.pyplot as plt
 import random
-plt.style.use('seaborn-whitegrid')
+from accumulators import displacement_statistics
+
 
 class Constant_Step():
     '''
@@ -14,17 +14,35 @@ class Constant_Step():
     __init__
         Constructor method, sets class variables.
 
+    profile
+        Context manager profiling the walks generated inside it.
+
+    step_table
+        Returns the lattice steps available in 1D, 2D or 3D.
+
+    walk_arrays
+        Creates a random walk in 1D, 2D or 3D as NumPy arrays, drawing every step at once.
+
     gen_random_walk
-        Creates a random walk in 1D, 2D and 3D with constant step size, using random.choice. 
+        Creates a random walk in 1D, 2D and 3D with constant step size, using walk_arrays or (method='loop') random.choice. 
+
+    ensemble_displacements
+        Calculates average and rms displacement, with standard errors, from batches of walks simulated as (walkers x steps) arrays.
 
     calc_displacements
         Calculates and prints average displacement and rms displacement over many iterations, for random walks in 1D, 2D and 3D.
 
+    curve_statistics
+        Streaming accumulators of displacement and squared distance at every step, over many iterations.
+
+    displacement_curves
+        Average displacement and mean-squared displacement at every step, over many iterations.
+
     plot_random_walk
         Plots random walks for fixed step size in 1D, 2D and 3D.
     '''
 
-    def __init__(self, N, ss, iterations):
+    def __init__(self, N, ss, iterations, method='vectorised'):
         '''
         Initialise the parameters every time an instance of the class is called. 
 
@@ -38,11 +56,19 @@ class Constant_Step():
 
         iterations : int
             The number of times the simulation is run 
+
+        method : str
+            'vectorised' to draw every step of a walk at once with NumPy, or 'loop' for the reference loop over random.choice
         '''
+        ### Raise an exception if the input method parameter is invalid
+        if method != 'vectorised' and method != 'loop':
+            raise Exception('Parameter "method" must be "vectorised" or "loop".')
 
         self.N = N      # number of steps
         self.ss = ss      # step size
         self.iterations = iterations     # number of iterations
+        self.method = method
+        self.profiler = None     # see profile()
 
         # Initialise lists containing x, y, z positions and distances. These are lists of zeros of length N
         self.x = [0] * self.N
@@ -51,16 +77,117 @@ class Constant_Step():
         self.distances = [0] * self.N
 
 
+    @contextlib.contextmanager
+    def profile(self, output, mode='cprofile', interval=0.005):
+        '''
+        Context manager profiling the walks generated inside it, e.g. with walk.profile('results/walk'): walk.calc_displacements('2D')
+        When each with block ends, writes a ranked hot-function report (output + '.profile.txt') and flame graph folded stacks (output + '.folded'),
+        covering every block profiled with the same output and mode. Uses DLA/profiling.py, which is only imported here and must be on the import
+        path (e.g. PYTHONPATH=../../DLA).
+
+        Parameters
+        ----------
+        output : str
+            Path prefix of the files written, e.g. next to the run's results
+        mode : str
+            'cprofile' (deterministic, every call timed, also writes output + '.prof') or 'sampling' (low overhead, exact stacks)
+        interval : float
+            Seconds between samples, for mode='sampling'
+
+        Yields
+        ------
+        profiler : Profiler
+            The profiler, whose runs accumulate
+        '''
+        from profiling import Profiler
+
+        if self.profiler is None or self.profiler.output != output or self.profiler.mode != mode:
+            self.profiler = Profiler(output, mode, interval)
+
+        with self.profiler:
+            yield self.profiler
+
+        self.profiler.dump()
+
+
+    def step_table(self, dimension):
+        '''
+        Returns the lattice steps available in 1D, 2D or 3D, in the same order as the random.choice lists of the loop method.
+
+        Parameters
+        ----------
+        dimension : str
+            Selects which array is returned based on number of random variables
+
+        Returns
+        -------
+        table : np.ndarray
+            (number of directions, number of dimensions) array of steps
+        '''
+        ss = self.ss
+
+        if dimension == '1D':
+            return np.array([(-ss,), (ss,)])
+
+        elif dimension == '2D':
+            return np.array([(0, ss), (0, -ss), (ss, 0), (-ss, 0)])
+
+        else:   # dimension == '3D'
+            return np.array([(ss, 0, 0), (-ss, 0, 0), (0, ss, 0), (0, -ss, 0), (0, 0, ss), (0, 0, -ss)])
+
+
+    def walk_arrays(self, dimension):
+        '''
+        Creates a random walk with constant step size in 1D, 2D or 3D as NumPy arrays. All N - 1 direction indices are drawn at once with np.random.randint,
+        mapped through the step table and cumulatively summed, and the distances are computed in one array operation.
+
+        Parameters
+        ----------
+        dimension : str
+            Selects which array is returned based on number of random variables
+
+        Returns
+        -------
+        coords : np.ndarray
+            (N, number of dimensions) array of positions, starting at the origin
+        distances : np.ndarray
+            Length N array of distances from the origin
+        '''
+        table = self.step_table(dimension)
+        steps = table[np.random.randint(0, len(table), self.N - 1)]
+
+        coords = np.zeros((self.N, table.shape[1]), dtype=table.dtype)
+        np.cumsum(steps, axis=0, out=coords[1:])
+        distances = np.sqrt((coords**2).sum(axis=1))
+
+        return coords, distances
+
+
     def gen_random_walk(self, dimension): 
         '''
-        Creates a random walk with constant step size in 1D, 2D or 3D, using random.choice. 
+        Creates a random walk with constant step size in 1D, 2D or 3D, using walk_arrays (or random.choice if self.method == 'loop'). 
+        The positions and distances are stored in the self.x, self.y, self.z and self.distances lists.
 
         Parameters
         ----------
         dimension : str
             Selects which array is returned based on number of random variables
         '''
-        
+        if self.method == 'vectorised':
+            coords, distances = self.walk_arrays(dimension)
+            self.distances = distances.tolist()
+            self.x = coords[:, 0].tolist()
+
+            if dimension == '1D':
+                return self.x[-1]
+
+            self.y = coords[:, 1].tolist()
+            if dimension == '2D':
+                return (self.x[-1], self.y[-1])
+
+            self.z = coords[:, 2].tolist()
+            return (self.x[-1], self.y[-1], self.z[-1])
+
         if dimension == '1D':
             for i in range(1, self.N):
                 step = random.choice([-self.ss, self.ss])
@@ -106,16 +233,81 @@ class Constant_Step():
             return coord_3D
 
 
+    def ensemble_displacements(self, dimension, max_elements=2**22):
+        '''
+        Calculates average and rms displacement over self.iterations walks, simulating them as (walkers x steps) arrays of direction indices in chunks
+        of at most max_elements entries, so memory stays bounded however many iterations are run. As in calc_displacements, the displacement of a walk
+        is the sum of its final co-ordinates.
+
+        Parameters
+        ----------
+        dimension : str
+            Selects which array is returned based on number of random variables
+
+        max_elements : int
+            The maximum number of steps held in memory at once
+
+        Returns
+        -------
+        av_disp : float
+            Average displacement
+        rms_disp : float
+            Root-mean-squared displacement
+        av_err : float
+            Standard error of av_disp
+        rms_err : float
+            Standard error of rms_disp (from the spread of squared displacements)
+        '''
+        table = self.step_table(dimension).sum(axis=1)      # each step's change in the sum of co-ordinates
+        n_steps = self.N - 1
+        walkers = max(1, max_elements // max(n_steps, 1))
+        steps = max(1, min(n_steps, max_elements))
+
+        sum_1, sum_2, sum_4 = 0.0, 0.0, 0.0
+
+        for start in range(0, self.iterations, walkers):
+            size = min(walkers, self.iterations - start)
+            disp = np.zeros(size, dtype=table.dtype)
+
+            ### Walks longer than max_elements are summed in pieces along the steps too
+            for done in range(0, n_steps, steps):
+                disp += table[np.random.randint(0, len(table), (size, min(steps, n_steps - done)))].sum(axis=1)
+
+            disp = disp.astype(np.float64)
+            sum_1 += disp.sum()
+            sum_2 += (disp**2).sum()
+            sum_4 += (disp**4).sum()
+
+        M = self.iterations
+        av_disp = sum_1/M
+        rms_disp = math.sqrt(sum_2/M)
+
+        ### Sample variances of the displacement and of its square
+        var_1 = max(sum_2/M - av_disp**2, 0) * M/max(M - 1, 1)
+        var_2 = max(sum_4/M - (sum_2/M)**2, 0) * M/max(M - 1, 1)
+        av_err = math.sqrt(var_1/M)
+        rms_err = math.sqrt(var_2/M)/(2*rms_disp) if rms_disp > 0 else 0.0
+
+        return av_disp, rms_disp, av_err, rms_err
+
+
     def calc_displacements(self, dimension):
         '''
         Calculates average displacement and rms displacement over many iterations, for random walks in 1D, 2D and 3D.
+        Uses ensemble_displacements, unless self.method == 'loop'.
 
         Parameters
         ----------
         dimension : str
             Selects which array is returned based on number of random variables
         '''
-        
+        if self.method == 'vectorised':
+            av_disp, rms_disp, av_err, rms_err = self.ensemble_displacements(dimension)
+
+            print(f"For {self.iterations} iterations and {self.N} steps, the average displacement is {av_disp} (+/- {av_err}) and the root-mean-squared displacement is {rms_disp} (+/- {rms_err}). The value of (root of N)*(step size) is {self.ss*math.sqrt(self.N)}.")
+
+            return av_disp, rms_disp
+
         all_coord, all_xcoord, all_ycoord, all_zcoord, all_coord_sq = 0, 0, 0, 0, 0
 
         if dimension == '1D':
@@ -169,6 +361,78 @@ class Constant_Step():
             return av_disp, rms_disp
 
 
+    def iteration_chunks(self, dimension, max_elements):
+        '''
+        Generates the paths of all self.iterations walks in chunks of whole walks, as (walkers x steps) arrays.
+
+        Parameters
+        ----------
+        dimension : str
+            Selects the number of random variables
+
+        max_elements : int
+            The maximum number of elements (walks x steps x dimensions) in each chunk, which holds at least one whole walk
+
+        Yields
+        ------
+        paths : np.ndarray
+            (chunk size, N, number of dimensions) array of positions, starting at the origin
+        '''
+        table = self.step_table(dimension)
+        chunk = max(1, max_elements // (self.N * table.shape[1]))
+
+        for start in range(0, self.iterations, chunk):
+            size = min(chunk, self.iterations - start)
+            paths = np.zeros((size, self.N, table.shape[1]), dtype=table.dtype)
+            np.cumsum(table[np.random.randint(0, len(table), (size, self.N - 1))], axis=1, out=paths[:, 1:])
+            yield paths
+
+
+    def curve_statistics(self, dimension, max_elements=2**22):
+        '''
+        Streams all self.iterations walks into accumulators of the displacement and squared distance at every step, holding only one chunk of walks
+        in memory at a time. The accumulators can be merged with those from other runs or processes.
+
+        Parameters
+        ----------
+        dimension : str
+            Selects the number of random variables
+
+        max_elements : int
+            The maximum number of elements (walks x steps x dimensions) held in memory at once
+
+        Returns
+        -------
+        displacement, squared : Running_Statistics
+            See accumulators.displacement_statistics
+        '''
+        return displacement_statistics(self.iteration_chunks(dimension, max_elements), self.N)
+
+
+    def displacement_curves(self, dimension, max_elements=2**22):
+        '''
+        Average displacement (the sum of co-ordinates, as in calc_displacements) and mean-squared displacement at every step, over all self.iterations walks.
+
+        Parameters
+        ----------
+        dimension : str
+            Selects the number of random variables
+
+        max_elements : int
+            The maximum number of elements (walks x steps x dimensions) held in memory at once
+
+        Returns
+        -------
+        av_disp : np.ndarray
+            Length N array of the average displacement at each step
+        msd : np.ndarray
+            Length N array of the mean-squared distance from the origin at each step (ss^2 times the step number, in expectation)
+        '''
+        displacement, squared = self.curve_statistics(dimension, max_elements)
+
+        return displacement.mean, squared.mean
+
+
     def plot_random_walk(self, dimension):
         '''
         Plots random walks for fixed step size in 1D, 2D and 3D.
@@ -179,7 +443,9 @@ class Constant_Step():
             Selects which array is returned based on number of random variables
         '''
         steps = list(range(self.N))
-        matplotlib.rcParams.update({'font.size': 9})
+        import matplotlib.pyplot as plt
+        plt.style.use('seaborn-v0_8-whitegrid')
+        plt.rcParams.update({'font.size': 9})
 
         if dimension == '1D':
             ### Unpack return arguments and create time list
@@ -0,0 +1,32 @@
+from accumulators import Running_Statistics, displacement_statistics
+import numpy as np
+import pytest
+
+@pytest.fixture
+def values():
+    return np.random.default_rng(5).normal(3, 2, (1000, 7))
+
+def test_running_statistics(values):
+    stats = Running_Statistics(7)
+    for chunk in np.array_split(values, 9):
+        stats.update(chunk)
+    assert stats.count == 1000
+    assert np.allclose(stats.mean, values.mean(axis=0))
+    assert np.allclose(stats.variance(), values.var(axis=0, ddof=1))
+    assert np.allclose(stats.std_error(), values.std(axis=0, ddof=1) / 1000**0.5)
+
+def test_merge(values):
+    first, second = Running_Statistics(7), Running_Statistics(7)
+    first.update(values[:300])
+    second.update(values[300:])
+    first.merge(second)
+    first.merge(Running_Statistics(7))
+    assert first.count == 1000
+    assert np.allclose(first.mean, values.mean(axis=0))
+    assert np.allclose(first.variance(), values.var(axis=0, ddof=1))
+
+def test_displacement_statistics():
+    paths = np.random.default_rng(5).normal(size=(50, 4, 2)).cumsum(axis=1)
+    displacement, squared = displacement_statistics(np.array_split(paths, 3), 4)
+    assert np.allclose(displacement.mean, paths.sum(axis=2).mean(axis=0))
+    assert np.allclose(squared.mean, (paths**2).sum(axis=2).mean(axis=0))
@@ -1,4 +1,5 @@
-from constantstep import Constant_Step, random
+import os
+from constantstep import Constant_Step, random, np
 import pytest
 random.seed(5) # Random seed used to create reproducibility of results and generate numbers to write the below tests. 
 
@@ -7,7 +8,12 @@ def walk():
     N = 10
     ss = 2
     iterations = 5
-    return Constant_Step(N, ss , iterations)
+    return Constant_Step(N, ss , iterations, method='loop')
+
+@pytest.fixture
+def vec_walk():
+    np.random.seed(5)
+    return Constant_Step(1000, 2, 5)
 
 def test_constant_step_init(walk):
     assert walk.N == 10
@@ -26,4 +32,79 @@ def test_gen_random_walk(walk):
 def test_calc_displacements(walk):
     assert walk.calc_displacements('1D') == (0.4, 6.985699678629192)
     assert walk.calc_displacements('2D') == (3.6, 6.511528238439882)
-    assert walk.calc_displacements('3D') == (-5.2, 5.440588203494177)
\ No newline at end of file
+    assert walk.calc_displacements('3D') == (-5.2, 5.440588203494177)
+
+def test_invalid_method():
+    with pytest.raises(Exception):
+        Constant_Step(10, 2, 5, method='test')
+
+@pytest.mark.parametrize('dimension, d', [('1D', 1), ('2D', 2), ('3D', 3)])
+def test_walk_arrays(vec_walk, dimension, d):
+    coords, distances = vec_walk.walk_arrays(dimension)
+    assert coords.shape == (1000, d)
+    assert (coords[0] == 0).all()
+    # Every step moves by exactly ss along exactly one axis
+    steps = np.abs(np.diff(coords, axis=0))
+    assert (steps.sum(axis=1) == 2).all()
+    assert (steps.max(axis=1) == 2).all()
+    assert np.allclose(distances, np.sqrt((coords**2).sum(axis=1)))
+
+def test_gen_random_walk_vectorised(vec_walk):
+    assert vec_walk.gen_random_walk('1D') == vec_walk.x[-1]
+    assert len(vec_walk.x) == len(vec_walk.distances) == 1000
+    x, y, z = vec_walk.gen_random_walk('3D')
+    assert (x, y, z) == (vec_walk.x[-1], vec_walk.y[-1], vec_walk.z[-1])
+    assert isinstance(x, int)
+    assert vec_walk.distances[-1] == (x**2 + y**2 + z**2)**0.5
+
+def test_ensemble_displacements(vec_walk):
+    vec_walk.iterations = 4000
+    av_disp, rms_disp, av_err, rms_err = vec_walk.ensemble_displacements('2D')
+    # Expected <d> = 0 and rms = ss*sqrt(N - 1)
+    assert abs(av_disp) < 4 * av_err
+    assert abs(rms_disp - 2 * 999**0.5) < 4 * rms_err
+    assert av_err == pytest.approx(rms_disp / 4000**0.5, rel=0.05)
+
+def test_ensemble_displacements_chunking(vec_walk):
+    vec_walk.iterations = 50
+    np.random.seed(1)
+    whole = vec_walk.ensemble_displacements('3D', max_elements=10**6)
+    np.random.seed(1)
+    chunked = vec_walk.ensemble_displacements('3D', max_elements=999)
+    # Chunking along walkers consumes the same random numbers in the same order
+    assert whole == pytest.approx(chunked)
+
+def test_ensemble_displacements_single_point():
+    # With N = 1 no steps are taken, so every displacement is zero
+    assert Constant_Step(1, 1, 10).ensemble_displacements('2D') == (0, 0, 0, 0)
+
+def test_calc_displacements_vectorised(vec_walk):
+    av_disp, rms_disp = vec_walk.calc_displacements('1D')
+    assert abs(av_disp) < 3 * rms_disp / 5**0.5
+
+def test_displacement_curves(vec_walk):
+    vec_walk.N = 50
+    vec_walk.iterations = 4000
+    av_disp, msd = vec_walk.displacement_curves('3D', max_elements=5000)
+    # MSD = ss^2 * steps for a lattice walk
+    assert msd[0] == 0
+    assert msd == pytest.approx(4 * np.arange(50), rel=0.1)
+    displacement, squared = vec_walk.curve_statistics('1D')
+    assert displacement.count == 4000
+    assert (np.abs(displacement.mean) < 5 * displacement.std_error() + 1e-12).all()
+
+def test_profile(vec_walk, tmp_path, monkeypatch):
+    ### The profiler is DLA/profiling.py, as with PYTHONPATH=../../DLA
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'DLA'))
+    output = str(tmp_path / 'walk')
+    with vec_walk.profile(output, mode='sampling', interval=0.001):
+        vec_walk.curve_statistics('2D')
+    assert 'samples every 0.001 s' in open(output + '.profile.txt').read()
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in open(output + '.folded').read().splitlines())
+
+def test_iteration_chunks_respect_max_elements():
+    walk = Constant_Step(10, 1, 7)
+    for dimension, sizes in (('1D', [6, 1]), ('3D', [2, 2, 2, 1])):
+        chunks = list(walk.iteration_chunks(dimension, 60))
+        assert [len(chunk) for chunk in chunks] == sizes
+        assert all(chunk.size <= 60 for chunk in chunks)
@@ -0,0 +1,52 @@
+from trajectory_store import Trajectory_Writer, Trajectory_Reader, encode, decode
+from variablestep import Variable_Step
+from constantstep import Constant_Step
+import numpy as np
+import pytest
+
+def test_encode_decode():
+    block = np.random.default_rng(5).normal(size=(4, 6)).astype(np.float32)
+    for shuffle in [True, False]:
+        assert (decode(encode(block, shuffle, 1), (4, 6), np.float32, shuffle) == block).all()
+
+def test_variable_step_round_trip(tmp_path):
+    walk = Variable_Step(1.0, 100, 7, 1)
+    chunks = list(walk.trajectory_chunks('3D', 30, n_steps=100))
+    with Trajectory_Writer(tmp_path, 3, walker_block=3, workers=2) as writer:
+        for chunk in chunks:
+            writer.append_steps(chunk)
+
+    full = np.concatenate(chunks, axis=1)
+    reader = Trajectory_Reader(tmp_path)
+    assert (reader.walkers, reader.steps) == (7, 100)
+    assert (reader.read() == full).all()
+    assert (reader.read(walkers=(2, 5), steps=(25, 65)) == full[2:5, 25:65]).all()
+
+    columns = reader.read_columns(walkers=(6, 7), steps=(98, 100))
+    assert list(columns['walker']) == [6, 6]
+    assert list(columns['step']) == [98, 99]
+    assert (columns['z'] == full[6, 98:, 2]).all()
+
+def test_constant_step_round_trip(tmp_path):
+    np.random.seed(5)
+    walk = Constant_Step(20, 1, 10)
+    chunks = list(walk.iteration_chunks('2D', 60))
+    with Trajectory_Writer(tmp_path, 2, dtype=np.int64) as writer:
+        for chunk in chunks:
+            writer.append_walkers(chunk)
+
+    reader = Trajectory_Reader(tmp_path)
+    assert reader.columns == ['x', 'y']
+    assert (reader.read() == np.concatenate(chunks)).all()
+    assert (reader.read(walkers=(4, 6)) == np.concatenate(chunks)[4:6]).all()
+
+def test_missing_positions(tmp_path):
+    with Trajectory_Writer(tmp_path, 1, dtype=np.int64) as writer:
+        writer.write(np.ones((2, 3, 1), dtype=np.int64), 0, 0)
+        writer.write(np.ones((1, 3, 1), dtype=np.int64), 2, 3)
+
+    reader = Trajectory_Reader(tmp_path)
+    paths = reader.read()
+    assert paths.shape == (3, 6, 1)
+    assert (paths[2, :3] == np.iinfo(np.int64).min).all() and (paths[:2, 3:] == np.iinfo(np.int64).min).all()
+    assert (reader.read(fill_value=-1)[2, :3] == -1).all()
@@ -1,5 +1,7 @@
-from variablestep import Variable_Step
+import os
+from variablestep import Variable_Step, animation_paths, animation_frames, animation_artists, make_animation, render_animation
 import random
+import numpy as np
 import pytest
 random.seed(5)   # Random seed used to create reproducibility of results and generate numbers to write the below tests. 
 
@@ -40,4 +42,110 @@ def test_brownian_3D_vec(walk):
 def test_calc_displacements(walk):
     assert round(walk.calc_displacements('1D'), 1) == 2.4
     assert round(walk.calc_displacements('2D'), 1) == 2.1
-    assert round(walk.calc_displacements('3D'), 1) == -4.5
\ No newline at end of file
+    assert round(walk.calc_displacements('3D'), 1) == -4.5
+
+def test_end_points(walk):
+    ends = walk.end_points('3D')
+    assert ends.shape == (10, 3)
+
+def test_end_points_match_loop(walk):
+    loops = [walk.brownian_2D_loop(plot=False).iloc[-1] for i in range(10)]
+    np.random.seed(5)     # the seed set by the constructor, to draw the same numbers again
+    ends = walk.end_points('2D', max_elements=25)
+    assert np.allclose(ends, [[row['x'], row['y']] for row in loops])
+
+def test_displacement_curves(walk):
+    walk.iterations = 20000
+    av_disp, msd = walk.displacement_curves('2D')
+    assert len(av_disp) == len(msd) == 5
+    # Each co-ordinate after k + 1 increments has variance (k + 1) * dt^2
+    assert msd == pytest.approx(2 * 25 * np.arange(1, 6), rel=0.05)
+    assert np.abs(av_disp).max() < 1
+
+def test_vec_array_output(walk):
+    paths = walk.brownian_3D_vec(plot=False, dtype=np.float32, output='array')
+    assert paths.shape == (3, 5, 3)
+    assert paths.dtype == np.float32
+
+def test_vec_paths_match_dataframe(walk):
+    df = walk.brownian_2D_vec(plot=False)
+    np.random.seed(5)     # the seed set by the constructor, to draw the same numbers again
+    paths = walk.vec_paths(2, block_elements=3)     # splits each walker's 5 steps
+    assert np.allclose(paths[:, :, 0], df.iloc[:, 1:4].T)
+    assert np.allclose(paths[:, :, 1], df.iloc[:, 4:7].T)
+
+def test_vec_invalid_output(walk):
+    with pytest.raises(Exception):
+        walk.brownian_1D_vec(plot=False, output='test')
+
+def test_trajectory_chunks(walk):
+    chunks = list(walk.trajectory_chunks('3D', 4, n_steps=10))
+    assert [chunk.shape for chunk in chunks] == [(3, 4, 3), (3, 4, 3), (3, 2, 3)]
+
+    # Increments are continuous across chunk boundaries: same as drawing the chunks' increments in one go
+    np.random.seed(5)
+    increments = [5 * np.random.randn(3, length, 3) for length in (4, 4, 2)]
+    assert np.allclose(np.concatenate(chunks, axis=1), np.concatenate(increments, axis=1).cumsum(axis=1))
+
+def test_import_is_lazy():
+    ### Computing walks needs only NumPy: matplotlib and pandas are imported when plotting or building DataFrames
+    import os, sys, subprocess
+    code = "import sys, variablestep, constantstep; print([m for m in ('matplotlib', 'pandas') if m in sys.modules])"
+    output = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == '[]'
+
+def test_animation_paths(walk):
+    paths = walk.brownian_2D_vec(plot=False, output='array')
+    df = walk.vec_output(paths, 'dataframe')
+    unpacked, times = animation_paths(df, '2D')
+    assert (unpacked == paths).all()
+    assert (times == walk.t).all()
+    with pytest.raises(Exception):
+        animation_paths(paths, '3D')
+
+def test_animation_frames():
+    assert list(animation_frames(5)) == [1, 2, 3, 4, 5]
+    assert list(animation_frames(10, max_frames=4)) == [3, 6, 9, 10]
+
+def test_animation_artists(walk):
+    from matplotlib.figure import Figure
+    paths = walk.brownian_3D_vec(plot=False, output='array')
+    lines = animation_artists(Figure(), paths, walk.t)(3)
+    assert len(lines) == 3
+    assert (lines[1].get_data_3d()[2] == paths[1, :3, 2]).all()
+
+    lines = animation_artists(Figure(), paths[:, :, :1], walk.t)(2)
+    assert (lines[0].get_xdata() == walk.t[:2]).all()
+
+def test_render_animation(walk, tmp_path):
+    from PIL import Image
+    paths = walk.brownian_2D_vec(plot=False, output='array')
+    render_animation(paths, '2D', str(tmp_path / 'walk.gif'), max_frames=4, workers=2, writer='pillow', figsize=(2, 2), dpi=50)
+    with Image.open(tmp_path / 'walk.gif') as gif:
+        assert gif.n_frames == len(animation_frames(walk.N, 4))
+        assert gif.size == (100, 100)
+
+def test_profile(tmp_path, monkeypatch):
+    ### The profiler is DLA/profiling.py, as with PYTHONPATH=../../DLA
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'DLA'))
+    walk = Variable_Step(1.0, 10000, 20, 1)
+    output = str(tmp_path / 'results' / 'walk')
+    with walk.profile(output):
+        walk.brownian_2D_vec(plot=False, output='array')
+    with walk.profile(output):
+        walk.brownian_3D_vec(plot=False, output='array')
+
+    ### Both runs are in one cumulative report
+    report = open(output + '.profile.txt').read()
+    assert report.startswith('Cumulative profile of 2 runs')
+    assert 'brownian_2D_vec' in report and 'brownian_3D_vec' in report
+    assert 'variablestep.py:vec_paths' in open(output + '.folded').read()
+
+def test_trajectory_chunks_float32_carry():
+    ### The carried end position stays float64, so each float32 chunk is the float64 walk rounded once
+    walk = Variable_Step(1.0, 10, 2, 1)
+    chunks = list(walk.trajectory_chunks('1D', 100, n_steps=100000, dtype=np.float32))
+    np.random.seed(5)
+    exact = list(walk.trajectory_chunks('1D', 100, n_steps=100000))
+    assert all(chunk.dtype == np.float32 for chunk in chunks)
+    assert (chunks[-1] == exact[-1].astype(np.float32)).all()
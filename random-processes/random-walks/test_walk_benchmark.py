@@ -0,0 +1,54 @@
+from walk_benchmark import GENERATORS, run_case, run_suite, compare, speedups, main
+import os
+import json
+import pytest
+
+@pytest.fixture(autouse=True)
+def sde_path(monkeypatch):
+    ### The OU generators import brownian-motion/sde.py, as with PYTHONPATH=../brownian-motion
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'brownian-motion'))
+
+@pytest.mark.parametrize('generator', sorted(GENERATORS))
+def test_run_case(generator):
+    result = run_case(generator, 50, 3, 2, repeats=1)
+    assert result['steps'] == 150
+    assert result['steps_per_second'] > 0
+    assert result['peak_mb'] >= 0
+    json.dumps(result)
+
+def test_loops_skipped_for_long_cases(monkeypatch):
+    monkeypatch.setattr('walk_benchmark.LOOP_LIMIT', 100)
+    grid = {'N': [20, 100], 'M': [2], 'd': [1]}
+    results = run_suite(grid, ['constant_loop', 'ou_exact'], repeats=1, memory=False)
+    assert [(case['generator'], case['N']) for case in results['results']] == [('constant_loop', 20), ('ou_exact', 20), ('ou_exact', 100)]
+
+def test_speed_and_memory_regressions():
+    results = {'results': [{'generator': generator, 'N': 100, 'M': 10, 'd': 2, 'steps_per_second': 1e6, 'peak_mb': 10.0}
+                           for generator in ('variable_loop', 'variable_vectorised', 'variable_chunks')]}
+    baseline = json.loads(json.dumps(results))
+    baseline['results'][0]['steps_per_second'] *= 2
+    baseline['results'][1]['peak_mb'] /= 2
+    baseline['results'][2]['peak_mb'] = None
+
+    rows = compare(results, baseline)
+    assert [row['regression'] for row in rows] == [True, True, False]
+    assert rows[2]['peak_mb_ratio'] is None
+
+def test_speedups():
+    results = {'results': [{'generator': generator, 'N': 100, 'M': 10, 'd': 2, 'steps_per_second': speed, 'peak_mb': None}
+                           for generator, speed in (('constant_loop', 1e5), ('constant_vectorised', 1e7), ('variable_chunks', 1e6))]}
+    rows = speedups(results)
+    assert [(row['generator'], row['reference']) for row in rows] == [('constant_vectorised', 'constant_loop')]
+    assert rows[0]['speedup'] == pytest.approx(100)
+
+def test_main_with_new_cases(tmp_path, capsys):
+    ### Cases missing from the baseline, or without memory measured, are reported rather than failing to format
+    baseline = tmp_path / 'baseline.json'
+    assert main(['--grid', 'quick', '--generators', 'constant_vectorised', '--repeats', '1', '--no-memory', '--output', str(baseline)]) == 0
+    data = json.loads(baseline.read_text())
+    data['results'] = data['results'][:1]
+    baseline.write_text(json.dumps(data))
+
+    assert main(['--grid', 'quick', '--generators', 'constant_vectorised', '--repeats', '1', '--no-memory', '--output', str(tmp_path / 'new.json'),
+                 '--baseline', str(baseline), '--tolerance', '1']) == 0
+    assert 'memory      -' in capsys.readouterr().out
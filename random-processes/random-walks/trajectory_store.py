@@ -0,0 +1,296 @@
+import os
+import json
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+COLUMNS = ['x', 'y', 'z']
+
+
+def encode(block, shuffle, level):
+    '''
+    Compresses one column of a block of positions. Byte shuffling groups the bytes of each float by significance, which compresses better.
+
+    Parameters
+    ----------
+    block : np.ndarray
+        (walkers, steps) array of one co-ordinate
+    shuffle : bool
+        Whether to byte-shuffle before compressing
+    level : int
+        zlib compression level
+
+    Returns
+    -------
+    data : bytes
+        The compressed block
+    '''
+    raw = np.ascontiguousarray(block)
+    if shuffle:
+        raw = raw.view(np.uint8).reshape(-1, raw.itemsize).T.copy()
+
+    return zlib.compress(raw.tobytes(), level)
+
+
+def decode(data, shape, dtype, shuffle):
+    '''
+    Decompresses one column of a block written by encode().
+
+    Parameters
+    ----------
+    data : bytes-like
+        The compressed block
+    shape : tuple
+        (walkers, steps) shape of the block
+    dtype : data-type
+        Type of the positions
+    shuffle : bool
+        Whether the block was byte-shuffled
+
+    Returns
+    -------
+    block : np.ndarray
+        (walkers, steps) array of one co-ordinate
+    '''
+    dtype = np.dtype(dtype)
+    raw = np.frombuffer(zlib.decompress(data), dtype=np.uint8)
+    if shuffle:
+        raw = raw.reshape(dtype.itemsize, -1).T.copy()
+
+    return raw.view(dtype).reshape(shape)
+
+
+class Trajectory_Writer():
+    '''
+    Writes trajectories (walker, step, x, y, z) to a directory of compressed column files: one file per co-ordinate, holding compressed blocks of
+    (walkers x steps) positions, plus an index.json recording where each block sits. Walker and step columns are implicit in each block's ranges.
+    Blocks are compressed in a thread pool (zlib releases the GIL), while the calling thread carries on generating the next chunk.
+
+    Methods
+    -------
+    __init__
+        Constructor method, creates the store and the thread pool
+
+    write
+        Queues a chunk of positions at given walker and step offsets
+
+    append_steps, append_walkers
+        Queue chunks continuing along time (e.g. Variable_Step.trajectory_chunks) or along walkers (e.g. Constant_Step.iteration_chunks)
+
+    close
+        Writes any outstanding blocks and the index
+    '''
+
+    def __init__(self, path, dimensions, dtype=np.float64, walker_block=1024, level=1, shuffle=True, workers=4):
+        '''
+        Parameters
+        ----------
+        path : str
+            Directory in which the store is created
+        dimensions : int
+            The number of co-ordinates (1, 2 or 3)
+        dtype : data-type
+            Type the positions are stored as: floating point, or integer for lattice walks (e.g. Constant_Step)
+        walker_block : int
+            The maximum number of walkers in each compressed block
+        level : int
+            zlib compression level
+        shuffle : bool
+            Whether to byte-shuffle blocks before compressing
+        workers : int
+            The number of encoding threads
+        '''
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.columns = COLUMNS[:dimensions]
+        self.dtype = np.dtype(dtype)
+        self.walker_block = walker_block
+        self.level = level
+        self.shuffle = shuffle
+
+        self.files = {column: open(os.path.join(path, f'{column}.bin'), 'wb') for column in self.columns}
+        self.offsets = {column: 0 for column in self.columns}
+        self.blocks = []
+        self.walkers = 0
+        self.steps = 0
+
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.pending = deque()
+        self.max_pending = 4 * workers
+
+    def write(self, paths, walker_start, step_start):
+        '''
+        Queues a chunk of positions for compression.
+
+        Parameters
+        ----------
+        paths : np.ndarray
+            (walkers, steps, dimensions) array of positions
+        walker_start : int
+            Index of the first walker in the chunk
+        step_start : int
+            Index of the first step in the chunk
+        '''
+        paths = np.asarray(paths, dtype=self.dtype)
+        n_walkers, n_steps = paths.shape[:2]
+
+        for start in range(0, n_walkers, self.walker_block):
+            stop = min(start + self.walker_block, n_walkers)
+            block = {'walkers': [walker_start + start, walker_start + stop], 'steps': [step_start, step_start + n_steps]}
+            futures = [self.pool.submit(encode, paths[start:stop, :, k], self.shuffle, self.level) for k in range(len(self.columns))]
+            self.pending.append((block, futures))
+
+            ### Write finished blocks in order, keeping a bounded number in flight
+            while len(self.pending) > self.max_pending:
+                self.flush_one()
+
+        self.walkers = max(self.walkers, walker_start + n_walkers)
+        self.steps = max(self.steps, step_start + n_steps)
+
+    def append_steps(self, paths):
+        '''Queues a chunk of the same walkers, continuing on from the last step written.'''
+        self.write(paths, 0, self.steps)
+
+    def append_walkers(self, paths):
+        '''Queues a chunk of whole walks, after the last walker written.'''
+        self.write(paths, self.walkers, 0)
+
+    def flush_one(self):
+        '''Waits for the oldest queued block and appends it to the column files.'''
+        block, futures = self.pending.popleft()
+        block['data'] = {}
+
+        for column, future in zip(self.columns, futures):
+            data = future.result()
+            self.files[column].write(data)
+            block['data'][column] = [self.offsets[column], len(data)]
+            self.offsets[column] += len(data)
+
+        self.blocks.append(block)
+
+    def close(self):
+        '''Writes any outstanding blocks and the index, then closes the files and thread pool.'''
+        while self.pending:
+            self.flush_one()
+
+        self.pool.shutdown()
+        for file in self.files.values():
+            file.close()
+
+        index = {'columns': self.columns, 'dtype': self.dtype.str, 'shuffle': self.shuffle, 'walkers': self.walkers, 'steps': self.steps, 'blocks': self.blocks}
+        with open(os.path.join(self.path, 'index.json'), 'w') as file:
+            json.dump(index, file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class Trajectory_Reader():
+    '''
+    Reads a store written by Trajectory_Writer. Column files are memory mapped, so only the blocks overlapping the requested walker and step ranges
+    are paged in and decompressed.
+
+    Methods
+    -------
+    __init__
+        Constructor method, loads the index and maps the column files
+
+    read
+        Positions for a range of walkers and steps, as a (walkers, steps, dimensions) array
+
+    read_columns
+        The same positions as flat walker, step, x, y, z columns
+    '''
+
+    def __init__(self, path):
+        '''
+        Parameters
+        ----------
+        path : str
+            Directory of the store
+        '''
+        with open(os.path.join(path, 'index.json')) as file:
+            index = json.load(file)
+
+        self.columns = index['columns']
+        self.dtype = np.dtype(index['dtype'])
+        self.shuffle = index['shuffle']
+        self.walkers = index['walkers']
+        self.steps = index['steps']
+        self.blocks = index['blocks']
+
+        self.maps = {}
+        for column in self.columns:
+            file_path = os.path.join(path, f'{column}.bin')
+            # An empty file cannot be memory mapped
+            self.maps[column] = np.memmap(file_path, dtype=np.uint8, mode='r') if os.path.getsize(file_path) else np.empty(0, dtype=np.uint8)
+
+    def read(self, walkers=None, steps=None, fill_value=None):
+        '''
+        Positions for a range of walkers and steps. Positions that were never written are set to fill_value.
+
+        Parameters
+        ----------
+        walkers : tuple or None
+            (start, stop) walker range, all walkers if None
+        steps : tuple or None
+            (start, stop) step range, all steps if None
+        fill_value : scalar or None
+            Value of positions that were never written, or None for NaN in floating point stores and the most negative integer in integer stores
+
+        Returns
+        -------
+        paths : np.ndarray
+            (walkers, steps, dimensions) array of positions
+        '''
+        w0, w1 = (0, self.walkers) if walkers is None else walkers
+        s0, s1 = (0, self.steps) if steps is None else steps
+        if fill_value is None:
+            fill_value = np.nan if np.issubdtype(self.dtype, np.floating) else np.iinfo(self.dtype).min
+        paths = np.full((w1 - w0, s1 - s0, len(self.columns)), fill_value, dtype=self.dtype)
+
+        for block in self.blocks:
+            (bw0, bw1), (bs0, bs1) = block['walkers'], block['steps']
+            if bw1 <= w0 or bw0 >= w1 or bs1 <= s0 or bs0 >= s1:
+                continue
+
+            ### Overlap of the block with the requested ranges, in block and output co-ordinates
+            lw0, lw1 = max(w0, bw0), min(w1, bw1)
+            ls0, ls1 = max(s0, bs0), min(s1, bs1)
+
+            for k, column in enumerate(self.columns):
+                offset, length = block['data'][column]
+                values = decode(self.maps[column][offset:offset + length], (bw1 - bw0, bs1 - bs0), self.dtype, self.shuffle)
+                paths[lw0 - w0:lw1 - w0, ls0 - s0:ls1 - s0, k] = values[lw0 - bw0:lw1 - bw0, ls0 - bs0:ls1 - bs0]
+
+        return paths
+
+    def read_columns(self, walkers=None, steps=None, fill_value=None):
+        '''
+        Positions for a range of walkers and steps as flat columns.
+
+        Parameters
+        ----------
+        walkers, steps, fill_value
+            See read()
+
+        Returns
+        -------
+        columns : dict
+            Arrays 'walker', 'step' and one per co-ordinate ('x', 'y', 'z'), with one entry per (walker, step)
+        '''
+        w0, w1 = (0, self.walkers) if walkers is None else walkers
+        s0, s1 = (0, self.steps) if steps is None else steps
+        paths = self.read((w0, w1), (s0, s1), fill_value)
+
+        walker, step = np.meshgrid(np.arange(w0, w1), np.arange(s0, s1), indexing='ij')
+        columns = {'walker': walker.ravel(), 'step': step.ravel()}
+        for k, column in enumerate(self.columns):
+            columns[column] = paths[:, :, k].ravel()
+
+        return columns
@@ -1,14 +1,7 @@
 import math
+import contextlib
 import numpy as np
-import pandas as pd
-from cycler import cycler
-from numpy import random
-from random import random
-import matplotlib
-import matplotlib.pyplot as plt
-from matplotlib import animation
-from mpl_toolkits import mplot3d
-plt.style.use('seaborn-whitegrid')
+from accumulators import displacement_statistics
 
 
 class Variable_Step():
@@ -20,9 +13,18 @@ class Variable_Step():
     __init__
         Constructor method, sets class variables and random seed
 
+    profile
+        Context manager profiling the walks generated inside it
+
     brownian_1D_loop
         1D Brownian motion for a single path, using a for loop
 
+    vec_paths
+        Paths for multiple walkers in a single preallocated (M, N, d) array, used by the vectorised methods
+
+    vec_output
+        Returns vectorised paths as a NumPy array or a DataFrame
+
     brownian_1D_vec
         1D Brownian motion for multiple maths, using a vectorised method
 
@@ -35,6 +37,18 @@ class Variable_Step():
     brownian_3D_vec
         3D Brownian motion for multiple maths, using a vectorised method
 
+    trajectory_chunks
+        Generator of the paths of all walkers a chunk of steps at a time, for walks too long to hold in memory
+
+    end_points
+        Final positions of batches of iterations, from vectorised Gaussian increments
+
+    curve_statistics
+        Streaming accumulators of displacement and squared distance at every step, over multiple iterations
+
+    displacement_curves
+        Average displacement and mean-squared displacement at every step, over multiple iterations
+
     calc_displacements
         Calculating the average displacement of a particle from the origin over multiple iterations
     '''
@@ -62,12 +76,46 @@ class Variable_Step():
         self.T = T    # total simulation time
         self.N = N    # number of steps
         self.M = M    # number of paths ('walkers')
+        self.profiler = None     # see profile()
         self.iterations = iterations    # number of iterations of one simulation
         
         self.dt = math.sqrt(T/(N-1))    # sqrt of time interval
         self.t = np.linspace(0, T, N)    # create time list (from 0 to T with step size T/N)
 
 
+    @contextlib.contextmanager
+    def profile(self, output, mode='cprofile', interval=0.005):
+        '''
+        Context manager profiling the walks generated inside it, e.g. with walk.profile('results/walk'): walk.brownian_2D_vec(plot=False)
+        When each with block ends, writes a ranked hot-function report (output + '.profile.txt') and flame graph folded stacks (output + '.folded'),
+        covering every block profiled with the same output and mode. Uses DLA/profiling.py, which is only imported here and must be on the import
+        path (e.g. PYTHONPATH=../../DLA).
+
+        Parameters
+        ----------
+        output : str
+            Path prefix of the files written, e.g. next to the run's results
+        mode : str
+            'cprofile' (deterministic, every call timed, also writes output + '.prof') or 'sampling' (low overhead, exact stacks)
+        interval : float
+            Seconds between samples, for mode='sampling'
+
+        Yields
+        ------
+        profiler : Profiler
+            The profiler, whose runs accumulate
+        '''
+        from profiling import Profiler
+
+        if self.profiler is None or self.profiler.output != output or self.profiler.mode != mode:
+            self.profiler = Profiler(output, mode, interval)
+
+        with self.profiler:
+            yield self.profiler
+
+        self.profiler.dump()
+
+
     def brownian_1D_loop(self, plot=True):
         '''
         1D Brownian Motion Path for a single walker, using a for loop
@@ -87,11 +135,14 @@ class Variable_Step():
             x[i] = x[i-1] + dx[i] 
        
         ## Create dataframe and fill with lists, then delete lists
+        import pandas as pd
         df = pd.DataFrame({'t': self.t, 'x': x, 'dx': dx})
         del x, dx
 
         if plot == True:
             ### Plot t against x 
+            import matplotlib.pyplot as plt
+            plt.style.use('seaborn-v0_8-whitegrid')
             fig, ax = plt.figure(), plt.axes()
             fig.set_size_inches(8, 4)
             ax.plot(df['t'], df['x'], marker='o', markersize=1, linewidth=0)
@@ -101,34 +152,94 @@ class Variable_Step():
         return df
 
 
-    def brownian_1D_vec(self):
+    def vec_paths(self, d, dtype=np.float64, block_elements=2**20):
         '''
-        1D Brownian Motion Path, using vectorised method and for multiple (M) walkers
+        Paths of all M walkers in d dimensions, in a single preallocated (M, N, d) array. Increments are drawn at most block_elements at a time
+        (whole walkers where they fit, otherwise part of one walker's steps) and scaled straight into the array, then cumulatively summed in place,
+        so peak memory is the output array plus one block. The random numbers are drawn in the same order as separate dx, dy and dz arrays of
+        shape (M, N), as the vectorised methods originally did.
+
+        Parameters
+        ----------
+        d : int
+            The number of random variables (dimensions)
+        dtype : data-type
+            Floating point type of the output, e.g. np.float32 to halve its memory
+        block_elements : int
+            The most random numbers drawn at once
+
+        Returns
+        -------
+        paths : np.ndarray
+            (M, N, d) array of positions
         '''
-        ### Vectorised method for multiple paths (MxN array)
-        dx = self.dt * np.random.randn(self.M, self.N)
-        x = np.cumsum(dx, axis = 1)
-        
-        ### Assign values into a dataframe
-        df = pd.DataFrame(x).T      # takes transpose to flip rows/columns
-        df.insert(0, 'Time', self.t, True)
+        paths = np.empty((self.M, self.N, d), dtype=dtype)
+        walkers = max(1, block_elements // self.N)
+        steps = min(self.N, block_elements)
+
+        for k in range(d):
+            for start in range(0, self.M, walkers):
+                stop = min(start + walkers, self.M)
+                for first in range(0, self.N, steps):
+                    last = min(first + steps, self.N)
+                    np.multiply(np.random.randn(stop - start, last - first), self.dt, out=paths[start:stop, first:last, k], casting='same_kind')
+
+        np.cumsum(paths, axis=1, out=paths)
+
+        return paths
+
+
+    def vec_output(self, paths, output):
+        '''
+        Returns vectorised paths as an array, or as the DataFrame of the original vectorised methods: a 'Time' column followed by the x columns of
+        every walker, then the y columns, then the z columns.
+
+        Parameters
+        ----------
+        paths : np.ndarray
+            (M, N, d) array of positions
+        output : str
+            'dataframe' or 'array'
+        '''
+        if output == 'array':
+            return paths
+
+        elif output == 'dataframe':
+            import pandas as pd
+            df_join = pd.concat([pd.DataFrame(paths[:, :, k].T) for k in range(paths.shape[2])], axis = 1)
+            df_join.insert(0, 'Time', self.t, True)
+            return df_join
 
+        else:
+            raise Exception('Parameter "output" must be "dataframe" or "array".')
 
-        ### Plot t against x 
-        fig, ax = plt.figure(), plt.axes()
-        fig.set_size_inches(8, 4)
 
-        # Aesthetics: cycles through a colormap
-        ax.set_prop_cycle('color', plt.cm.winter(np.linspace(0, 4, self.M*4)))  
+    def brownian_1D_vec(self, plot=True, dtype=np.float64, output='dataframe'):
+        '''
+        1D Brownian Motion Path, using vectorised method and for multiple (M) walkers
+        Set output='array' (and dtype=np.float32) to skip the DataFrame and keep memory to a single (M, N, 1) array
+        '''
+        ### Vectorised method for multiple paths (MxNx1 array)
+        paths = self.vec_paths(1, dtype)
 
-        for i in range(self.M):
-            ax.plot(df['Time'], df.iloc[:, i+1], marker='o', markersize=0.25, linewidth=0)
+        if plot == True:
+            ### Plot t against x 
+            import matplotlib.pyplot as plt
+            plt.style.use('seaborn-v0_8-whitegrid')
+            fig, ax = plt.figure(), plt.axes()
+            fig.set_size_inches(8, 4)
 
-        ax.set(xlabel='Time t', ylabel='Random Variable $X(t)$', title='1D Brownian Motion Multiple Paths (Variable Step Size)')
+            # Aesthetics: cycles through a colormap
+            ax.set_prop_cycle('color', plt.cm.winter(np.linspace(0, 4, self.M*4)))  
 
-        plt.show()  
+            for i in range(self.M):
+                ax.plot(self.t, paths[i, :, 0], marker='o', markersize=0.25, linewidth=0)
+
+            ax.set(xlabel='Time t', ylabel='Random Variable $X(t)$', title='1D Brownian Motion Multiple Paths (Variable Step Size)')
+
+            plt.show()  
         
-        return df
+        return self.vec_output(paths, output)
 
 
     def brownian_2D_loop(self, plot=True):
@@ -159,11 +270,14 @@ class Variable_Step():
             y[i] = y[i-1] + dy[i] 
 
         ### Create dataframe and fill with lists, then delete lists
+        import pandas as pd
         df = pd.DataFrame({'t': self.t, 'x': x, 'dx': dx, 'y': y, 'dy': dy})
         del x, dx, y, dy
 
         if plot == True:
             ### Plot x against y
+            import matplotlib.pyplot as plt
+            plt.style.use('seaborn-v0_8-whitegrid')
             fig = plt.figure()
             ax = fig.add_subplot(111)
             fig.set_size_inches(8, 4)
@@ -180,39 +294,32 @@ class Variable_Step():
         return df
 
 
-    def brownian_2D_vec(self):
+    def brownian_2D_vec(self, plot=True, dtype=np.float64, output='dataframe'):
         '''
         2D Brownian Motion Path, using vectorised method and for multiple (M) walkers
-        Plot parameter set to False when method called in calc_displacements() for displacement calculations
+        Set output='array' (and dtype=np.float32) to skip the DataFrame and keep memory to a single (M, N, 2) array
         '''
-        ### Vectorised method for multiple paths (MxN array)
-        dx = self.dt * np.random.randn(self.M, self.N)
-        x = np.cumsum(dx, axis = 1)
+        ### Vectorised method for multiple paths (MxNx2 array)
+        paths = self.vec_paths(2, dtype)
 
-        dy = self.dt * np.random.randn(self.M, self.N)
-        y = np.cumsum(dy, axis = 1)
-        
-        ### Assign values into a dataframe
-        df_x = pd.DataFrame(x).T
-        df_y = pd.DataFrame(y).T
-        df_join = pd.concat([df_x, df_y], axis = 1)
-        df_join.insert(0, 'Time', self.t, True)
-
-        ### Plot x against y 
-        fig, ax = plt.figure(), plt.axes()
-        fig.set_size_inches(8, 4)
+        if plot == True:
+            ### Plot x against y 
+            import matplotlib.pyplot as plt
+            plt.style.use('seaborn-v0_8-whitegrid')
+            fig, ax = plt.figure(), plt.axes()
+            fig.set_size_inches(8, 4)
 
-        # Aesthetics: cycles through a colormap
-        ax.set_prop_cycle('color', plt.cm.winter(np.linspace(0, 4, self.M*4)))  
+            # Aesthetics: cycles through a colormap
+            ax.set_prop_cycle('color', plt.cm.winter(np.linspace(0, 4, self.M*4)))  
 
-        for i in range(self.M):
-            ax.plot(df_join.iloc[:, i+1], df_join.iloc[:, i+1+self.M], marker='o', markersize=0.25, linewidth=0.3)
+            for i in range(self.M):
+                ax.plot(paths[i, :, 0], paths[i, :, 1], marker='o', markersize=0.25, linewidth=0.3)
 
-        ax.set(xlabel='Random Variable $X(t)$', ylabel='Random Variable $Y(t)$', title='2D Brownian Motion Multiple Paths (Variable Step Size)')
+            ax.set(xlabel='Random Variable $X(t)$', ylabel='Random Variable $Y(t)$', title='2D Brownian Motion Multiple Paths (Variable Step Size)')
 
-        plt.show()  
+            plt.show()  
 
-        return df_join
+        return self.vec_output(paths, output)
 
 
     def brownian_3D_loop(self, plot=True):
@@ -252,11 +359,14 @@ class Variable_Step():
             z[i] = z[i-1] + dz[i] 
 
         ### Create dataframe and fill with lists, then delete lists
+        import pandas as pd
         df = pd.DataFrame({'t': self.t, 'x': x, 'dx': dx, 'y': y, 'dy': dy, 'z': z, 'dz': dz})
         del x, dx, y, dy, z, dz
 
         if plot == True:
             ### Plot x against y and z
+            import matplotlib.pyplot as plt
+            plt.style.use('seaborn-v0_8-whitegrid')
             fig = plt.figure()
             fig.set_size_inches(8, 4)
             ax = fig.add_subplot(1, 1, 1, projection='3d')
@@ -267,50 +377,171 @@ class Variable_Step():
         return df
 
 
-    def brownian_3D_vec(self):
+    def brownian_3D_vec(self, plot=True, dtype=np.float64, output='dataframe'):
         '''
         3D Brownian Motion Path, using vectorised method and for multiple (M) walkers
-        Plot parameter set to False when method called in calc_displacements() for displacement calculations
+        Set output='array' (and dtype=np.float32) to skip the DataFrame and keep memory to a single (M, N, 3) array
         '''
-        ### Vectorised method for multiple paths (MxN array)
-        dx = self.dt * np.random.randn(self.M, self.N)
-        x = np.cumsum(dx, axis = 1)
+        ### Vectorised method for multiple paths (MxNx3 array)
+        paths = self.vec_paths(3, dtype)
 
-        dy = self.dt * np.random.randn(self.M, self.N)
-        y = np.cumsum(dy, axis = 1)
+        if plot == True:
+            ### Plot x against y and z
+            import matplotlib.pyplot as plt
+            plt.style.use('seaborn-v0_8-whitegrid')
+            fig = plt.figure()
+            ax = fig.add_subplot(1, 1, 1, projection='3d')
+            fig.set_size_inches(8, 4)
 
-        dz = self.dt * np.random.randn(self.M, self.N)
-        z = np.cumsum(dz, axis = 1)
-        
-        ### Assign values into a dataframe
-        df_x = pd.DataFrame(x).T
-        df_y = pd.DataFrame(y).T
-        df_z = pd.DataFrame(z).T
-        df_join = pd.concat([df_x, df_y, df_z], axis = 1)
-        df_join.insert(0, 'Time', self.t, True)
+            # Aesthetics: cycles through a colormap
+            ax.set_prop_cycle('color', plt.cm.winter(np.linspace(0, 4, self.M*4)))  
 
-        ### Plot x against y and z
-        fig = plt.figure()
-        ax = fig.add_subplot(1, 1, 1, projection='3d')
-        fig.set_size_inches(8, 4)
+            for i in range(self.M):
+                ax.plot(paths[i, :, 0], paths[i, :, 1], paths[i, :, 2], marker='o', markersize=0.25, linewidth=0.2)
 
-        # Aesthetics: cycles through a colormap
-        ax.set_prop_cycle('color', plt.cm.winter(np.linspace(0, 4, self.M*4)))  
+            plt.rcParams.update({'font.size': 6})
+            ax.set(xlabel='Random Variable $X(t)$', ylabel='Random Variable $Y(t)$', zlabel='Random Variable $Z(t)$', title='3D Brownian Motion Multiple Paths (Variable Step Size)')
 
-        for i in range(self.M):
-            ax.plot(df_join.iloc[:, i+1], df_join.iloc[:, i+1+self.M], df_join.iloc[:, i+1+self.M+self.M], marker='o', markersize=0.25, linewidth=0.2)
+            plt.show()  
 
-        matplotlib.rcParams.update({'font.size': 6})
-        ax.set(xlabel='Random Variable $X(t)$', ylabel='Random Variable $Y(t)$', zlabel='Random Variable $Z(t)$', title='3D Brownian Motion Multiple Paths (Variable Step Size)')
+        return self.vec_output(paths, output)
 
-        plt.show()  
 
-        return df_join
+    def trajectory_chunks(self, dimension, chunk_length, n_steps=None, dtype=np.float64):
+        '''
+        Generates the paths of all M walkers a chunk of steps at a time, carrying each walker's end position over into the next chunk,
+        so arbitrarily long walks can be processed in constant memory. Chunk i holds steps i*chunk_length to (i + 1)*chunk_length - 1.
+
+        Parameters
+        ----------
+        dimension : str
+            Selects the number of random variables
+
+        chunk_length : int
+            The number of steps in each chunk (the last chunk may be shorter)
+
+        n_steps : int or None
+            The total number of steps, self.N if None
+
+        dtype : data-type
+            Floating point type of the chunks
+
+        Yields
+        ------
+        paths : np.ndarray
+            (M, chunk length, number of dimensions) array of positions
+        '''
+        d = int(dimension[0])
+        n_steps = self.N if n_steps is None else n_steps
+        ### Positions are summed in float64 and only the yielded chunks are cast, so float32 rounding does not accumulate from chunk to chunk
+        position = np.zeros((self.M, 1, d))
+
+        for start in range(0, n_steps, chunk_length):
+            length = min(chunk_length, n_steps - start)
+            paths = self.dt * np.random.randn(self.M, length, d)
+            np.cumsum(paths, axis=1, out=paths)
+            paths += position
+            position = paths[:, -1:, :].copy()
+            yield paths.astype(dtype, copy=False)
+
+
+    def iteration_chunks(self, dimension, max_elements):
+        '''
+        Generates the paths of all self.iterations walkers in chunks, from vectorised Gaussian increments. The increments are drawn in the same order as the
+        brownian_*_loop methods draw them (each iteration in turn, and x, y, z interleaved at each step), so the same seed gives the same paths.
+
+        Parameters
+        ----------
+        dimension : str
+            Selects the number of random variables
+
+        max_elements : int
+            The maximum number of elements (walks x steps x dimensions) in each chunk, which holds at least one whole walk
+
+        Yields
+        ------
+        paths : np.ndarray
+            (chunk size, N, number of dimensions) array of positions
+        '''
+        d = int(dimension[0])
+        chunk = max(1, max_elements // (self.N * d))
+
+        for start in range(0, self.iterations, chunk):
+            size = min(chunk, self.iterations - start)
+            paths = self.dt * np.random.randn(size, self.N, d)
+            np.cumsum(paths, axis=1, out=paths)
+            yield paths
+
+
+    def end_points(self, dimension, max_elements=2**22):
+        '''
+        Final positions of all self.iterations walkers, without building a DataFrame per iteration.
+
+        Parameters
+        ----------
+        dimension : str
+            Selects the number of random variables
+
+        max_elements : int
+            The maximum number of increments held in memory at once
+
+        Returns
+        -------
+        ends : np.ndarray
+            (iterations, number of dimensions) array of final positions
+        '''
+        return np.concatenate([paths[:, -1, :] for paths in self.iteration_chunks(dimension, max_elements)])
+
+
+    def curve_statistics(self, dimension, max_elements=2**22):
+        '''
+        Streams all self.iterations walkers into accumulators of the displacement and squared distance at every step, holding only one chunk of paths
+        in memory at a time. The accumulators can be merged with those from other runs or processes.
+
+        Parameters
+        ----------
+        dimension : str
+            Selects the number of random variables
+
+        max_elements : int
+            The maximum number of increments held in memory at once
+
+        Returns
+        -------
+        displacement, squared : Running_Statistics
+            See accumulators.displacement_statistics
+        '''
+        return displacement_statistics(self.iteration_chunks(dimension, max_elements), self.N)
+
+
+    def displacement_curves(self, dimension, max_elements=2**22):
+        '''
+        Average displacement (the sum of co-ordinates, as in calc_displacements) and mean-squared displacement at every step, over all self.iterations walkers.
+
+        Parameters
+        ----------
+        dimension : str
+            Selects the number of random variables
+
+        max_elements : int
+            The maximum number of increments held in memory at once
+
+        Returns
+        -------
+        av_disp : np.ndarray
+            Length N array of the average displacement at each step
+        msd : np.ndarray
+            Length N array of the mean-squared distance from the origin at each step
+        '''
+        displacement, squared = self.curve_statistics(dimension, max_elements)
+
+        return displacement.mean, squared.mean
 
 
     def calc_displacements(self, dimension):
         '''
-        Calculates average displacement over many iterations, for random walks in 1D, 2D and 3D.
+        Calculates average displacement over many iterations, for random walks in 1D, 2D and 3D. Uses the same random numbers as repeated calls of
+        brownian_1D_loop, brownian_2D_loop or brownian_3D_loop, but from vectorised increments (see end_points).
         N.B. The rms displacement has no clear relation to N for variable step size. 
 
         Parameters
@@ -318,123 +549,298 @@ class Variable_Step():
         dimension : str
             Selects which array is returned based on number of random variables
         '''
+        ends = self.end_points(dimension)
+        av_disp = float(ends.sum()/self.iterations)
 
-        all_coord, all_xcoord, all_ycoord, all_zcoord, all_coord_sq = 0, 0, 0, 0, 0
+        print(f"For {self.iterations} iterations and {self.N} steps, the average displacement is {av_disp}.")
 
-        if dimension == '1D':
-            for i in range(self.iterations):
-                df = self.brownian_1D_loop(plot=False)
-                coord_1D = df['x'].iloc[-1]
-                # mean_length = abs(df['dx'].mean())
+        return av_disp
 
-                all_coord += coord_1D
-                # all_coord_sq += coord_1D**2      
 
-            av_disp = all_coord/self.iterations
-            # rms_disp = math.sqrt(all_coord_sq/self.iterations)
+def animation_paths(brownian, dimension, times=None):
+    '''
+    Returns the paths and times to animate as contiguous arrays. DataFrames from the vectorised methods (a 'Time' column, then the x columns of every walker,
+    then the y columns, then the z columns) are unpacked once, so frames never touch pandas.
+
+    Parameters
+    ----------
+    brownian : np.ndarray or pd.DataFrame
+        (walkers, steps, dims) array of positions, e.g. from brownian_2D_vec(output='array'), or the DataFrame of a vectorised method
+    dimension : str
+        '1D', '2D' or '3D'
+    times : np.ndarray or None
+        Time of each step, used for the x axis in 1D. Defaults to the 'Time' column of a DataFrame, or the step number
+
+    Returns
+    -------
+    paths : np.ndarray
+        (walkers, steps, dims) array of positions
+    times : np.ndarray
+        Time of each step
+    '''
+    if dimension not in ('1D', '2D', '3D'):
+        raise Exception("Parameter 'dimension' must be '1D', '2D' or '3D'.")
+    d = int(dimension[0])
 
-            print(f"For {self.iterations} iterations and {self.N} steps, the average displacement is {av_disp}.")
-            
-            return av_disp
+    if not isinstance(brownian, np.ndarray):
+        if times is None:
+            times = brownian['Time'].to_numpy()
+        values = brownian.to_numpy()[:, 1:]
+        brownian = values.reshape(len(values), d, -1).transpose(2, 0, 1)
+
+    paths = np.ascontiguousarray(brownian)
+    if paths.ndim != 3 or paths.shape[2] != d:
+        raise Exception(f"Paths must be a (walkers, steps, {d}) array for a {dimension} animation.")
+
+    if times is None:
+        times = np.arange(paths.shape[1])
 
-        elif dimension == '2D':
-            for i in range(self.iterations):
-                df = self.brownian_2D_loop(plot=False)
-                x = df['x'].iloc[-1]
-                y = df['y'].iloc[-1]
+    return paths, np.asarray(times)
 
-                all_xcoord += x
-                all_ycoord += y
 
-            av_disp = (all_xcoord + all_ycoord)/self.iterations
+def animation_frames(N, max_frames=1000):
+    '''
+    Returns the number of steps drawn in each frame. Walks longer than max_frames steps are decimated, so each frame adds several steps.
+
+    Parameters
+    ----------
+    N : int
+        The number of steps in each path
+    max_frames : int
+        The maximum number of frames
+    '''
+    stride = math.ceil(N / max_frames)
+
+    return np.minimum(np.arange(1, math.ceil(N / stride) + 1) * stride, N)
+
+
+def animation_artists(fig, paths, times):
+    '''
+    Creates one line per walker on axes whose limits are computed once from all the paths, and returns a function that draws the first end steps of every path.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+        Figure to draw on
+    paths : np.ndarray
+        (walkers, steps, dims) array of positions
+    times : np.ndarray
+        Time of each step, used for the x axis in 1D
+
+    Returns
+    -------
+    update : function
+        update(end), setting every line to its first end steps and returning the lines
+    '''
+    d = paths.shape[2]
+    low, high = paths.min(axis=(0, 1)), paths.max(axis=(0, 1))
 
-            print(f"For {self.iterations} iterations and {self.N} steps, the average displacement is {av_disp}.")
+    if d == 1:
+        ax = fig.add_subplot(xlim=(times[0], times[-1]), ylim=(low[0], high[0]))
+        lines = [ax.plot([], [], '-')[0] for i in range(len(paths))]
 
-            return av_disp
+        def update(end):
+            for line, path in zip(lines, paths):
+                line.set_data(times[:end], path[:end, 0])
+            return lines
 
-        else:   # dimension == '3D'
-            for i in range(self.iterations):
-                df = self.brownian_3D_loop(plot=False)
-                x = df['x'].iloc[-1]
-                y = df['y'].iloc[-1]
-                z = df['z'].iloc[-1]
+    elif d == 2:
+        ax = fig.add_subplot(xlim=(low[0], high[0]), ylim=(low[1], high[1]))
+        lines = [ax.plot([], [], '-')[0] for i in range(len(paths))]
 
-                all_xcoord += x
-                all_ycoord += y
-                all_zcoord += z
+        def update(end):
+            for line, path in zip(lines, paths):
+                line.set_data(path[:end, 0], path[:end, 1])
+            return lines
 
-            av_disp = (all_xcoord + all_ycoord + all_zcoord)/self.iterations
+    else:
+        ax = fig.add_subplot(xlim=(low[0], high[0]), ylim=(low[1], high[1]), zlim=(low[2], high[2]), projection='3d')
+        lines = [ax.plot([], [], [], '-')[0] for i in range(len(paths))]
 
-            print(f"For {self.iterations} iterations and {self.N} steps, the average displacement is {av_disp}.")
+        def update(end):
+            for line, path in zip(lines, paths):
+                line.set_data(path[:end, 0], path[:end, 1])
+                line.set_3d_properties(path[:end, 2])
+            return lines
 
-            return av_disp
+    return update
 
 
-def make_animation(brownian, dimension):
+def make_animation(brownian, dimension, times=None, max_frames=1000, interval=25, show=True):
     '''
     Uses matplotlib.animation to visualise live generation of random walks in 1D, 2D and 3D. 
+    Each frame updates the line of every walker from views of a single array, with walks longer than max_frames steps decimated.
+
+    Parameters
+    ----------
+    brownian, dimension, times
+        See animation_paths
+    max_frames : int
+        The maximum number of frames
+    interval : int
+        Delay between frames in milliseconds
+    show : bool
+        Whether to show the animation, as well as returning it
+
+    Returns
+    -------
+    anim : matplotlib.animation.FuncAnimation
+        The animation, which can also be saved
     '''
-    
+    paths, times = animation_paths(brownian, dimension, times)
+
+    import matplotlib.pyplot as plt
+    plt.style.use('seaborn-v0_8-whitegrid')
+    from matplotlib import animation
     fig = plt.figure()
+    update = animation_artists(fig, paths, times)
 
-    if dimension == '1D':
-        ylim_max = max([brownian[column].max() for column in brownian.columns[1:]])
-        ylim_min = min([brownian[column].min() for column in brownian.columns[1:]])
-        xlim_max = brownian['Time'].iloc[-1]
-        xlim_min = 0
-        ax = plt.axes(xlim = (xlim_min, xlim_max), ylim = (ylim_min, ylim_max))
-        lines = [ax.plot([], [], '-')[0] for i in range(len(brownian.columns[1:]))]
-    
-        def animate(i):
-            time = brownian['Time']
-            for l, column in enumerate(brownian.columns[1:]):
-                lines[l].set_data([time[: i]], [brownian[column][:i]])
-            
-            return lines
-    
-    elif dimension == '2D':
-        ylim_max = max([brownian[columns].iloc[:,1].max() for columns in brownian.columns[1:]])
-        ylim_min = min([brownian[columns].iloc[:,1].min() for columns in brownian.columns[1:]])
-        xlim_max = max([brownian[columns].iloc[:,0].max() for columns in brownian.columns[1:]])
-        xlim_min = min([brownian[columns].iloc[:,0].min() for columns in brownian.columns[1:]])
-        ax = plt.axes(xlim = (xlim_min, xlim_max), ylim = (ylim_min, ylim_max))
-        lines = [ax.plot([], [], '-')[0] for i in range((len(brownian.iloc[1, :])-1)//2-2)]
-
-        def animate(i):
-            time = brownian['Time']
-     
-            for l in range(1, (len(brownian.iloc[1, :])-1)//2-1):
-                lines[l-1].set_data([brownian[l].iloc[:i, 0]], [brownian[l].iloc[:i, 1]])
-            
-            return lines
+    anim = animation.FuncAnimation(fig, update, frames=animation_frames(paths.shape[1], max_frames), interval=interval, blit=True)
+    if show:
+        plt.show()
 
-    elif dimension == '3D':
-        zlim_max = max([brownian[columns].iloc[:,2].max() for columns in brownian.columns[1:]])
-        zlim_min = min([brownian[columns].iloc[:,2].min() for columns in brownian.columns[1:]])
-        ylim_max = max([brownian[columns].iloc[:,1].max() for columns in brownian.columns[1:]])
-        ylim_min = min([brownian[columns].iloc[:,1].min() for columns in brownian.columns[1:]])
-        xlim_max = max([brownian[columns].iloc[:,0].max() for columns in brownian.columns[1:]])
-        xlim_min = min([brownian[columns].iloc[:,0].min() for columns in brownian.columns[1:]])
-        ax = plt.axes(xlim = (xlim_min, xlim_max), ylim = (ylim_min, ylim_max), zlim = (zlim_min, zlim_max), projection='3d')
-        lines = [ax.plot([], [], [], '-')[0] for i in range((len(brownian.iloc[1, :])-1)//3-2)]
-
-        def animate(i):
-            
-            for l in range(1, (len(brownian.iloc[1, :])-1)//3-1):
-                lines[l-1].set_data(np.array(brownian[l].iloc[:i, 0]), np.array(brownian[l].iloc[:i, 1]))
-                lines[l-1].set_3d_properties(np.array(brownian[l].iloc[:i, 2]))
-            
-            return lines
+    return anim
+
+
+def render_segment(paths, times, frames, segment_path, writer, fps, figsize, dpi):
+    '''
+    Renders one segment of frames of an animation to a file with the Agg backend. Run in a worker process by render_animation.
+    ffmpeg segments are encoded video; for GIF output each frame is quantised to a 256 colour palette here, in parallel, and the segment saved as compressed arrays.
+
+    Parameters
+    ----------
+    paths, times
+        See animation_artists
+    frames : np.ndarray
+        The number of steps drawn in each frame of the segment
+    segment_path : str
+        File the segment is written to
+    writer : str
+        'ffmpeg' or 'pillow'
+    fps : int
+        Frames per second
+    figsize : tuple
+        Size of the figure in inches
+    dpi : int
+        Resolution of the figure
+    '''
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    plt.style.use('seaborn-v0_8-whitegrid')
+    from matplotlib import animation
+
+    fig = plt.figure(figsize=figsize, dpi=dpi)
+    update = animation_artists(fig, paths, times)
+
+    if writer == 'ffmpeg':
+        movie = animation.writers[writer](fps=fps)
+        with movie.saving(fig, segment_path, dpi):
+            for end in frames:
+                update(end)
+                movie.grab_frame()
 
     else:
-        raise Exception("Parameter 'animate' must be '1D', '2D' or '3D'.")
+        from PIL import Image
+        indices, palettes = [], []
+        for end in frames:
+            update(end)
+            fig.canvas.draw()
+            image = Image.fromarray(np.asarray(fig.canvas.buffer_rgba())[:, :, :3]).quantize(256, method=Image.Quantize.FASTOCTREE)
+            indices.append(np.asarray(image))
+            palettes.append(np.resize(image.getpalette(), 768).astype(np.uint8))
+        np.savez_compressed(segment_path, indices=np.array(indices), palettes=np.array(palettes))
+
+    plt.close(fig)
+
+
+def stitch_segments(segments, output, writer, fps):
+    '''
+    Joins rendered segments, in order, into one video file. ffmpeg segments are concatenated without re-encoding, and the already quantised GIF frames are
+    written by Pillow without being quantised again.
+
+    Parameters
+    ----------
+    segments : list
+        Paths of the segment files, in order
+    output : str
+        Path of the video file
+    writer : str
+        'ffmpeg' or 'pillow', as the segments were written with
+    fps : int
+        Frames per second
+    '''
+    import os
+    import subprocess
+
+    if writer == 'ffmpeg':
+        listing = os.path.join(os.path.dirname(segments[0]), 'segments.txt')
+        with open(listing, 'w') as file:
+            file.writelines(f"file '{segment}'\n" for segment in segments)
+        subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0', '-i', listing, '-c', 'copy', output], check=True)
+
+    else:
+        from PIL import Image
+        images = []
+        for segment in segments:
+            with np.load(segment) as data:
+                for indices, palette in zip(data['indices'], data['palettes']):
+                    image = Image.fromarray(indices)
+                    image.putpalette(palette.tobytes())
+                    images.append(image)
+        images[0].save(output, format='GIF', save_all=True, append_images=images[1:], duration=1000/fps, loop=0, optimize=False)
+
+
+def render_animation(brownian, dimension, output, times=None, max_frames=1000, fps=40, workers=None, writer=None, figsize=(6.4, 4.8), dpi=100):
+    '''
+    Renders the animation of make_animation to a video file without a display. The frames are split into segments rendered in parallel by a process pool
+    with the Agg backend, which are then stitched together in order.
+
+    Parameters
+    ----------
+    brownian, dimension, times, max_frames
+        See make_animation
+    output : str
+        Path of the video file, e.g. 'walk.mp4' (ffmpeg) or 'walk.gif' (pillow)
+    fps : int
+        Frames per second
+    workers : int or None
+        The number of worker processes, or None for one per CPU
+    writer : str or None
+        'ffmpeg' or 'pillow', or None to use ffmpeg if it is installed and Pillow (GIF) otherwise
+    figsize : tuple
+        Size of the figure in inches
+    dpi : int
+        Resolution of the figure
+    '''
+    import os
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+    from matplotlib import animation
+
+    paths, times = animation_paths(brownian, dimension, times)
+    frames = animation_frames(paths.shape[1], max_frames)
+    workers = os.cpu_count() if workers is None else workers
+    if writer is None:
+        writer = 'ffmpeg' if animation.writers.is_available('ffmpeg') else 'pillow'
+    extension = '.mp4' if writer == 'ffmpeg' else '.npz'
+
+    ### Later frames draw longer lines, so there are several segments per worker to balance the load
+    chunks = [chunk for chunk in np.array_split(frames, min(4 * workers, len(frames))) if len(chunk)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        segments = [os.path.join(directory, f'segment_{k:04d}{extension}') for k in range(len(chunks))]
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            jobs = [pool.submit(render_segment, paths, times, chunk, segment, writer, fps, figsize, dpi) for chunk, segment in zip(chunks, segments)]
+            for job in jobs:
+                job.result()
 
-    anim = animation.FuncAnimation(fig, animate, frames=1000, interval=25, blit=True)
-    plt.show()
+        stitch_segments(segments, output, writer, fps)
 
 
 if __name__ == '__main__':
     ### Create instance of class and call relevant method. Remember to change the name of the function called in brownian, along with the input parameter in make_animation(). (e.g. make sure both are 2D if you want to animate in 2D)
     test = Variable_Step(1.0, 100, 5, 500)
-    brownian = test.brownian_3D_vec()
-    make_animation(brownian, "3D")  
\ No newline at end of file
+    brownian = test.brownian_3D_vec(plot=False, output='array')
+    make_animation(brownian, "3D", times=test.t)  
\ No newline at end of file
@@ -0,0 +1,291 @@
+import sys
+import json
+import time
+import platform
+import argparse
+import itertools
+import tracemalloc
+import importlib.util
+import numpy as np
+from constantstep import Constant_Step
+from variablestep import Variable_Step
+
+
+def constant_loop(N, M, d):
+    '''M walks of Constant_Step, one step at a time with random.choice.'''
+    walk = Constant_Step(N, 1, M, method='loop')
+    for i in range(M):
+        walk.gen_random_walk(f'{d}D')
+
+
+def constant_vectorised(N, M, d):
+    '''M walks of Constant_Step, drawn as arrays a chunk of walks at a time.'''
+    for paths in Constant_Step(N, 1, M).iteration_chunks(f'{d}D', 2**22):
+        pass
+
+
+def variable_loop(N, M, d):
+    '''M single paths of Variable_Step, one step at a time.'''
+    walk = Variable_Step(1.0, N, 1, 1)
+    method = getattr(walk, f'brownian_{d}D_loop')
+    for i in range(M):
+        method(plot=False)
+
+
+def variable_vectorised(N, M, d):
+    '''M paths of Variable_Step, drawn as one (M, N, d) array.'''
+    walk = Variable_Step(1.0, N, M, 1)
+    getattr(walk, f'brownian_{d}D_vec')(plot=False, output='array')
+
+
+def variable_chunks(N, M, d):
+    '''M paths of Variable_Step, drawn 1024 steps at a time.'''
+    for paths in Variable_Step(1.0, N, M, 1).trajectory_chunks(f'{d}D', 1024):
+        pass
+
+
+def ou_euler(N, M, d):
+    '''M trials of the OU process of OU_process in d independent components, by Euler-Maruyama.'''
+    from sde import euler_maruyama, integrate
+
+    step = euler_maruyama(lambda X, t: -(X - 10.0) / 0.05, lambda X, t: np.sqrt(2.0/0.05))
+    integrate(step, np.zeros(d), 0.001, N, trials=M)
+
+
+def ou_exact_update(N, M, d):
+    '''M trials of the OU process of OU_process in d independent components, by its exact update.'''
+    from sde import ou_exact, integrate
+
+    integrate(ou_exact(10.0, 1.0, 0.05), np.zeros(d), 0.001, N, trials=M)
+
+
+def sde_available():
+    '''Whether the SDE integrators (brownian-motion/sde.py) can be imported, i.e. that directory is on PYTHONPATH.'''
+    return importlib.util.find_spec('sde') is not None
+
+
+### Generators benchmarked, each called as generator(N, M, d) to produce M walks of N steps in d dimensions
+GENERATORS = {
+    'constant_loop': constant_loop,
+    'constant_vectorised': constant_vectorised,
+    'variable_loop': variable_loop,
+    'variable_vectorised': variable_vectorised,
+    'variable_chunks': variable_chunks,
+    'ou_euler': ou_euler,
+    'ou_exact': ou_exact_update,
+}
+
+### Generators that need brownian-motion/sde.py on the import path
+SDE_GENERATORS = ('ou_euler', 'ou_exact')
+
+### Variants of the same walk, whose speedups over the first variant of each are reported by speedups()
+FAMILIES = {
+    'constant': ('constant_loop', 'constant_vectorised'),
+    'variable': ('variable_loop', 'variable_vectorised', 'variable_chunks'),
+    'ou': ('ou_euler', 'ou_exact'),
+}
+
+### Per-step loops are skipped for cases with more than this many steps
+LOOP_LIMIT = 10**6
+
+### Grids of benchmark cases: every combination of steps per walk (N), walks (M) and dimension
+GRIDS = {
+    'quick': {'N': [1000], 'M': [10, 100], 'd': [1, 2, 3]},
+    'full': {'N': [1000, 10000, 100000], 'M': [10, 100, 1000], 'd': [1, 2, 3]},
+}
+
+### Fields that identify a case, used to match results against a baseline
+KEYS = ('generator', 'N', 'M', 'd')
+
+
+def run_case(generator, N, M, d, repeats=3, memory=True):
+    '''
+    Times one generator (repeats times, keeping the fastest) and measures its peak memory.
+
+    Parameters
+    ----------
+    generator : str
+        A key of GENERATORS
+    N, M, d : int
+        Steps per walk, number of walks and number of dimensions
+    repeats : int
+        The number of timed runs
+    memory : bool
+        Whether to make one more run under tracemalloc, which records the peak memory allocated (including NumPy arrays) but slows Python loops
+
+    Returns
+    -------
+    result : dict
+        The case, steps generated (N*M), seconds of the fastest run, steps per second and peak allocated memory in MB (None if not measured)
+    '''
+    function = GENERATORS[generator]
+    seconds = None
+
+    ### An untimed run on a tiny case first pays for lazy imports (e.g. pandas in the loop methods)
+    function(min(N, 10), min(M, 2), d)
+
+    for r in range(repeats):
+        start = time.perf_counter()
+        function(N, M, d)
+        elapsed = time.perf_counter() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        function(N, M, d)
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    return {'generator': generator, 'N': N, 'M': M, 'd': d, 'steps': N * M, 'seconds': seconds,
+            'steps_per_second': N * M / seconds if seconds else None, 'peak_mb': peak}
+
+
+def run_suite(grid='quick', generators=None, repeats=3, memory=True):
+    '''
+    Runs every case of a grid for each generator. Loop generators are skipped for cases of more than LOOP_LIMIT steps.
+
+    Parameters
+    ----------
+    grid : str or dict
+        A key of GRIDS, or a dict of lists for 'N', 'M' and 'd'
+    generators : iterable or None
+        Keys of GENERATORS, or None for all (leaving out SDE_GENERATORS if sde.py is not on the import path)
+    repeats, memory
+        Passed to run_case
+
+    Returns
+    -------
+    results : dict
+        'meta' describing the machine and versions, and 'results', a list of the run_case() output for each case
+    '''
+    grid = GRIDS[grid] if isinstance(grid, str) else grid
+    if generators is None:
+        generators = [generator for generator in GENERATORS if generator not in SDE_GENERATORS or sde_available()]
+    results = []
+
+    for generator, N, M, d in itertools.product(generators, grid['N'], grid['M'], grid['d']):
+        if generator.endswith('_loop') and N * M > LOOP_LIMIT:
+            continue
+        results.append(run_case(generator, N, M, d, repeats, memory))
+
+    meta = {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(), 'processor': platform.processor(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+    return {'meta': meta, 'results': results}
+
+
+def compare(results, baseline, tolerance=0.1, memory_tolerance=0.25):
+    '''
+    Compares each case against a baseline run of the same case. Generators are chosen for production jobs on both speed and memory (long
+    vectorised walks run out of memory before they run out of time), so a case regresses if its throughput falls or its peak memory grows.
+
+    Parameters
+    ----------
+    results, baseline : dict
+        Output of run_suite()
+    tolerance : float
+        Fractional fall in steps per second beyond which a case is flagged
+    memory_tolerance : float
+        Fractional growth in peak memory beyond which a case is flagged (only where both runs measured memory)
+
+    Returns
+    -------
+    rows : list
+        For each case found in both, the case fields, the ratios (current / baseline) of steps per second and peak memory (None if either run
+        lacks the measurement), and whether it is a regression
+    '''
+    base = {tuple(case[key] for key in KEYS): case for case in baseline['results']}
+    rows = []
+
+    for case in results['results']:
+        old = base.get(tuple(case[key] for key in KEYS))
+        if old is None:
+            continue
+
+        speed = case['steps_per_second'] / old['steps_per_second'] if case['steps_per_second'] and old['steps_per_second'] else None
+        memory = case['peak_mb'] / old['peak_mb'] if case['peak_mb'] and old['peak_mb'] else None
+        rows.append({**{key: case[key] for key in KEYS}, 'steps_per_second_ratio': speed, 'peak_mb_ratio': memory,
+                     'regression': (speed is not None and speed < 1 - tolerance) or (memory is not None and memory > 1 + memory_tolerance)})
+
+    return rows
+
+
+def speedups(results):
+    '''
+    Throughput of each generator relative to the first variant of its family (e.g. constant_vectorised over constant_loop) in the same case,
+    which is the comparison used to choose a variant.
+
+    Parameters
+    ----------
+    results : dict
+        Output of run_suite()
+
+    Returns
+    -------
+    rows : list
+        For each case of each generator after the first of its family with that case measured, the case fields, the reference generator and the speedup
+    '''
+    measured = {tuple(case[key] for key in KEYS): case for case in results['results']}
+    rows = []
+
+    for family in FAMILIES.values():
+        for case in results['results']:
+            if case['generator'] not in family[1:]:
+                continue
+
+            for reference in family[:family.index(case['generator'])]:
+                old = measured.get((reference,) + tuple(case[key] for key in KEYS[1:]))
+                if old is not None and old['steps_per_second']:
+                    rows.append({**{key: case[key] for key in KEYS}, 'reference': reference, 'speedup': case['steps_per_second'] / old['steps_per_second']})
+                    break
+
+    return rows
+
+
+def ratio(value):
+    '''Formats a ratio for the tables printed by main(), which is None where a run lacks the measurement.'''
+    return '     -' if value is None else f'x{value:5.2f}'
+
+
+def main(argv=None):
+    '''
+    Command line entry point: runs a grid, prints each generator's throughput and its speedup over the other variants of the same walk, saves
+    the results as JSON and compares them against a baseline. The OU generators are included when brownian-motion is on the import path,
+    e.g. PYTHONPATH=../brownian-motion python walk_benchmark.py
+    '''
+    parser = argparse.ArgumentParser(description='Benchmark the random-walk and SDE generators.')
+    parser.add_argument('--grid', default='quick', choices=sorted(GRIDS))
+    parser.add_argument('--generators', nargs='+', default=None, choices=sorted(GENERATORS))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run of each case')
+    parser.add_argument('--output', default='walk_benchmark.json', help='file the results are saved to')
+    parser.add_argument('--baseline', default=None, help='results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    parser.add_argument('--memory-tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.grid, args.generators, args.repeats, not args.no_memory)
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+
+    speedup = {tuple(row[key] for key in KEYS): row for row in speedups(results)}
+    for case in results['results']:
+        row = speedup.get(tuple(case[key] for key in KEYS))
+        versus = f"{ratio(row['speedup'])} vs {row['reference']}" if row else ''
+        print(f"{case['generator']:>20} N={case['N']:<7} M={case['M']:<5} {case['d']}D {case['steps_per_second']:14.0f} steps/s  peak {case['peak_mb'] or 0:7.1f} MB  {versus}")
+
+    if args.baseline is None:
+        return 0
+
+    with open(args.baseline) as file:
+        rows = compare(results, json.load(file), args.tolerance, args.memory_tolerance)
+    for row in rows:
+        flag = 'REGRESSION' if row['regression'] else ''
+        print(f"{row['generator']:>20} N={row['N']:<7} M={row['M']:<5} {row['d']}D speed {ratio(row['steps_per_second_ratio'])}  memory {ratio(row['peak_mb_ratio'])} {flag}")
+
+    return 1 if any(row['regression'] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())